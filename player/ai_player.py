@@ -0,0 +1,141 @@
+"""
+Joueur automatique pour Puissance 4
+
+AIPlayer répond seul aux GAME_UPDATE quand c'est son tour, en cherchant le
+meilleur coup (shared/solver.py) dans le temps imparti par coup, et accepte
+automatiquement les défis reçus. Il sert à remplir les tournois sans
+intervention humaine.
+
+En début de partie, le coup est lu dans la bibliothèque d'ouvertures
+(shared/opening_book.py) au lieu d'être recherché.
+"""
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from shared.protocol import Protocol
+from shared.solver import Solver, from_board, DEFAULT_TABLE_SIZE
+from shared.opening_book import open_book, DEFAULT_BOOK_PATH
+from player import Player
+
+# Temps de recherche par coup, en secondes
+DEFAULT_TIME_BUDGET = 0.5
+
+
+class AIPlayer(Player):
+    def __init__(self, server_host='localhost', server_port=5555, time_budget=DEFAULT_TIME_BUDGET,
+                 table_size=DEFAULT_TABLE_SIZE, auto_queue=False, verbose=False,
+                 book_path=DEFAULT_BOOK_PATH):
+        super().__init__(server_host, server_port)
+        self.time_budget = time_budget
+        self.solver = Solver(table_size)
+        try:
+            self.opening_book = open_book(book_path)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Bibliothèque d'ouvertures ignorée : {e}")
+            self.opening_book = None
+        self.auto_queue = auto_queue  # Rejoint la file d'appariement après chaque partie
+        self.verbose = verbose
+
+    def listen_server(self):
+        """Écoute le serveur ; la fin de la connexion arrête le joueur"""
+        super().listen_server()
+        self.running = False
+
+    def handle_server_message(self, msg_type, msg_data):
+        """Gère les messages du serveur puis joue si c'est son tour"""
+        super().handle_server_message(msg_type, msg_data)
+
+        if msg_type == Protocol.CHALLENGE_RECEIVED:
+            self.accept_challenge()
+
+        elif msg_type == Protocol.GAME_UPDATE:
+            # Mise à jour ignorée (RESYNC en cours) : on attend l'état complet
+            if self.resync_pending or self.board_seq != msg_data.get("seq"):
+                return
+            if self.in_game and not msg_data["game_over"] and self.current_player == self.my_player_number:
+                self.play_best_move()
+
+        elif msg_type == Protocol.GAME_OVER and self.auto_queue:
+            self.join_queue()
+
+    def play_best_move(self):
+        """Cherche et joue le meilleur coup dans le temps imparti"""
+        current, mask, moves = from_board(self.current_board, self.my_player_number)
+
+        entry = self.opening_book.lookup(current, mask, moves) if self.opening_book else None
+        if entry:
+            column, score = entry
+            if self.verbose:
+                print(f"📖 Colonne {column} (bibliothèque d'ouvertures, score {score})")
+            self.play_move(column)
+            return
+
+        # Le temps de transmission est pris sur le budget : on garde une petite marge
+        started = time.monotonic()
+        column, score, depth = self.solver.best_move(current, mask, moves, self.time_budget * 0.9)
+        if self.verbose:
+            elapsed = time.monotonic() - started
+            print(f"🤖 Colonne {column} (score {score}, profondeur {depth}, "
+                  f"{self.solver.nodes} nœuds en {elapsed:.2f}s)")
+        self.play_move(column)
+
+    def display_board(self):
+        if self.verbose:
+            super().display_board()
+
+    def run(self):
+        """Boucle principale : aucune saisie, le joueur réagit aux messages du serveur"""
+        try:
+            while self.running:
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            print("\n")
+        self.disconnect()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Joueur automatique Puissance 4")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5555)
+    parser.add_argument("--name", default="IA")
+    parser.add_argument(
+        "--time-budget", type=float, default=DEFAULT_TIME_BUDGET,
+        help="temps de recherche maximal par coup, en secondes"
+    )
+    parser.add_argument(
+        "--table-size", type=int, default=DEFAULT_TABLE_SIZE,
+        help="nombre maximal de positions gardées dans la table de transposition"
+    )
+    parser.add_argument(
+        "--book", default=str(DEFAULT_BOOK_PATH),
+        help="bibliothèque d'ouvertures (tools/build_opening_book.py)"
+    )
+    parser.add_argument("--queue", action="store_true", help="jouer en continu via la file d'appariement")
+    parser.add_argument("--tournament", action="store_true", help="s'inscrire au prochain tournoi")
+    parser.add_argument("--verbose", action="store_true", help="afficher le plateau et les recherches")
+    args = parser.parse_args()
+
+    player = AIPlayer(
+        args.host, args.port,
+        time_budget=args.time_budget,
+        table_size=args.table_size,
+        auto_queue=args.queue,
+        verbose=args.verbose,
+        book_path=args.book
+    )
+
+    if player.connect(args.name):
+        # Laisse le REGISTER_OK arriver avant de demander une partie
+        while player.running and player.player_id is None:
+            time.sleep(0.05)
+        if args.queue:
+            player.join_queue()
+        if args.tournament:
+            player.join_tournament()
+        player.run()
@@ -0,0 +1,165 @@
+"""
+Client asyncio multiplexé pour Puissance 4
+
+Un MultiplexClient ouvre une seule connexion TCP et y enregistre autant de
+joueurs que voulu : chaque joueur est une session dont l'identifiant est
+porté par toutes ses trames, avec sa propre file de messages reçus. Une
+ferme de 500 bots ne coûte ainsi au serveur qu'une connexion (un seul
+thread en mode threads) et une seule poignée de main TCP.
+
+    client = MultiplexClient()
+    await client.connect("localhost", 5555)
+    alice = await client.register("alice")
+    bob = await client.register("bob")
+    alice.send(Protocol.CHALLENGE, {"opponent_id": bob.player_id})
+    challenge = await bob.until(Protocol.CHALLENGE_RECEIVED)
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from shared.protocol import Protocol, BinaryProtocol, SessionProtocol, MAX_SESSION_ID
+from shared.framing import FrameBuffer
+
+DEFAULT_FEATURES = (Protocol.FEATURE_DELTA, Protocol.FEATURE_BINARY)
+
+# Marque de fin déposée dans la file des joueurs à la fermeture de la connexion
+_CLOSED = (None, None)
+
+
+class ClientSession:
+    """Joueur logique d'une connexion multiplexée"""
+
+    def __init__(self, client, session):
+        self.client = client
+        self.session = session
+        self.player_id = None
+        self.features = ()
+        # Format des trames envoyées : JSON jusqu'à la négociation du REGISTER_OK
+        self.protocol = SessionProtocol(Protocol, session)
+        self.messages = asyncio.Queue()
+        self.closed = False
+
+    def send(self, msg_type, data=None):
+        self.client.write(self.protocol.encode(msg_type, data))
+
+    async def recv(self):
+        """Prochain message (type, données) reçu pour ce joueur
+
+        Lève ConnectionError une fois la connexion fermée et les messages reçus lus.
+        """
+        message = await self.messages.get()
+        if message is _CLOSED:
+            self.messages.put_nowait(_CLOSED)
+            raise ConnectionError(f"Session {self.session}: connexion fermée par le serveur")
+        return message
+
+    async def until(self, msg_type):
+        """Attend un message du type donné en ignorant les autres"""
+        while True:
+            received_type, data = await self.recv()
+            if received_type == msg_type:
+                return data
+
+    def close(self):
+        """Déconnecte ce joueur seulement : la connexion reste ouverte pour les autres"""
+        if not self.closed:
+            self.closed = True
+            self.send(Protocol.DISCONNECT)
+            self.client.sessions.pop(self.session, None)
+
+
+class MultiplexClient:
+    """Connexion au serveur partagée par plusieurs joueurs"""
+
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.sessions = {}  # {identifiant de session: ClientSession}
+        self.next_session = 0
+        self.frames = FrameBuffer()
+        self.read_task = None
+
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.read_task = asyncio.create_task(self.read_loop())
+
+    async def register(self, name, features=DEFAULT_FEATURES, **data):
+        """Enregistre un nouveau joueur sur la connexion et retourne sa ClientSession
+
+        data complète le REGISTER (resume_token par exemple). Lève
+        ConnectionError si le serveur refuse le joueur.
+        """
+        player = ClientSession(self, self._new_session())
+        self.sessions[player.session] = player
+        player.send(Protocol.REGISTER, dict(data, name=name, features=list(features)))
+
+        while True:
+            msg_type, confirmation = await player.recv()
+            if msg_type == Protocol.REGISTER_OK:
+                break
+            if msg_type == Protocol.ERROR:
+                del self.sessions[player.session]
+                raise ConnectionError(confirmation["message"])
+
+        player.player_id = confirmation["player_id"]
+        player.features = tuple(confirmation["features"])
+        if Protocol.FEATURE_BINARY in player.features:
+            player.protocol = SessionProtocol(BinaryProtocol, player.session)
+        return player
+
+    def _new_session(self):
+        """Premier identifiant de session libre à partir du dernier attribué"""
+        for _ in range(MAX_SESSION_ID + 1):
+            session = self.next_session
+            self.next_session = (session + 1) % (MAX_SESSION_ID + 1)
+            if session not in self.sessions:
+                return session
+        raise ConnectionError("Plus d'identifiant de session libre sur la connexion")
+
+    def write(self, frame):
+        self.writer.write(frame)
+
+    async def drain(self):
+        """Attend que le tampon d'envoi se vide (contre-pression du serveur)"""
+        await self.writer.drain()
+
+    async def read_loop(self):
+        """Distribue les messages reçus aux files des joueurs"""
+        try:
+            while True:
+                data = await self.reader.read(65536)
+                if not data:
+                    break
+
+                for message in self.frames.feed(data):
+                    msg_type, msg_data, session = Protocol.decode_session(message)
+
+                    if session is None:
+                        # Messages de la connexion elle-même
+                        if msg_type == Protocol.PING:
+                            self.write(Protocol.encode(Protocol.PONG))
+                        continue
+
+                    player = self.sessions.get(session)
+                    if player is not None:
+                        player.messages.put_nowait((msg_type, msg_data))
+        except ConnectionError:
+            pass
+        finally:
+            for player in self.sessions.values():
+                player.messages.put_nowait(_CLOSED)
+
+    async def close(self):
+        """Ferme la connexion : le serveur déconnecte tous ses joueurs"""
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+        if self.read_task is not None:
+            await asyncio.gather(self.read_task, return_exceptions=True)
@@ -4,38 +4,53 @@ Client joueur pour Puissance 4
 import socket
 import threading
 import sys
+import time
 from pathlib import Path
 
 # Ajouter le répertoire parent au path pour les imports
 sys.path.append(str(Path(__file__).parent.parent))
 
-from shared.protocol import Protocol
+from shared.protocol import Protocol, BinaryProtocol
+from shared.framing import FrameBuffer
 
 class Player:
+    # Nombre de joueurs demandés par page de LIST_PLAYERS
+    PAGE_SIZE = 10
+    # Reprise d'une partie après une coupure (redémarrage du serveur)
+    RECONNECT_ATTEMPTS = 30
+    RECONNECT_DELAY = 1.0
+    
     def __init__(self, server_host='localhost', server_port=5555):
         self.server_host = server_host
         self.server_port = server_port
         self.socket = None
+        # Format des trames envoyées : JSON jusqu'à la négociation du REGISTER_OK
+        self.protocol = Protocol
         self.player_id = None
         self.player_name = None
         self.in_game = False
         self.my_player_number = None
         self.current_board = None
+        self.board_seq = None
+        self.resync_pending = False
         self.current_player = None
         self.pending_challenger = None
+        # Jeton de la partie en cours, présenté au REGISTER pour la reprendre après une coupure
+        self.resume_token = None
+        # Partie suivie en spectateur (None si aucune)
+        self.spectating = None
+        # Pagination de la liste des joueurs
+        self.list_offset = 0
+        self.list_prefix = ""
+        self.list_total = 0
         self.running = True
     
     def connect(self, name):
         """Se connecte au serveur"""
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.connect((self.server_host, self.server_port))
-            print(f"✅ Connecté au serveur {self.server_host}:{self.server_port}")
-            
-            # S'enregistre
             self.player_name = name
-            register_msg = Protocol.encode(Protocol.REGISTER, {"name": name})
-            self.socket.send(register_msg)
+            self.open_session({"name": name})
+            print(f"✅ Connecté au serveur {self.server_host}:{self.server_port}")
             
             # Lance le thread d'écoute
             listen_thread = threading.Thread(target=self.listen_server)
@@ -47,9 +62,42 @@ class Player:
             print(f"❌ Erreur de connexion: {e}")
             return False
     
+    def open_session(self, register_data):
+        """Ouvre une connexion et s'enregistre (les trames restent en JSON jusqu'au REGISTER_OK)"""
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.connect((self.server_host, self.server_port))
+        self.protocol = Protocol
+        
+        register_data["features"] = [Protocol.FEATURE_DELTA, Protocol.FEATURE_BINARY]
+        self.socket.send(Protocol.encode(Protocol.REGISTER, register_data))
+    
     def listen_server(self):
-        """Écoute les messages du serveur"""
-        buffer = b""
+        """Écoute les messages du serveur
+        
+        Si la connexion est perdue en cours de partie, le joueur se reconnecte
+        et reprend sa place grâce à son jeton de reprise.
+        """
+        while self.running:
+            self.receive_messages()
+            if not (self.running and self.in_game and self.resume_token and self.reconnect()):
+                break
+    
+    def reconnect(self):
+        """Reprend la partie en cours sur une nouvelle connexion"""
+        print("\n🔌 Connexion perdue, tentative de reprise de la partie...")
+        for _ in range(self.RECONNECT_ATTEMPTS):
+            time.sleep(self.RECONNECT_DELAY)
+            try:
+                self.open_session({"name": self.player_name, "resume_token": self.resume_token})
+                return True
+            except OSError:
+                continue
+        print("❌ Impossible de reprendre la partie")
+        return False
+    
+    def receive_messages(self):
+        """Traite les messages reçus jusqu'à la fermeture de la connexion"""
+        frames = FrameBuffer()
         
         while self.running:
             try:
@@ -57,12 +105,9 @@ class Player:
                 if not data:
                     break
                 
-                buffer += data
-                
-                # Traite tous les messages complets dans le buffer
-                while b'\n' in buffer:
-                    message, buffer = buffer.split(b'\n', 1)
-                    msg_type, msg_data = Protocol.decode(message + b'\n')
+                # Traite toutes les trames complètes (JSON ou binaires) reçues
+                for message in frames.feed(data):
+                    msg_type, msg_data = Protocol.decode(message)
                     self.handle_server_message(msg_type, msg_data)
             
             except Exception as e:
@@ -74,9 +119,20 @@ class Player:
         """Gère les messages reçus du serveur"""
         if msg_type == Protocol.REGISTER_OK:
             self.player_id = msg_data["player_id"]
+            if Protocol.FEATURE_BINARY in msg_data.get("features", ()):
+                self.protocol = BinaryProtocol
             print(f"🎮 Enregistré avec l'ID: {self.player_id}")
+            if msg_data.get("resumed_game"):
+                print(f"♻️  Partie {msg_data['resumed_game']} reprise")
+            elif self.in_game:
+                # Jeton refusé : la partie n'a pas survécu à la coupure
+                self.in_game = False
+                self.resume_token = None
+                print("❌ La partie en cours n'a pas pu être reprise")
         
         elif msg_type == Protocol.LIST_PLAYERS:
+            self.list_offset = msg_data.get("offset", 0)
+            self.list_total = msg_data.get("total", len(msg_data["players"]))
             self.display_player_list(msg_data["players"])
         
         elif msg_type == Protocol.CHALLENGE_RECEIVED:
@@ -90,18 +146,29 @@ class Player:
         elif msg_type == Protocol.GAME_START:
             self.in_game = True
             self.my_player_number = msg_data["your_number"]
+            self.current_board = None
+            self.board_seq = None
+            self.resync_pending = False
             self.player_name = msg_data["your_name"]  # Stocke notre nom
+            self.resume_token = msg_data.get("resume_token")
             print(f"\n🎲 Partie démarrée!")
             print(f"   Joueur 1 (🔴): {msg_data['player1']}")
             print(f"   Joueur 2 (🟡): {msg_data['player2']}")
             print(f"   Vous êtes le joueur {self.my_player_number}")
         
         elif msg_type == Protocol.GAME_UPDATE:
-            self.current_board = msg_data["board"]
+            # Mise à jour d'une partie quittée encore en transit
+            if not (self.in_game or self.spectating):
+                return
+            if not self.apply_game_update(msg_data):
+                return
             self.current_player = msg_data["current_player"]
             self.display_board()
             
-            if not msg_data["game_over"]:
+            if not self.in_game:
+                if not msg_data["game_over"]:
+                    print(f"👀 Au tour du joueur {self.current_player}")
+            elif not msg_data["game_over"]:
                 if self.current_player == self.my_player_number:
                     print("🔵 C'est votre tour! Choisissez une colonne (0-6):")
                 else:
@@ -115,8 +182,23 @@ class Player:
                     else:
                         print("😔 Votre adversaire a aligné 4 pions!")
         
+        elif msg_type == Protocol.GAME_OVER and "game_id" in msg_data:
+            # Fin d'une partie suivie en spectateur (les joueurs ne reçoivent pas de game_id)
+            if self.spectating != msg_data["game_id"]:
+                return
+            self.spectating = None
+            print("\n" + "="*50)
+            if msg_data["winner"]:
+                print(f"🏁 Partie {msg_data['game_id']} terminée: {msg_data['winner']} a gagné!")
+            else:
+                print(f"🏁 Partie {msg_data['game_id']} terminée: match nul")
+            if msg_data.get("reason"):
+                print(f"Raison: {msg_data['reason']}")
+            print("="*50)
+        
         elif msg_type == Protocol.GAME_OVER:
             self.in_game = False
+            self.resume_token = None
             winner = msg_data.get("winner")
             winner_id = msg_data.get("winner_id")
             you_won = msg_data.get("you_won")
@@ -137,19 +219,172 @@ class Player:
             
             print("\nTapez 'list' pour voir les joueurs disponibles")
         
+        elif msg_type == Protocol.JOIN_QUEUE:
+            print(f"⏳ En file d'attente ({msg_data['waiting']} joueur(s) en attente)")
+        
+        elif msg_type == Protocol.LEAVE_QUEUE:
+            print("🚪 Vous avez quitté la file d'attente")
+        
+        elif msg_type == Protocol.TOURNAMENT_JOIN:
+            print(f"📝 Inscrit au tournoi ({msg_data['registered']}/{msg_data['size']} joueurs)")
+        
+        elif msg_type == Protocol.TOURNAMENT_START:
+            print(f"\n🏆 Le tournoi {msg_data['tournament_id']} commence ({msg_data['rounds']} tours)")
+            print(f"   Joueurs: {', '.join(msg_data['players'])}")
+        
+        elif msg_type == Protocol.TOURNAMENT_OVER:
+            print("\n" + "="*50)
+            print(f"🏆 CLASSEMENT DU TOURNOI {msg_data['tournament_id']}")
+            for entry in msg_data["standings"]:
+                marker = " (vous)" if entry["player_id"] == self.player_id else ""
+                print(f"  {entry['rank']:>2}. {entry['name'] or entry['player_id']}{marker}")
+            print("="*50)
+        
+        elif msg_type == Protocol.HINT:
+            if msg_data["column"] is None:
+                print("💡 Aucune suggestion pour cette position")
+            else:
+                print(f"💡 Suggestion: colonne {msg_data['column']}")
+        
+        elif msg_type == Protocol.ANALYZE:
+            self.display_analysis(msg_data)
+        
+        elif msg_type == Protocol.STATS:
+            self.display_stats(msg_data)
+        
+        elif msg_type == Protocol.LIST_GAMES:
+            self.display_game_list(msg_data)
+        
+        elif msg_type == Protocol.LEADERBOARD:
+            self.display_leaderboard(msg_data)
+        
+        elif msg_type == Protocol.MY_RANK:
+            if msg_data["rank"] is None:
+                print(f"📈 {msg_data['name']}: pas encore classé ({msg_data['total']} joueurs classés)")
+            else:
+                print(f"📈 {msg_data['name']}: {msg_data['rank']}e sur {msg_data['total']}, "
+                      f"classement {msg_data['rating']} ({msg_data['wins']} V / {msg_data['losses']} D / "
+                      f"{msg_data['draws']} N)")
+        
+        elif msg_type == Protocol.SPECTATE:
+            self.spectating = msg_data["game_id"]
+            self.current_board = None
+            self.board_seq = None
+            self.resync_pending = False
+            print(f"\n👀 Vous regardez {msg_data['player1']} (🔴) contre {msg_data['player2']} (🟡)")
+            print(f"   {msg_data['spectators']} spectateur(s). Tapez 'unwatch' pour arrêter")
+        
+        elif msg_type == Protocol.UNSPECTATE:
+            self.spectating = None
+            print("👋 Vous ne regardez plus la partie")
+        
         elif msg_type == Protocol.ERROR:
-            print(f"⚠️  {msg_data['message']}")
+            if "retry_after" in msg_data:
+                print(f"⚠️  {msg_data['message']} (dans {msg_data['retry_after']:.1f}s)")
+            else:
+                print(f"⚠️  {msg_data['message']}")
+        
+        elif msg_type == Protocol.PING:
+            # Sans réponse, le serveur considère la connexion comme morte
+            self.socket.send(self.protocol.encode(Protocol.PONG))
+    
+    def display_stats(self, stats):
+        """Affiche les métriques du serveur"""
+        print("\n" + "="*50)
+        print(f"📊 STATISTIQUES DU SERVEUR (actif depuis {stats['uptime_seconds']:.0f}s)")
+        for name, value in stats["gauges"].items():
+            print(f"  {name}: {value}")
+        rate = sum(stats["messages_per_sec"].values())
+        print(f"  messages reçus/s: {rate:.1f}")
+        for name, histogram in stats["histograms"].items():
+            if histogram["count"]:
+                print(f"  {name}: {histogram['count']} mesures, moyenne {histogram['mean'] * 1000:.3f} ms, "
+                      f"p99 <= {histogram['p99']}s")
+        print("="*50)
+    
+    def apply_game_update(self, msg_data):
+        """Applique un GAME_UPDATE complet ou incrémental sur current_board
+        
+        Retourne False si la mise à jour n'a pas pu être appliquée (trou dans
+        la séquence) : un RESYNC est alors demandé au serveur.
+        """
+        if "board" in msg_data:
+            self.current_board = msg_data["board"]
+            self.board_seq = msg_data.get("seq")
+            self.resync_pending = False
+            return True
+        
+        # En attente d'un état complet : les deltas intermédiaires sont ignorés
+        if self.resync_pending:
+            return False
+        
+        seq = msg_data["seq"]
+        if self.current_board is None or self.board_seq is None or seq != self.board_seq + 1:
+            self.request_resync()
+            return False
+        
+        move = msg_data["move"]
+        self.current_board[move["row"]][move["column"]] = move["player"]
+        self.board_seq = seq
+        return True
+    
+    def request_resync(self):
+        """Demande l'état complet du plateau au serveur"""
+        self.resync_pending = True
+        msg = self.protocol.encode(Protocol.RESYNC)
+        self.socket.send(msg)
     
     def display_player_list(self, players):
-        """Affiche la liste des joueurs"""
+        """Affiche une page de la liste des joueurs"""
         print("\n👥 Joueurs disponibles:")
         if not players:
             print("   Aucun joueur disponible")
         else:
-            for i, player in enumerate(players, 1):
+            for i, player in enumerate(players, self.list_offset + 1):
                 print(f"   {i}. {player['name']} (ID: {player['id']})")
+            
+            last = self.list_offset + len(players)
+            print(f"   ({self.list_offset + 1}-{last} sur {self.list_total})")
+            if last < self.list_total:
+                print("Tapez 'next' pour la page suivante")
+            if self.list_offset > 0:
+                print("Tapez 'prev' pour la page précédente")
         print("\nTapez 'challenge <numéro>' pour défier un joueur")
     
+    def display_game_list(self, page):
+        """Affiche une page de la liste des parties en cours ou terminées"""
+        if page.get("finished"):
+            print("\n🏁 Dernières parties terminées:")
+            if not page["games"]:
+                print("   Aucune partie terminée")
+            for game in page["games"]:
+                result = f"{game['winner']} a gagné" if game["winner"] else "match nul"
+                reason = f" ({game['reason']})" if game.get("reason") else ""
+                print(f"   {game['game_id']}: {game['player1']} vs {game['player2']} - "
+                      f"{result} en {game['moves']} coups{reason}")
+            return
+        
+        print("\n🎲 Parties en cours:")
+        if not page["games"]:
+            print("   Aucune partie en cours")
+        for game in page["games"]:
+            tournament = f" [{game['tournament_id']}]" if game.get("tournament_id") else ""
+            print(f"   {game['game_id']}: {game['player1']} vs {game['player2']}{tournament} "
+                  f"- {game['moves']} coups, {game['spectators']} spectateur(s)")
+        if page["total"] > len(page["games"]):
+            print(f"   ({len(page['games'])} sur {page['total']})")
+        print("\nTapez 'watch <id>' pour regarder une partie")
+    
+    def display_leaderboard(self, page):
+        """Affiche une page du classement Elo"""
+        print("\n🏅 Classement:")
+        if not page["players"]:
+            print("   Aucun joueur classé")
+        for entry in page["players"]:
+            print(f"   {entry['rank']:>4}. {entry['name']} - {entry['rating']} ({entry['games']} parties)")
+        if page["total"] > len(page["players"]):
+            print(f"   ({len(page['players'])} sur {page['total']})")
+    
     def display_board(self):
         """Affiche le plateau de jeu"""
         symbols = {0: '· ', 1: '🔴', 2: '🟡'}
@@ -158,11 +393,43 @@ class Player:
             print("  " + "  ".join(symbols[cell] for cell in row))
         print()
     
-    def request_player_list(self):
-        """Demande la liste des joueurs"""
-        msg = Protocol.encode(Protocol.LIST_PLAYERS)
+    def request_player_list(self, offset=0, prefix=None):
+        """Demande une page de la liste des joueurs, filtrée par préfixe de nom"""
+        if prefix is not None:
+            self.list_prefix = prefix
+        msg = self.protocol.encode(
+            Protocol.LIST_PLAYERS,
+            {"offset": max(0, offset), "limit": self.PAGE_SIZE, "prefix": self.list_prefix}
+        )
         self.socket.send(msg)
     
+    def request_game_list(self):
+        """Demande la liste des parties en cours"""
+        self.socket.send(self.protocol.encode(Protocol.LIST_GAMES, {"limit": self.PAGE_SIZE}))
+    
+    def request_results(self):
+        """Demande les dernières parties terminées"""
+        self.socket.send(self.protocol.encode(Protocol.LIST_GAMES, {"finished": True, "limit": self.PAGE_SIZE}))
+    
+    def request_leaderboard(self):
+        """Demande les meilleurs joueurs du classement"""
+        self.socket.send(self.protocol.encode(Protocol.LEADERBOARD, {"limit": self.PAGE_SIZE}))
+    
+    def request_rank(self):
+        """Demande son rang au classement"""
+        self.socket.send(self.protocol.encode(Protocol.MY_RANK))
+    
+    def watch_game(self, game_id):
+        """Regarde une partie en cours"""
+        if self.in_game:
+            print("⚠️  Vous êtes en jeu")
+            return
+        self.socket.send(self.protocol.encode(Protocol.SPECTATE, {"game_id": game_id}))
+    
+    def unwatch_game(self):
+        """Arrête de regarder la partie suivie"""
+        self.socket.send(self.protocol.encode(Protocol.UNSPECTATE))
+    
     def challenge_player(self, opponent_id):
         """Défie un joueur"""
         if opponent_id == self.player_id:
@@ -171,14 +438,64 @@ class Player:
         if self.in_game:
             print("⚠️  Vous êtes déjà en jeu")
             return
-        msg = Protocol.encode(Protocol.CHALLENGE, {"opponent_id": opponent_id})
+        msg = self.protocol.encode(Protocol.CHALLENGE, {"opponent_id": opponent_id})
         self.socket.send(msg)
         print(f"⏳ Défi envoyé, en attente de réponse...")
     
+    def join_queue(self):
+        """Demande un adversaire au serveur (appariement automatique)"""
+        if self.in_game:
+            print("⚠️  Vous êtes déjà en jeu")
+            return
+        self.socket.send(self.protocol.encode(Protocol.JOIN_QUEUE))
+    
+    def leave_queue(self):
+        """Quitte la file d'appariement"""
+        self.socket.send(self.protocol.encode(Protocol.LEAVE_QUEUE))
+    
+    def join_tournament(self):
+        """S'inscrit au prochain tournoi"""
+        self.socket.send(self.protocol.encode(Protocol.TOURNAMENT_JOIN))
+    
+    def start_tournament(self):
+        """Lance le tournoi avec les inscrits actuels"""
+        self.socket.send(self.protocol.encode(Protocol.TOURNAMENT_START))
+    
+    def request_hint(self):
+        """Demande une suggestion de coup au serveur"""
+        self.socket.send(self.protocol.encode(Protocol.HINT))
+    
+    def request_analysis(self, game_id=None):
+        """Demande l'analyse d'une partie en cours, ou du plateau affiché"""
+        if game_id:
+            data = {"game_id": game_id}
+        elif self.current_board is not None:
+            data = {"board": self.current_board, "player": self.current_player}
+        else:
+            print("❌ Aucun plateau à analyser")
+            return
+        self.socket.send(self.protocol.encode(Protocol.ANALYZE, data))
+    
+    def display_analysis(self, analysis):
+        """Affiche la meilleure colonne et la valeur de la position pour le joueur au trait"""
+        values = {"win": "gagnante", "loss": "perdante", "draw": "nulle"}
+        if analysis["column"] is None:
+            print(f"🔎 Position terminée ({values[analysis['value']]} pour le joueur au trait)")
+        elif analysis["exact"]:
+            print(f"🔎 Meilleur coup: colonne {analysis['column']}, position {values[analysis['value']]} "
+                  f"pour le joueur au trait")
+        else:
+            print(f"🔎 Meilleur coup: colonne {analysis['column']} (évaluation {analysis['score']}, "
+                  f"profondeur {analysis['depth']})")
+    
+    def request_stats(self):
+        """Demande les métriques du serveur"""
+        self.socket.send(self.protocol.encode(Protocol.STATS))
+    
     def accept_challenge(self):
         """Accepte un défi"""
         if self.pending_challenger:
-            msg = Protocol.encode(
+            msg = self.protocol.encode(
                 Protocol.CHALLENGE_ACCEPTED,
                 {"challenger_id": self.pending_challenger["challenger_id"]}
             )
@@ -188,7 +505,7 @@ class Player:
     def refuse_challenge(self):
         """Refuse un défi"""
         if self.pending_challenger:
-            msg = Protocol.encode(
+            msg = self.protocol.encode(
                 Protocol.CHALLENGE_REFUSED,
                 {"challenger_id": self.pending_challenger["challenger_id"]}
             )
@@ -206,7 +523,7 @@ class Player:
             print("⚠️  Ce n'est pas votre tour")
             return
         
-        msg = Protocol.encode(Protocol.PLAY_MOVE, {"column": column})
+        msg = self.protocol.encode(Protocol.PLAY_MOVE, {"column": column})
         self.socket.send(msg)
     
     def disconnect(self):
@@ -214,7 +531,7 @@ class Player:
         self.running = False
         if self.socket:
             try:
-                msg = Protocol.encode(Protocol.DISCONNECT)
+                msg = self.protocol.encode(Protocol.DISCONNECT)
                 self.socket.send(msg)
                 self.socket.close()
             except:
@@ -225,8 +542,19 @@ class Player:
         """Affiche l'aide"""
         print("\nCommandes disponibles:")
         print("  help           - Afficher cette aide")
-        print("  list           - Afficher les joueurs disponibles")
+        print("  list [préfixe] - Afficher les joueurs disponibles (filtrés par nom)")
+        print("  next / prev    - Page suivante / précédente de la liste")
         print("  challenge <id> - Défier un joueur")
+        print("  games          - Afficher les parties en cours")
+        print("  results        - Afficher les dernières parties terminées")
+        print("  top / rank     - Afficher le classement / son rang")
+        print("  watch <id>     - Regarder une partie / unwatch pour arrêter")
+        print("  queue / leave  - Entrer / sortir de la file d'appariement automatique")
+        print("  tournament     - S'inscrire au prochain tournoi")
+        print("  start          - Lancer le tournoi avec les inscrits actuels")
+        print("  hint           - Demander une suggestion de coup")
+        print("  analyze [id]   - Analyser une partie en cours / le plateau affiché")
+        print("  stats          - Afficher les métriques du serveur")
         print("  quit           - Quitter\n")
 
     def run(self):
@@ -247,13 +575,58 @@ class Player:
                     self.disconnect()
                     break
                 
-                elif user_input == "list":
-                    self.request_player_list()
+                elif user_input == "list" or user_input.startswith("list "):
+                    self.request_player_list(prefix=user_input[5:].strip())
+                
+                elif user_input == "next":
+                    self.request_player_list(self.list_offset + self.PAGE_SIZE)
+                
+                elif user_input == "prev":
+                    self.request_player_list(self.list_offset - self.PAGE_SIZE)
                 
                 elif user_input.startswith("challenge "):
                     opponent_id = user_input.split()[1]
                     self.challenge_player(opponent_id)
                 
+                elif user_input == "games":
+                    self.request_game_list()
+                
+                elif user_input == "results":
+                    self.request_results()
+                
+                elif user_input == "top":
+                    self.request_leaderboard()
+                
+                elif user_input == "rank":
+                    self.request_rank()
+                
+                elif user_input.startswith("watch "):
+                    self.watch_game(user_input.split()[1])
+                
+                elif user_input == "unwatch":
+                    self.unwatch_game()
+                
+                elif user_input == "queue":
+                    self.join_queue()
+                
+                elif user_input == "leave":
+                    self.leave_queue()
+                
+                elif user_input == "tournament":
+                    self.join_tournament()
+                
+                elif user_input == "start":
+                    self.start_tournament()
+                
+                elif user_input == "hint":
+                    self.request_hint()
+                
+                elif user_input == "analyze" or user_input.startswith("analyze "):
+                    self.request_analysis(user_input[len("analyze"):].strip() or None)
+                
+                elif user_input == "stats":
+                    self.request_stats()
+                
                 elif user_input == "yes":
                     self.accept_challenge()
                 
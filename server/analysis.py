@@ -0,0 +1,267 @@
+"""
+Service d'analyse de positions
+
+Évalue la position d'une partie (meilleure colonne et valeur pour le joueur
+qui doit jouer) sans jamais bloquer les threads de connexion : la recherche
+(shared/solver.py) tourne dans un pool de processus et le résultat est
+remis par un callback.
+
+Avant toute recherche, la position est cherchée :
+- dans la bibliothèque d'ouvertures, si le serveur en a une
+- dans un cache LRU borné partagé par toutes les parties du serveur, indexé
+  par la clé canonique de la position (une position et son symétrique
+  gauche-droite partagent la même entrée)
+- parmi les analyses en cours : des demandes identiques simultanées
+  attendent la même recherche au lieu d'en lancer chacune une
+
+Les milliers de parties en cours passent par les mêmes positions (surtout
+en début de partie) : la plupart des demandes sont servies sans recherche.
+"""
+import collections
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+import time
+
+from shared.solver import Solver, canonical_key, from_board, COLS, ROWS, COLUMN_BITS, CELLS, WIN_SCORE
+from game import Connect4Game
+
+DEFAULT_WORKERS = 2
+DEFAULT_CACHE_SIZE = 100000
+DEFAULT_TIME_BUDGET = 1.0
+# Recherches en attente au plus ; au-delà les demandes sont refusées
+DEFAULT_MAX_PENDING = 1000
+# Entrées de la table de transposition de chaque processus d'analyse
+WORKER_TABLE_SIZE = 1 << 20
+
+_COLUMN_MASK = (1 << ROWS) - 1
+
+# Solveur du processus d'analyse : sa table de transposition sert d'une recherche à l'autre
+_solver = None
+
+
+def _watch_parent(parent_pid):
+    """Initialisation d'un processus d'analyse : il s'arrête si le serveur disparaît
+
+    Un serveur tué (SIGTERM, SIGKILL) ne prévient pas son pool, dont les
+    processus resteraient sinon bloqués indéfiniment en attente de travail.
+    """
+    def watch():
+        while os.getppid() == parent_pid:
+            time.sleep(1.0)
+        os._exit(0)
+
+    threading.Thread(target=watch, name="parent-watch", daemon=True).start()
+
+
+def _search(current, mask, moves, time_budget):
+    """Recherche exécutée dans un processus du pool : (colonne, score, profondeur)"""
+    global _solver
+    if _solver is None:
+        _solver = Solver(WORKER_TABLE_SIZE)
+    return _solver.best_move(current, mask, moves, time_budget)
+
+
+def is_valid_position(current, mask, moves):
+    """Vrai si les pions sont empilés depuis le bas et que les deux joueurs ont joué à tour de rôle"""
+    for col in range(COLS):
+        column = (mask >> (col * COLUMN_BITS)) & _COLUMN_MASK
+        if column & (column + 1):
+            return False
+    # Le joueur qui doit jouer a autant de pions que l'adversaire, ou un de moins
+    return (moves - current.bit_count()) - current.bit_count() in (0, 1)
+
+
+def final_result(current, mask, moves):
+    """Résultat d'une position terminée (alignement ou plateau plein), None sinon"""
+    if Connect4Game._check_win(current ^ mask):
+        value = "loss"
+    elif Connect4Game._check_win(current):
+        value = "win"
+    elif moves == CELLS:
+        value = "draw"
+    else:
+        return None
+    return {"column": None, "score": None, "value": value, "exact": True, "depth": 0, "source": "final"}
+
+
+def describe(column, score, depth, moves):
+    """Résultat d'une recherche : valeur exacte si l'issue est forcée ou la recherche complète"""
+    result = {"column": column, "score": score, "value": None, "exact": False, "depth": depth}
+    if abs(score) >= WIN_SCORE - CELLS:
+        result["value"] = "win" if score > 0 else "loss"
+        result["exact"] = True
+    elif depth >= CELLS - moves:
+        result["value"] = "win" if score > 0 else "loss" if score < 0 else "draw"
+        result["exact"] = True
+    return result
+
+
+class AnalysisCache:
+    """Résultats indexés par clé canonique, éviction du moins récemment utilisé"""
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()  # {clé: (colonne canonique, score, profondeur)}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class AnalysisService:
+    def __init__(self, workers=DEFAULT_WORKERS, cache_size=DEFAULT_CACHE_SIZE, time_budget=DEFAULT_TIME_BUDGET,
+                 opening_book=None, max_pending=DEFAULT_MAX_PENDING, processes=True, metrics=None):
+        self.workers = workers
+        self.time_budget = time_budget
+        self.opening_book = opening_book
+        self.max_pending = max_pending
+        self.metrics = metrics
+        self.cache = AnalysisCache(cache_size)
+        self.pending = {}  # {clé: [(symétrique, callback)]} des recherches en cours
+        self.lock = threading.Lock()
+        self.executor = None
+        if workers:
+            if processes:
+                # Les processus démarrent à la première recherche ; spawn plutôt que
+                # fork : le serveur a déjà des threads (et leurs verrous) en cours
+                self.executor = concurrent.futures.ProcessPoolExecutor(
+                    workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_watch_parent, initargs=(os.getpid(),)
+                )
+            else:
+                self.executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="analysis")
+
+    @property
+    def available(self):
+        return self.executor is not None
+
+    def _count(self, source):
+        if self.metrics is not None:
+            self.metrics.inc("analysis_total", source)
+
+    def analyze(self, current, mask, moves, callback):
+        """Analyse une position pour le joueur qui doit jouer (current : ses pions, mask : tous les pions)
+
+        callback(résultat) est appelé une fois, tout de suite ou depuis un
+        thread du pool, avec un dict {"column", "score", "value", "exact",
+        "depth", "source"}, ou None si le service est saturé.
+        """
+        result = final_result(current, mask, moves)
+        if result is not None:
+            self._count("final")
+            callback(result)
+            return
+
+        if self.opening_book is not None:
+            entry = self.opening_book.lookup(current, mask, moves)
+            if entry is not None:
+                column, score = entry
+                result = describe(column, score, 0, moves)
+                result["source"] = "book"
+                self._count("book")
+                callback(result)
+                return
+
+        key, mirrored = canonical_key(current, mask)
+        entry = self.cache.get(key)
+        if entry is not None:
+            self._count("cache")
+            callback(self._result(entry, mirrored, moves, "cache"))
+            return
+
+        if self.executor is None:
+            self._count("rejected")
+            callback(None)
+            return
+
+        with self.lock:
+            waiting = self.pending.get(key)
+            if waiting is not None:
+                waiting.append((mirrored, callback))
+                source = "shared"
+            elif len(self.pending) >= self.max_pending:
+                source = "rejected"
+            else:
+                self.pending[key] = [(mirrored, callback)]
+                source = "search"
+        self._count(source)
+        if source == "rejected":
+            callback(None)
+        if source != "search":
+            return
+
+        future = self.executor.submit(_search, current, mask, moves, self.time_budget)
+        future.add_done_callback(lambda done: self._finish(done, key, mirrored, moves))
+
+    def _finish(self, future, key, mirrored, moves):
+        """Range le résultat d'une recherche et répond à toutes les demandes qui l'attendaient"""
+        try:
+            column, score, depth = future.result()
+        except Exception as e:
+            print(f"Erreur d'analyse: {e}")
+            entry = None
+        else:
+            # Colonne rangée dans l'orientation de la position canonique
+            if mirrored and column is not None:
+                column = COLS - 1 - column
+            entry = (column, score, depth)
+            self.cache.put(key, entry)
+
+        with self.lock:
+            waiting = self.pending.pop(key, ())
+        for waiter_mirrored, callback in waiting:
+            callback(None if entry is None else self._result(entry, waiter_mirrored, moves, "search"))
+
+    @staticmethod
+    def _result(entry, mirrored, moves, source):
+        column, score, depth = entry
+        if mirrored and column is not None:
+            column = COLS - 1 - column
+        result = describe(column, score, depth, moves)
+        result["source"] = source
+        return result
+
+    def pending_count(self):
+        return len(self.pending)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def board_position(board, player=None):
+    """(current, mask, moves) d'un plateau reçu d'un client, None s'il est invalide
+
+    Sans player, le joueur qui doit jouer est déduit du nombre de pions.
+    """
+    if (
+        not isinstance(board, list) or len(board) != ROWS
+        or any(not isinstance(row, list) or len(row) != COLS for row in board)
+        or any(cell not in (0, 1, 2) for row in board for cell in row)
+    ):
+        return None
+    if player is None:
+        ones = sum(row.count(1) for row in board)
+        player = 1 if ones == sum(row.count(2) for row in board) else 2
+    if player not in (1, 2):
+        return None
+    current, mask, moves = from_board(board, player)
+    if not is_valid_position(current, mask, moves):
+        return None
+    return current, mask, moves
@@ -0,0 +1,179 @@
+"""
+Serveur de jeu Puissance 4 sur une boucle d'événements asyncio
+
+Même protocole et même logique de jeu que GameServer, mais chaque connexion
+est une coroutine au lieu d'un thread système : des milliers de joueurs
+inactifs dans le lobby ne coûtent qu'un StreamReader/StreamWriter chacun.
+"""
+import asyncio
+import threading
+import time
+
+from shared.protocol import Protocol
+from shared.framing import FrameBuffer
+from server import GameServer, FULL_FRAME, REFUSE_LINGER
+from connection import OutboundQueue, DEFAULT_MAX_QUEUED_BYTES, DEFAULT_STALL_TIMEOUT
+
+
+class StreamConnection(OutboundQueue):
+    """File d'envoi d'un client vidée par une tâche d'écriture dédiée
+
+    Tant que le transport du client est saturé (drain en attente), les
+    nouvelles trames restent dans la file où elles peuvent être fusionnées.
+    """
+
+    def __init__(self, writer, on_evict, max_queued_bytes=DEFAULT_MAX_QUEUED_BYTES,
+                 stall_timeout=DEFAULT_STALL_TIMEOUT):
+        super().__init__(on_evict, max_queued_bytes, stall_timeout)
+        self.writer = writer
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.ready = asyncio.Event()
+        self.draining = False
+
+    def flush(self):
+        """Réveille la tâche d'écriture (depuis n'importe quel thread)"""
+        if threading.get_ident() == self.loop_thread:
+            self.ready.set()
+        else:
+            self.loop.call_soon_threadsafe(self.ready.set)
+
+    def defer_eviction(self, reason):
+        """Évince depuis la boucle, une fois l'appelant sorti de ses verrous"""
+        self.loop.call_soon_threadsafe(self.on_evict, self, reason)
+
+    def is_backlogged(self):
+        return self.draining or bool(self.frames)
+
+    async def write_loop(self):
+        """Vide la file vers le transport en respectant sa contre-pression"""
+        while not self.closed:
+            await self.ready.wait()
+            self.ready.clear()
+
+            # Les trames confiées au transport ne peuvent plus être fusionnées
+            with self.lock:
+                frames = [frame for frame, _ in self.frames]
+                self.frames.clear()
+                self.queued_bytes = 0
+            if not frames:
+                continue
+
+            self.draining = True
+            self.writer.writelines(frames)
+            try:
+                await asyncio.wait_for(self.writer.drain(), self.stall_timeout)
+            except asyncio.TimeoutError:
+                with self.lock:
+                    self.evicted = True
+                self.on_evict(self, "client bloqué")
+                return
+            except ConnectionError:
+                self.write_errors += 1
+                return
+            self.draining = False
+            self.last_progress = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.frames.clear()
+            self.queued_bytes = 0
+        self.ready.set()
+        self.writer.close()
+
+
+class AsyncGameServer(GameServer):
+    # Partage du port d'écoute entre plusieurs processus (mode processes)
+    reuse_port = False
+
+    def __init__(self, *args, journal_sync=False, **options):
+        # Seul le défaut change : attendre le disque bloquerait toute la boucle
+        super().__init__(*args, journal_sync=journal_sync, **options)
+
+    def start(self):
+        """Démarre le serveur et bloque sur la boucle d'événements"""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+
+    async def serve(self):
+        """Écoute les connexions entrantes sur la boucle courante"""
+        self.server_socket = await asyncio.start_server(
+            self.handle_connection,
+            self.host,
+            self.port,
+            reuse_address=True,
+            reuse_port=self.reuse_port or None,
+            backlog=self.backlog
+        )
+
+        print(f"🎮 Serveur Puissance 4 (asyncio) démarré sur {self.host}:{self.port}")
+        self.start_services()
+
+        async with self.server_socket:
+            await self.server_socket.serve_forever()
+
+    def start_timers(self):
+        """Fait avancer la roue des échéances sur la boucle : les callbacks n'ont pas de concurrence"""
+        self.timers_task = asyncio.get_running_loop().create_task(self.drive_timers())
+
+    async def drive_timers(self):
+        while True:
+            await asyncio.sleep(self.timers.tick)
+            self.timers.advance()
+
+    async def handle_connection(self, reader, writer):
+        """Coroutine gérant la communication avec un client"""
+        address = writer.get_extra_info("peername")
+        if not self.open_slot():
+            self.metrics.inc("connections_refused_total")
+            writer.write(FULL_FRAME)
+            writer.write_eof()
+            self.timers.schedule(REFUSE_LINGER, writer.close)
+            return
+        print(f"📡 Nouvelle connexion depuis {address}")
+
+        connection = StreamConnection(
+            writer, self.evict_connection, self.max_queued_bytes, self.stall_timeout
+        )
+        write_task = asyncio.create_task(connection.write_loop())
+        self.watch_connection(connection)
+        player_id = None
+        frames = FrameBuffer(self.max_frame_size)
+
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                connection.last_received = time.monotonic()
+                self.metrics.inc("bytes_in_total", value=len(data))
+
+                # Traite toutes les trames complètes (JSON ou binaires) reçues
+                for message in frames.feed(data):
+                    msg_type, msg_data, session = Protocol.decode_session(message)
+
+                    if not self.admit_message(connection, session, msg_type):
+                        continue
+
+                    if session is not None:
+                        self.handle_session_message(connection, session, msg_type, msg_data)
+                        continue
+
+                    if msg_type == Protocol.DISCONNECT:
+                        return
+
+                    player_id = self.handle_message(connection, player_id, msg_type, msg_data)
+
+        except Exception as e:
+            print(f"Erreur avec le client {address}: {e}")
+
+        finally:
+            self.release_connection(connection)
+            connection.close()
+            write_task.cancel()
+            self.close_slot()
+            if connection.write_errors:
+                self.metrics.inc("send_errors_total", "write_failed", connection.write_errors)
@@ -0,0 +1,122 @@
+"""
+Moteur Puissance 4 vectorisé
+
+BatchGame tient des milliers de plateaux dans des tableaux NumPy, avec la
+même représentation que Connect4Game (deux bitboards par plateau, ROWS + 1
+bits par colonne) : un appel à play() joue un coup sur chaque plateau en une
+seule série d'opérations sur les tableaux.
+
+Sert hors du serveur : parties aléatoires en masse, évaluation des joueurs
+automatiques, revalidation de parties archivées. Les résultats sont
+identiques à ceux de Connect4Game.play_move (voir tools/check_batch_engine.py).
+"""
+import numpy as np
+
+from game import ROWS, COLS, COLUMN_BITS, WIN_SHIFTS
+
+# Index du bit du bas de chaque colonne, et index de sa sentinelle (colonne pleine)
+_BOTTOM = np.arange(COLS, dtype=np.int64) * COLUMN_BITS
+_TOP = _BOTTOM + ROWS
+
+_ONE = np.uint64(1)
+
+
+class BatchGame:
+    def __init__(self, size):
+        self.size = size
+        # bitboards[0] : pions du joueur 1, bitboards[1] : pions du joueur 2
+        self.bitboards = np.zeros((2, size), dtype=np.uint64)
+        # Index du prochain bit libre de chaque colonne de chaque plateau
+        self.heights = np.tile(_BOTTOM, (size, 1))
+        self.current_player = np.ones(size, dtype=np.int8)
+        self.winner = np.zeros(size, dtype=np.int8)  # 0 tant qu'il n'y a pas de gagnant
+        self.game_over = np.zeros(size, dtype=bool)
+        self.moves = np.zeros(size, dtype=np.int16)
+        self._rows = np.arange(size)
+
+    def legal_moves(self):
+        """Tableau (size, COLS) : colonnes jouables de chaque plateau (aucune si partie finie)"""
+        return (self.heights != _TOP) & ~self.game_over[:, None]
+
+    def play(self, columns):
+        """Joue columns[i] sur le plateau i
+
+        Retourne les tableaux (valid, won, draw) : coup accepté, coup gagnant,
+        coup remplissant le plateau sans gagnant. Un coup refusé (partie finie,
+        colonne invalide ou pleine) ne modifie pas son plateau, comme
+        Connect4Game.play_move.
+        """
+        columns = np.asarray(columns, dtype=np.int64)
+        in_range = (columns >= 0) & (columns < COLS)
+        safe_columns = np.where(in_range, columns, 0)
+
+        index = self.heights[self._rows, safe_columns]
+        valid = in_range & ~self.game_over & (index != _TOP[safe_columns])
+        rows = self._rows[valid]
+        index = index[valid]
+
+        self.heights[rows, safe_columns[valid]] = index + 1
+        self.moves[rows] += 1
+        player = self.current_player[rows].astype(np.int64) - 1
+        bitboard = self.bitboards[player, rows] | (_ONE << index.astype(np.uint64))
+        self.bitboards[player, rows] = bitboard
+
+        won_valid = _check_win(bitboard)
+        draw_valid = ~won_valid & (self.moves[rows] == ROWS * COLS)
+
+        self.winner[rows[won_valid]] = self.current_player[rows[won_valid]]
+        self.game_over[rows[won_valid | draw_valid]] = True
+        switching = rows[~(won_valid | draw_valid)]
+        self.current_player[switching] = 3 - self.current_player[switching]
+
+        won = np.zeros(self.size, dtype=bool)
+        draw = np.zeros(self.size, dtype=bool)
+        won[rows] = won_valid
+        draw[rows] = draw_valid
+        return valid, won, draw
+
+    def random_moves(self, rng):
+        """Une colonne jouable tirée au hasard par plateau (-1 si la partie est finie)"""
+        legal = self.legal_moves()
+        # Clés aléatoires, -1 pour les colonnes injouables : l'argmax choisit une colonne jouable
+        keys = np.where(legal, rng.random(legal.shape), -1.0)
+        return np.where(legal.any(axis=1), keys.argmax(axis=1), -1)
+
+    def playout(self, rng):
+        """Joue des coups aléatoires jusqu'à la fin de toutes les parties ; retourne winner"""
+        while not self.game_over.all():
+            self.play(self.random_moves(rng))
+        return self.winner
+
+
+def _check_win(bitboards):
+    """Vrai pour chaque bitboard contenant quatre pions alignés"""
+    won = np.zeros(bitboards.shape, dtype=bool)
+    for shift in WIN_SHIFTS:
+        shift = np.uint64(shift)
+        pairs = bitboards & (bitboards >> shift)
+        won |= (pairs & (pairs >> (shift + shift))) != 0
+    return won
+
+
+def replay(sequences):
+    """Rejoue des parties archivées (listes de colonnes) en parallèle
+
+    Retourne (winner, moves, first_invalid) : gagnant de chaque partie (0 si
+    aucun), coups acceptés et index du premier coup refusé (-1 si aucun).
+    Les coups suivant un coup refusé sont ignorés.
+    """
+    batch = BatchGame(len(sequences))
+    length = max((len(sequence) for sequence in sequences), default=0)
+    # Colonnes des parties, -1 au-delà de leur fin
+    columns = np.full((len(sequences), length), -1, dtype=np.int64)
+    for row, sequence in enumerate(sequences):
+        columns[row, :len(sequence)] = sequence
+    ended = np.array([len(sequence) for sequence in sequences])
+
+    first_invalid = np.full(len(sequences), -1, dtype=np.int64)
+    for turn in range(length):
+        playing = (turn < ended) & (first_invalid < 0)
+        valid, _, _ = batch.play(np.where(playing, columns[:, turn], -1))
+        first_invalid[playing & ~valid] = turn
+    return batch.winner, batch.moves, first_invalid
@@ -0,0 +1,103 @@
+"""
+Diffusion des parties aux spectateurs
+
+handle_move ne fait que déposer la mise à jour dans la file du Broadcaster
+(une opération en temps constant, quel que soit le nombre de spectateurs) ;
+le thread de diffusion l'encode une seule fois par format et remet les mêmes
+octets à chaque spectateur. Un spectateur lent ne retarde donc ni les deux
+joueurs ni les autres spectateurs : ses mises à jour en retard sont
+remplacées par le plateau complet, et il est évincé si sa file déborde.
+
+Une seule file pour toutes les parties : les messages d'une même partie
+sont diffusés dans l'ordre où ils ont été publiés.
+"""
+import queue
+import threading
+import time
+
+
+class Audience:
+    """Spectateurs d'une partie, immuable : remplacée à chaque arrivée ou départ
+
+    Le thread de diffusion peut ainsi parcourir une audience publiée sans
+    verrou pendant que le serveur en construit une nouvelle.
+    """
+
+    __slots__ = ("members",)
+
+    def __init__(self, members=()):
+        self.members = tuple(members)  # ((player_id, connexion, protocole, deltas acceptés), ...)
+
+    def __len__(self):
+        return len(self.members)
+
+    def with_member(self, player_id, connection, protocol, delta):
+        return Audience(self.without(player_id).members + ((player_id, connection, protocol, delta),))
+
+    def without(self, player_id):
+        return Audience(member for member in self.members if member[0] != player_id)
+
+    def player_ids(self):
+        return [member[0] for member in self.members]
+
+
+class Broadcaster:
+    """Thread envoyant les messages publiés à une audience"""
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.run, name="broadcaster", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def publish(self, audience, msg_type, data, full=None, coalesce_key=None):
+        """Dépose un message pour toute une audience, sans encoder ni envoyer
+
+        full est l'équivalent complet d'une mise à jour incrémentale data : il
+        est envoyé (et remplace les mises à jour en attente de coalesce_key)
+        aux spectateurs sans deltas ou en retard.
+        """
+        if audience:
+            self.queue.put((audience, msg_type, data, full, coalesce_key))
+
+    def run(self):
+        while True:
+            audience, msg_type, data, full, coalesce_key = self.queue.get()
+            started = time.perf_counter()
+            self.deliver(audience, msg_type, data, full, coalesce_key)
+            if self.metrics is not None:
+                self.metrics.observe("broadcast_seconds", time.perf_counter() - started)
+
+    def deliver(self, audience, msg_type, data, full, coalesce_key):
+        # Au plus une trame par format et par variante (incrémentale ou complète)
+        encoded = {}
+        sent = sent_bytes = dropped = 0
+        for _, connection, protocol, delta in audience.members:
+            if full is not None and (not delta or connection.is_backlogged()):
+                payload = full
+            else:
+                payload = data
+            # Un plateau complet remplace les mises à jour de la partie encore en file
+            supersede = payload is full
+            key = (protocol, supersede)
+            frame = encoded.get(key)
+            if frame is None:
+                frame = encoded[key] = protocol.encode(msg_type, payload)
+            if protocol.session is None or coalesce_key is None:
+                size = connection.send(frame, coalesce_key, supersede)
+            else:
+                # Spectateur multiplexé : clé de fusion propre à sa session
+                size = connection.send(frame, (coalesce_key, protocol.session), supersede)
+            if size:
+                sent += 1
+                sent_bytes += size
+            else:
+                dropped += 1
+
+        if self.metrics is not None:
+            self.metrics.inc("messages_out_total", msg_type, sent)
+            self.metrics.inc("bytes_out_total", value=sent_bytes)
+            if dropped:
+                self.metrics.inc("send_errors_total", "dropped", dropped)
@@ -0,0 +1,441 @@
+"""
+Mode multi-processus : un serveur asyncio par cœur
+
+Chaque processus worker est un ShardServer qui écoute sur le même port
+(SO_REUSEPORT : le noyau répartit les connexions entrantes) et gère seul ses
+joueurs et ses parties, sans partager de GIL avec les autres. Le processus
+principal n'accepte aucune connexion : il relaie les messages entre workers
+(Hub) via un tube multiprocessing par worker.
+
+L'identifiant d'un joueur contient le numéro de son worker (player_12@3),
+ce qui suffit pour router un message vers lui. Ce qui traverse les shards :
+- le lobby : chaque worker publie l'arrivée et le départ de ses joueurs
+  libres, les autres les répliquent dans leur LobbyIndex ; LIST_PLAYERS
+  reste une lecture locale
+- les défis : CHALLENGE, CHALLENGE_REFUSED et CHALLENGE_ACCEPTED sont
+  transmis au worker du joueur concerné
+- les parties mixtes : la partie est hébergée par le worker du joueur qui
+  accepte. Le challenger y est représenté par un joueur « distant » dont la
+  connexion (RemoteConnection) renvoie les trames déjà encodées vers son
+  worker ; ses PLAY_MOVE, RESYNC et HINT sont relayés dans l'autre sens.
+
+Le classement est commun : chaque worker en tient une copie, et le résultat
+classé d'une partie passe par le hub qui le remet à tous les workers,
+l'hébergeur compris, dans le même ordre. Les copies restent identiques et
+seul le worker 0 écrit le fichier de classement.
+
+La file d'appariement et les tournois restent propres à chaque worker.
+"""
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+from multiprocessing.connection import wait
+from pathlib import Path
+
+from shared.protocol import Protocol, BinaryProtocol, SessionProtocol
+from async_server import AsyncGameServer
+from lobby import LobbyIndex
+from records import PlayerSession
+
+# Marqueur de partie hébergée par un autre worker (player.game_id)
+REMOTE_GAME = "remote"
+
+# Messages d'un joueur en partie distante relayés vers le worker hôte
+_FORWARDED_TYPES = frozenset({Protocol.PLAY_MOVE, Protocol.RESYNC, Protocol.HINT})
+
+
+def shard_of(player_id):
+    """Numéro du worker propriétaire d'un joueur (None pour un identifiant inconnu)"""
+    _, separator, shard = str(player_id).rpartition("@")
+    if not separator or not shard.isdigit():
+        return None
+    return int(shard)
+
+
+class ShardLobby(LobbyIndex):
+    """Index du lobby répliqué : les changements locaux sont publiés aux autres workers"""
+
+    def __init__(self, publish):
+        super().__init__()
+        self.publish = publish
+
+    def add(self, player_id, name):
+        if player_id not in self:
+            super().add(player_id, name)
+            self.publish(("lobby_add", player_id, name))
+
+    def remove(self, player_id):
+        if player_id in self:
+            super().remove(player_id)
+            self.publish(("lobby_remove", player_id))
+
+    def apply(self, action, player_id, name=None):
+        """Applique un changement publié par un autre worker, sans le republier"""
+        if action == "lobby_add":
+            LobbyIndex.add(self, player_id, name)
+        else:
+            LobbyIndex.remove(self, player_id)
+
+
+class RemoteConnection:
+    """Connexion d'un joueur distant : les trames partent vers son worker"""
+
+    def __init__(self, server, player_id):
+        self.server = server
+        self.player_id = player_id
+
+    def send(self, data, coalesce_key=None, supersede=False, flush=True):
+        # La clé de fusion (objet partie, avec la session d'un joueur multiplexé)
+        # n'est pas transmissible : son hash, stable pendant la partie, la remplace
+        key = None if coalesce_key is None else hash(coalesce_key)
+        self.server.post_to_player(self.player_id, ("frame", self.player_id, data, key, supersede))
+        return len(data)
+
+    def is_backlogged(self):
+        return False
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ShardServer(AsyncGameServer):
+    reuse_port = True
+    # Un processus démon ne peut pas avoir d'enfants : l'analyse tourne dans des
+    # threads du worker, déjà un par cœur
+    analysis_processes = False
+    # Classement commun à tous les workers (sinon propre à chacun, avec son fichier)
+    shared_ratings = True
+
+    def __init__(self, shard, pipe, **options):
+        # Un fichier de métriques par worker : metrics.prom -> metrics-0.prom
+        suffixed = ("metrics_file",) if self.shared_ratings else ("metrics_file", "ratings_file")
+        for option in suffixed:
+            if options.get(option):
+                path = Path(options[option])
+                options[option] = str(path.with_name(f"{path.stem}-{shard}{path.suffix}"))
+        super().__init__(**options)
+        self.shard = shard
+        self.pipe = pipe
+        self.pipe_lock = threading.Lock()
+        self.lobby = ShardLobby(self.publish)
+        if self.shared_ratings and shard != 0:
+            # Relu au démarrage comme les autres, mais seul le worker 0 écrit le fichier
+            self.ratings.path = None
+
+    # --- Identifiants ---
+
+    def _new_player_id(self):
+        self.player_counter += 1
+        return f"player_{self.player_counter}@{self.shard}"
+
+    def _new_game_id(self):
+        self.game_counter += 1
+        return f"game_{self.game_counter}@{self.shard}"
+
+    def _is_remote(self, player_id):
+        shard = shard_of(player_id)
+        return shard is not None and shard != self.shard
+
+    # --- Communication avec le hub ---
+
+    def publish(self, message):
+        """Envoie un message à tous les autres workers"""
+        self._post(("all", self.shard, message))
+
+    def publish_to_each(self, message):
+        """Envoie un message à tous les workers, celui-ci compris, dans l'ordre du hub"""
+        self._post(("each", self.shard, message))
+
+    def post_to_player(self, player_id, message):
+        """Envoie un message au worker propriétaire d'un joueur"""
+        self._post(("to", shard_of(player_id), message))
+
+    def _post(self, envelope):
+        with self.pipe_lock:
+            self.pipe.send(envelope)
+
+    async def serve(self):
+        asyncio.get_running_loop().add_reader(self.pipe.fileno(), self._on_pipe_readable)
+        await super().serve()
+
+    def _on_pipe_readable(self):
+        while self.pipe.poll():
+            try:
+                message = self.pipe.recv()
+            except EOFError:
+                # Le hub a disparu : le worker n'a plus de raison de tourner
+                os._exit(1)
+            try:
+                self.handle_shard_message(message)
+            except Exception as e:
+                print(f"Erreur sur un message inter-workers {message[0]}: {e}")
+
+    def handle_shard_message(self, message):
+        """Traite un message venu d'un autre worker"""
+        action = message[0]
+
+        if action in ("lobby_add", "lobby_remove"):
+            with self.lock:
+                self.lobby.apply(*message)
+
+        elif action == "rated":
+            _, name1, name2, score1 = message
+            self.ratings.record(name1, name2, score1)
+
+        elif action == "frame":
+            _, player_id, frame, coalesce_key, supersede = message
+            with self.lock:
+                player = self.players.get(player_id)
+            if player is not None:
+                player.connection.send(frame, coalesce_key, supersede)
+
+        elif action == "challenge":
+            self._receive_challenge(*message[1:])
+
+        elif action == "refused":
+            _, challenger_id, refuser_name = message
+            self.send_message(
+                challenger_id, Protocol.CHALLENGE_REFUSED, {"message": f"{refuser_name} a refusé le défi"}
+            )
+
+        elif action == "error":
+            _, player_id, text = message
+            self.send_message(player_id, Protocol.ERROR, {"message": text})
+
+        elif action == "reserve":
+            self._reserve_for_remote_game(*message[1:])
+
+        elif action == "reserved":
+            self._start_remote_game(*message[1:])
+
+        elif action == "released":
+            _, player_id = message
+            with self.lock:
+                player = self.players.get(player_id)
+                if player is not None and player.remote_shard is not None:
+                    player.remote_shard = None
+                    self._set_in_game(player_id, None)
+
+        elif action == "client":
+            _, player_id, msg_type, msg_data = message
+            with self.lock:
+                player = self.players.get(player_id)
+            if player is not None and player.remote:
+                self.handle_message(player.connection, player_id, msg_type, msg_data)
+
+        elif action == "client_gone":
+            _, player_id = message
+            with self.lock:
+                player = self.players.get(player_id)
+            if player is not None and player.remote:
+                self.disconnect_player(player_id)
+
+    # --- Défis entre workers ---
+
+    def handle_message(self, connection, player_id, msg_type, msg_data, session=None):
+        if msg_type in _FORWARDED_TYPES:
+            with self.lock:
+                player = self.players.get(player_id)
+                host_shard = player.remote_shard if player else None
+            if host_shard is not None:
+                self._post(("to", host_shard, ("client", player_id, msg_type, msg_data)))
+                return player_id
+        return super().handle_message(connection, player_id, msg_type, msg_data, session)
+
+    def handle_challenge(self, challenger_id, data):
+        opponent_id = data.get("opponent_id")
+        if not self._is_remote(opponent_id):
+            return super().handle_challenge(challenger_id, data)
+
+        with self.lock:
+            available = self._is_available(challenger_id)
+            challenger_name = self.players[challenger_id].name if available else None
+        if available:
+            self.post_to_player(opponent_id, ("challenge", challenger_id, challenger_name, opponent_id))
+        else:
+            self.send_message(challenger_id, Protocol.ERROR, {"message": "Joueur non disponible"})
+
+    def _receive_challenge(self, challenger_id, challenger_name, opponent_id):
+        """Défi d'un joueur d'un autre worker vers un joueur local"""
+        with self.lock:
+            available = self._is_available(opponent_id)
+        if available:
+            self.send_message(
+                opponent_id,
+                Protocol.CHALLENGE_RECEIVED,
+                {"challenger_id": challenger_id, "challenger_name": challenger_name}
+            )
+        else:
+            self.post_to_player(challenger_id, ("error", challenger_id, "Joueur non disponible"))
+
+    def handle_challenge_refused(self, challenger_id, refuser_id):
+        if not self._is_remote(challenger_id):
+            return super().handle_challenge_refused(challenger_id, refuser_id)
+        with self.lock:
+            player = self.players.get(refuser_id)
+            refuser_name = player.name if player else refuser_id
+        self.post_to_player(challenger_id, ("refused", challenger_id, refuser_name))
+
+    def start_game(self, player1_id, player2_id):
+        """Avec un challenger distant, le réserve d'abord auprès de son worker"""
+        if not self._is_remote(player1_id):
+            return super().start_game(player1_id, player2_id)
+        self.post_to_player(player1_id, ("reserve", player1_id, player2_id, self.shard))
+
+    def _reserve_for_remote_game(self, player_id, opponent_id, host_shard):
+        """Marque un joueur local en jeu pour une partie hébergée par host_shard"""
+        with self.lock:
+            if self._is_available(player_id):
+                player = self.players[player_id]
+                self._set_in_game(player_id, REMOTE_GAME)
+                player.remote_shard = host_shard
+                reply = (
+                    "reserved", player_id, opponent_id, player.name, sorted(player.features),
+                    player.protocol.session
+                )
+            else:
+                reply = ("error", opponent_id, "Joueur non disponible")
+        self._post(("to", host_shard, reply))
+
+    def _start_remote_game(self, remote_id, local_id, remote_name, remote_features, remote_session):
+        """Démarre une partie entre un joueur distant réservé et un joueur local
+
+        Les trames d'un joueur distant multiplexé sont encodées ici avec sa session.
+        """
+        outbox = []
+        game_id = None
+
+        with self.lock:
+            if self._is_available(local_id):
+                features = frozenset(remote_features)
+                protocol = BinaryProtocol if Protocol.FEATURE_BINARY in features else Protocol
+                if remote_session is not None:
+                    protocol = SessionProtocol(protocol, remote_session)
+                self.players[remote_id] = PlayerSession(
+                    RemoteConnection(self, remote_id), remote_name, features, protocol, remote=True
+                )
+                game_id = self._create_game(outbox, remote_id, local_id)
+            else:
+                # Le joueur local a commencé une autre partie entre-temps
+                self.post_to_player(remote_id, ("released", remote_id))
+                self.queue_message(outbox, local_id, Protocol.ERROR, {"message": "Joueur non disponible"})
+
+        self.send_all(outbox)
+        if game_id:
+            self.send_game_update(game_id)
+
+    # --- Classement ---
+
+    def record_rating(self, name1, name2, score1):
+        if not self.shared_ratings:
+            return super().record_rating(name1, name2, score1)
+        # Appliqué au retour du hub, comme sur les autres workers
+        self.publish_to_each(("rated", name1, name2, score1))
+
+    # --- État des joueurs ---
+
+    def _set_in_game(self, player_id, game_id):
+        player = self.players[player_id]
+        if not player.remote:
+            return super()._set_in_game(player_id, game_id)
+
+        if game_id:
+            player.game_id = game_id
+        else:
+            # Fin de partie : le joueur redevient libre sur son propre worker
+            del self.players[player_id]
+            self.post_to_player(player_id, ("released", player_id))
+
+    def disconnect_player(self, player_id):
+        with self.lock:
+            player = self.players.get(player_id)
+            host_shard = player.remote_shard if player else None
+        if host_shard is not None:
+            self._post(("to", host_shard, ("client_gone", player_id)))
+        super().disconnect_player(player_id)
+
+
+class Hub:
+    """Relais des messages entre workers, dans le processus principal
+
+    Chaque worker a son thread d'envoi : le hub ne bloque jamais sur un
+    worker lent et continue de vider les tubes des autres.
+    """
+
+    def __init__(self, pipes):
+        self.pipes = pipes
+        self.outboxes = [queue.SimpleQueue() for _ in pipes]
+        for shard, pipe in enumerate(pipes):
+            threading.Thread(target=self._sender, args=(pipe, self.outboxes[shard]), daemon=True).start()
+
+    def _sender(self, pipe, outbox):
+        while True:
+            message = outbox.get()
+            try:
+                pipe.send(message)
+            except (BrokenPipeError, OSError):
+                return
+
+    def run(self):
+        pipes = list(self.pipes)
+        while pipes:
+            for pipe in wait(pipes):
+                try:
+                    envelope = pipe.recv()
+                except EOFError:
+                    pipes.remove(pipe)
+                    continue
+
+                if envelope[0] == "to":
+                    _, shard, message = envelope
+                    if shard is not None and 0 <= shard < len(self.outboxes):
+                        self.outboxes[shard].put(message)
+                else:
+                    kind, source, message = envelope
+                    for shard, outbox in enumerate(self.outboxes):
+                        if shard != source or kind == "each":
+                            outbox.put(message)
+
+
+def _worker_main(shard, pipe, options, inherited):
+    # Les extrémités hub des workers précédents, héritées au fork, empêcheraient
+    # de détecter la fin du hub
+    for other in inherited:
+        other.close()
+    server = ShardServer(shard, pipe, **options)
+    server.start()
+
+
+def run_cluster(options, workers=None):
+    """Démarre workers processus ShardServer et relaie leurs messages jusqu'à l'arrêt"""
+    workers = workers or os.cpu_count() or 1
+    hub_ends = []
+    processes = []
+    for shard in range(workers):
+        hub_end, worker_end = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_worker_main, args=(shard, worker_end, options, list(hub_ends)),
+            name=f"shard-{shard}", daemon=True
+        )
+        process.start()
+        worker_end.close()
+        hub_ends.append(hub_end)
+        processes.append(process)
+
+    print(f"🧩 {workers} workers démarrés sur le port {options.get('port')}")
+    # Un SIGTERM (docker stop) arrête aussi les workers
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        Hub(hub_ends).run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
@@ -0,0 +1,302 @@
+"""
+Connexions clients avec file d'envoi bornée
+
+Les handlers du serveur n'écrivent jamais directement sur un socket : ils
+déposent des trames dans la file de la connexion du destinataire. La file
+est vidée sans bloquer (MSG_DONTWAIT + sendmsg vectorisé) par le thread
+producteur quand le socket a de la place, sinon par un unique thread
+OutboundWriter qui surveille tous les sockets en retard via un selector.
+
+Un client lent ne ralentit donc jamais les autres : ses GAME_UPDATE en
+attente sont fusionnés, et s'il reste bloqué trop longtemps ou dépasse la
+taille maximale de sa file, il est évincé (callback on_evict du serveur).
+L'éviction n'est jamais exécutée par l'appelant de send, qui peut tenir les
+verrous du serveur : elle est confiée au thread d'écriture (ou à la boucle
+d'événements en mode asyncio).
+"""
+import abc
+import collections
+import itertools
+import selectors
+import socket
+import threading
+import time
+
+# Envoi non bloquant sur un socket bloquant (le thread de réception reste en recv bloquant)
+SEND_FLAGS = getattr(socket, "MSG_DONTWAIT", 0)
+
+# Nombre maximal de trames passées en un seul appel sendmsg
+MAX_IOVEC = 64
+
+DEFAULT_MAX_QUEUED_BYTES = 1024 * 1024
+DEFAULT_STALL_TIMEOUT = 10.0
+
+
+class OutboundQueue(abc.ABC):
+    """File d'envoi bornée avec fusion des trames obsolètes
+
+    Chaque trame peut porter une clé de fusion : une trame envoyée avec
+    supersede=True remplace les trames encore en attente ayant la même clé
+    (par exemple un plateau complet rend inutiles les mises à jour précédentes
+    de la même partie).
+    """
+
+    def __init__(self, on_evict, max_queued_bytes=DEFAULT_MAX_QUEUED_BYTES,
+                 stall_timeout=DEFAULT_STALL_TIMEOUT):
+        self.on_evict = on_evict
+        self.max_queued_bytes = max_queued_bytes
+        self.stall_timeout = stall_timeout
+        self.player_id = None  # Joueur enregistré sans identifiant de session
+        self.sessions = {}  # {identifiant de session: player_id} des joueurs multiplexés
+        self.rate_limit = None  # RateLimiter de la connexion, traversé par tous ses messages
+        self.rate_limits = {}  # {identifiant de session enregistrée: RateLimiter}
+        self.frames = collections.deque()  # [(trame, clé de fusion)]
+        self.queued_bytes = 0
+        self.head_offset = 0  # Octets déjà envoyés de la première trame
+        self.last_progress = time.monotonic()
+        self.last_received = self.last_progress  # Dernière réception du client (contrôle d'inactivité)
+        self.closed = False
+        self.evicted = False
+        self.write_errors = 0  # Échecs d'écriture sur le socket (lus par les métriques)
+        self.lock = threading.Lock()
+
+    def player_ids(self):
+        """Joueurs portés par la connexion, multiplexés compris"""
+        player_ids = list(self.sessions.values())
+        if self.player_id:
+            player_ids.insert(0, self.player_id)
+        return player_ids
+
+    def is_backlogged(self):
+        """Vrai si des trames attendent encore d'être envoyées"""
+        return bool(self.frames)
+
+    def is_stalled(self, now):
+        """Vrai si des trames attendent sans progrès depuis plus de stall_timeout"""
+        return bool(self.frames) and now - self.last_progress > self.stall_timeout
+
+    def send(self, data, coalesce_key=None, supersede=False, flush=True):
+        """Met une trame en file d'envoi sans jamais bloquer l'appelant
+
+        Retourne le nombre d'octets mis en file (0 si la connexion est fermée
+        ou vient d'être évincée pour dépassement de sa file). L'éviction est
+        différée : send peut être appelé verrou du serveur tenu.
+        """
+        with self.lock:
+            if self.closed or self.evicted:
+                return 0
+
+            if supersede and coalesce_key is not None:
+                self._drop_superseded(coalesce_key)
+
+            overflow = self.queued_bytes + len(data) > self.max_queued_bytes
+            if overflow:
+                self.evicted = True
+            else:
+                if not self.frames:
+                    self.last_progress = time.monotonic()
+                self.frames.append((data, coalesce_key))
+                self.queued_bytes += len(data)
+
+        if overflow:
+            self.defer_eviction("file d'envoi pleine")
+            return 0
+
+        if flush:
+            self.flush()
+        return len(data)
+
+    def _drop_superseded(self, coalesce_key):
+        """Retire les trames en attente portant la clé, verrou tenu
+
+        Une trame dont l'envoi a déjà commencé est conservée.
+        """
+        kept = collections.deque()
+        for index, (frame, key) in enumerate(self.frames):
+            if key == coalesce_key and not (index == 0 and self.head_offset):
+                self.queued_bytes -= len(frame)
+            else:
+                kept.append((frame, key))
+        self.frames = kept
+
+    def _consume(self, sent):
+        """Retire de la file les octets envoyés, verrou tenu"""
+        self.queued_bytes -= sent
+        sent += self.head_offset
+        self.head_offset = 0
+        while sent:
+            frame_size = len(self.frames[0][0])
+            if sent < frame_size:
+                self.head_offset = sent
+                break
+            sent -= frame_size
+            self.frames.popleft()
+        self.last_progress = time.monotonic()
+
+    @abc.abstractmethod
+    def flush(self):
+        """Lance l'écriture des trames en attente sans bloquer l'appelant"""
+
+    @abc.abstractmethod
+    def defer_eviction(self, reason):
+        """Fait appeler on_evict(self, reason) hors du contexte de l'appelant"""
+
+
+class ClientConnection(OutboundQueue):
+    """Socket client (mode threads) et sa file d'envoi"""
+
+    def __init__(self, sock, writer, on_evict, max_queued_bytes=DEFAULT_MAX_QUEUED_BYTES,
+                 stall_timeout=DEFAULT_STALL_TIMEOUT):
+        super().__init__(on_evict, max_queued_bytes, stall_timeout)
+        self.sock = sock
+        self.writer = writer
+        # Les trames sont déjà regroupées par sendmsg : pas besoin de Nagle
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass
+
+    def flush(self):
+        """Écrit ce que le socket accepte ; confie le reste au thread d'écriture"""
+        if self.write_pending():
+            self.writer.watch(self)
+
+    def defer_eviction(self, reason):
+        self.writer.evict(self, reason)
+
+    def write_pending(self):
+        """Écrit sans bloquer autant de trames que possible
+
+        Retourne True s'il reste des trames en attente.
+        """
+        with self.lock:
+            while self.frames and not self.closed:
+                buffers = [frame for frame, _ in itertools.islice(self.frames, MAX_IOVEC)]
+                if self.head_offset:
+                    buffers[0] = memoryview(buffers[0])[self.head_offset:]
+                try:
+                    sent = self.sock.sendmsg(buffers, (), SEND_FLAGS)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError:
+                    # Pair déconnecté : le thread de réception s'en rendra compte
+                    self.write_errors += 1
+                    self.frames.clear()
+                    self.queued_bytes = 0
+                    self.head_offset = 0
+                    break
+                self._consume(sent)
+            return bool(self.frames) and not self.closed
+
+    def close(self):
+        """Ferme la connexion et réveille le thread bloqué en réception
+
+        Le descripteur lui-même est fermé par le thread de réception, qui le
+        possède : le fermer ici provoquerait un EBADF dans son recv.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.frames.clear()
+            self.queued_bytes = 0
+        self.writer.forget(self)
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class OutboundWriter:
+    """Thread unique vidant les files des connexions dont le socket est plein
+
+    Il surveille aussi le délai sans progrès de chaque connexion en retard
+    et évince celles qui dépassent leur stall_timeout, ainsi que celles dont
+    la file a débordé.
+    """
+
+    def __init__(self, check_interval=0.5):
+        self.check_interval = check_interval
+        self.selector = selectors.DefaultSelector()
+        self._pending = []  # [(action, connexion, motif)] traitées par le thread d'écriture
+        self._pending_lock = threading.Lock()
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._wakeup_send.setblocking(False)
+        self.selector.register(self._wakeup_recv, selectors.EVENT_READ)
+        self.thread = threading.Thread(target=self.run, name="outbound-writer", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def watch(self, connection):
+        """Demande au thread d'écriture de vider la connexion dès que possible"""
+        self._notify("watch", connection)
+
+    def forget(self, connection):
+        """Retire une connexion fermée de la surveillance"""
+        self._notify("forget", connection)
+
+    def evict(self, connection, reason):
+        """Demande au thread d'écriture d'évincer la connexion (hors de tout verrou du serveur)"""
+        self._notify("evict", connection, reason)
+
+    def _notify(self, action, connection, reason=None):
+        with self._pending_lock:
+            self._pending.append((action, connection, reason))
+        try:
+            self._wakeup_send.send(b"\0")
+        except (BlockingIOError, InterruptedError):
+            pass  # Réveil déjà en attente
+
+    def run(self):
+        while True:
+            for key, _ in self.selector.select(self.check_interval):
+                if key.fileobj is self._wakeup_recv:
+                    try:
+                        while self._wakeup_recv.recv(4096):
+                            pass
+                    except (BlockingIOError, InterruptedError):
+                        pass
+                    continue
+
+                connection = key.data
+                if not connection.write_pending():
+                    self._unregister(connection)
+
+            self._apply_pending()
+            self._evict_stalled()
+
+    def _apply_pending(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+
+        for action, connection, reason in pending:
+            if action == "forget":
+                self._unregister(connection)
+            elif action == "evict":
+                self._unregister(connection)
+                connection.on_evict(connection, reason)
+            elif connection.is_backlogged() and not connection.closed:
+                try:
+                    self.selector.register(connection.sock, selectors.EVENT_WRITE, connection)
+                except KeyError:
+                    pass  # Déjà surveillée
+                except (ValueError, OSError):
+                    pass  # Socket fermé entre-temps
+
+    def _unregister(self, connection):
+        try:
+            self.selector.unregister(connection.sock)
+        except (KeyError, ValueError):
+            pass
+
+    def _evict_stalled(self):
+        now = time.monotonic()
+        for key in list(self.selector.get_map().values()):
+            connection = key.data
+            if connection is not None and connection.is_stalled(now):
+                self._unregister(connection)
+                with connection.lock:
+                    connection.evicted = True
+                connection.on_evict(connection, "client bloqué")
@@ -0,0 +1,397 @@
+"""
+Fédération de serveurs : un lobby commun à plusieurs machines
+
+Chaque serveur fédéré est un nœud identifié par un numéro unique
+(--node-id) ; l'identifiant de ses joueurs le contient (player_12@3) comme
+en mode processes. Les nœuds sont reliés deux à deux par des liens TCP
+(--federation-port, --peer hôte:port) et reprennent le routage de
+ShardServer : un défi est transmis au nœud de l'adversaire, une partie
+entre deux nœuds est hébergée par celui du joueur qui accepte, l'autre
+joueur y étant représenté par un joueur distant.
+
+Le lobby n'est pas publié à chaque changement : les arrivées et départs des
+joueurs libres sont accumulés et envoyés toutes les PRESENCE_INTERVAL
+secondes, après fusion (un joueur entré puis sorti du lobby entre deux
+envois n'est pas transmis). Un nœud qui rejoint la fédération reçoit la
+liste complète des joueurs libres de chacun de ses pairs.
+
+Le port de fédération écoute par défaut sur localhost (--federation-host).
+Avec un secret partagé (--federation-secret), chaque nœud prouve à l'autre
+qu'il le connaît dès la présentation : il renvoie HMAC(secret, nonce du pair
+et son propre numéro), le secret lui-même ne circule jamais. Un pair qui
+échoue est déconnecté avant d'avoir pu envoyer le moindre message.
+
+Les messages d'une même itération de la boucle vers un pair partent en une
+seule écriture. À la perte d'un lien, les joueurs du pair disparaissent du
+lobby, ses joueurs en partie ici perdent par forfait et les parties
+hébergées par le pair sont déclarées interrompues.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+
+from shared.protocol import Protocol
+from shared.framing import FrameBuffer, FrameTooLarge
+from async_server import AsyncGameServer
+from cluster import ShardServer, shard_of
+from lobby import LobbyIndex
+
+DEFAULT_FEDERATION_PORT = 5556
+DEFAULT_FEDERATION_HOST = "localhost"
+# Secondes entre deux envois des changements du lobby
+PRESENCE_INTERVAL = 0.2
+# Secondes entre deux tentatives de connexion à un pair injoignable
+PEER_RETRY = 2.0
+# Délai accordé à un pair pour se présenter après la connexion
+PEER_HELLO_TIMEOUT = 5.0
+# Trame inter-serveurs la plus grande acceptée (liste complète d'un lobby)
+PEER_MAX_FRAME = 16 * 1024 * 1024
+# Octets en attente d'envoi vers un pair au-delà desquels le lien est coupé
+PEER_MAX_BUFFER = 64 * 1024 * 1024
+
+
+def parse_peer(address):
+    """'hôte:port' -> (hôte, port)"""
+    host, separator, port = address.rpartition(":")
+    if not separator or not port.isdigit():
+        raise ValueError(f"Adresse de pair invalide: {address} (attendu hôte:port)")
+    return host or "localhost", int(port)
+
+
+def encode_peer_message(message):
+    """Trame JSON d'un message inter-serveurs (les trames client sont en base64)"""
+    if message[0] == "frame":
+        message = (*message[:2], base64.b64encode(message[2]).decode("ascii"), *message[3:])
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def decode_peer_message(raw):
+    message = json.loads(raw)
+    if message[0] == "frame":
+        message[2] = base64.b64decode(message[2])
+    return message
+
+
+class FederationLobby(LobbyIndex):
+    """Index du lobby fédéré : les changements locaux sont retenus jusqu'au prochain envoi"""
+
+    def __init__(self, node):
+        super().__init__()
+        self.node = node
+        self.changes = {}  # {player_id: présent dans le lobby au dernier envoi}
+
+    def add(self, player_id, name):
+        if player_id not in self:
+            self.changes.setdefault(player_id, False)
+            super().add(player_id, name)
+
+    def remove(self, player_id):
+        if player_id in self:
+            self.changes.setdefault(player_id, True)
+            super().remove(player_id)
+
+    def take_changes(self):
+        """Changements depuis le dernier appel, fusionnés : ([(player_id, nom)] arrivés, [player_id] partis)"""
+        added = []
+        removed = []
+        for player_id, was_present in self.changes.items():
+            if player_id in self:
+                if not was_present:
+                    added.append((player_id, self.name_of(player_id)))
+            elif was_present:
+                removed.append(player_id)
+        self.changes = {}
+        return added, removed
+
+    def local_players(self):
+        return [(player_id, name) for player_id, name in self if shard_of(player_id) == self.node]
+
+    def apply(self, node, added, removed):
+        """Applique les changements publiés par un pair (seulement pour ses propres joueurs)"""
+        for player_id in removed:
+            if shard_of(player_id) == node:
+                LobbyIndex.remove(self, player_id)
+        for player_id, name in added:
+            if shard_of(player_id) == node:
+                LobbyIndex.add(self, player_id, name)
+
+    def forget(self, node):
+        """Retire tous les joueurs d'un pair"""
+        for player_id in [player_id for player_id, _ in self if shard_of(player_id) == node]:
+            LobbyIndex.remove(self, player_id)
+
+
+class PeerLink:
+    """Lien vers un nœud pair
+
+    post() peut être appelé depuis n'importe quel thread : les messages
+    s'accumulent et sont écrits ensemble au prochain passage de la boucle.
+    """
+
+    def __init__(self, node, writer, initiator):
+        self.node = node
+        self.writer = writer
+        self.initiator = initiator  # Nœud qui a ouvert la connexion
+        self.loop = asyncio.get_running_loop()
+        self.pending = []
+        self.lock = threading.Lock()
+        self.closed = asyncio.Event()
+
+    def post(self, message):
+        frame = encode_peer_message(message)
+        with self.lock:
+            self.pending.append(frame)
+            if len(self.pending) > 1:
+                return
+        self.loop.call_soon_threadsafe(self.flush)
+
+    def flush(self):
+        with self.lock:
+            frames, self.pending = self.pending, []
+        if self.writer.is_closing():
+            return
+        self.writer.writelines(frames)
+        if self.writer.transport.get_write_buffer_size() > PEER_MAX_BUFFER:
+            print(f"⚠️  Nœud {self.node} bloqué, lien coupé")
+            self.writer.close()
+
+    def close(self):
+        self.writer.close()
+
+
+class FederatedServer(ShardServer):
+    """Serveur asyncio relié à d'autres serveurs par des liens TCP"""
+
+    reuse_port = False
+    shared_ratings = False
+
+    def __init__(self, node_id, federation_port=DEFAULT_FEDERATION_PORT, peers=(),
+                 federation_host=DEFAULT_FEDERATION_HOST, federation_secret=None, **options):
+        super().__init__(node_id, None, **options)
+        self.federation_port = federation_port
+        self.federation_host = federation_host
+        self.federation_secret = federation_secret.encode() if federation_secret else None
+        self.peers = [parse_peer(peer) for peer in peers]
+        self.peer_links = {}  # {numéro de nœud: PeerLink}
+        self.peer_server = None
+        self.lobby = FederationLobby(node_id)
+        self.metrics.register_gauge("federation_peers", lambda: len(self.peer_links))
+
+    # --- Routage ---
+
+    def _post(self, envelope):
+        kind, target, message = envelope
+        if kind == "to":
+            link = self.peer_links.get(target)
+            if link is not None:
+                link.post(message)
+                self.metrics.inc("federation_messages_total", "out")
+        else:
+            for link in list(self.peer_links.values()):
+                link.post(message)
+                self.metrics.inc("federation_messages_total", "out")
+
+    def _is_reachable(self, player_id):
+        """Vrai pour un joueur local ou d'un pair relié"""
+        return not self._is_remote(player_id) or shard_of(player_id) in self.peer_links
+
+    def handle_challenge(self, challenger_id, data):
+        if not self._is_reachable(data.get("opponent_id")):
+            self.send_message(challenger_id, Protocol.ERROR, {"message": "Joueur non disponible"})
+            return
+        return super().handle_challenge(challenger_id, data)
+
+    def start_game(self, player1_id, player2_id):
+        if not self._is_reachable(player1_id):
+            self.send_message(player2_id, Protocol.ERROR, {"message": "Joueur non disponible"})
+            return
+        return super().start_game(player1_id, player2_id)
+
+    def handle_shard_message(self, message):
+        action = message[0]
+        if action == "lobby":
+            _, node, added, removed = message
+            with self.lock:
+                self.lobby.apply(node, added, removed)
+        elif action == "lobby_sync":
+            _, node, players = message
+            with self.lock:
+                self.lobby.forget(node)
+                self.lobby.apply(node, players, ())
+        else:
+            super().handle_shard_message(message)
+
+    # --- Liens entre nœuds ---
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        self.peer_server = await asyncio.start_server(
+            self.accept_peer, self.federation_host, self.federation_port, reuse_address=True
+        )
+        print(f"🌐 Nœud {self.shard} : fédération sur {self.federation_host}:{self.federation_port}")
+        for host, port in self.peers:
+            loop.create_task(self.dial_peer(host, port))
+        loop.create_task(self.publish_presence())
+        # Pas de tube vers un hub : on saute ShardServer.serve
+        await AsyncGameServer.serve(self)
+
+    async def accept_peer(self, reader, writer):
+        await self.run_peer_link(reader, writer, dialed=False)
+
+    async def dial_peer(self, host, port):
+        """Maintient un lien vers un pair : reconnexion tant qu'aucun lien vers lui n'est ouvert"""
+        node = None
+        while True:
+            link = self.peer_links.get(node)
+            if link is not None:
+                await link.closed.wait()
+                continue
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+            except OSError:
+                await asyncio.sleep(PEER_RETRY)
+                continue
+            node = await self.run_peer_link(reader, writer, dialed=True)
+            if node is None or node not in self.peer_links:
+                await asyncio.sleep(PEER_RETRY)
+
+    async def run_peer_link(self, reader, writer, dialed):
+        """Présentation puis lecture des messages d'un pair ; retourne son numéro de nœud"""
+        frames = FrameBuffer(PEER_MAX_FRAME)
+        nonce = secrets.token_hex(16)
+        writer.write(encode_peer_message(("hello", self.shard, nonce)))
+        try:
+            hello, pending = await asyncio.wait_for(self._handshake(reader, writer, frames, nonce), PEER_HELLO_TIMEOUT)
+        except (asyncio.TimeoutError, ConnectionError, FrameTooLarge, ValueError, TypeError, IndexError):
+            writer.close()
+            return None
+        if hello is None:
+            writer.close()
+            return None
+
+        node = hello[1]
+        if node == self.shard:
+            print(f"⚠️  Un pair utilise le même numéro de nœud ({node}), lien refusé")
+            writer.close()
+            return node
+
+        link = self._register_link(node, writer, self.shard if dialed else node)
+        if link is None:
+            return node
+
+        print(f"🌐 Nœud {node} relié")
+        with self.lock:
+            players = self.lobby.local_players()
+        link.post(("lobby_sync", self.shard, players))
+
+        try:
+            for raw in pending:
+                self._on_peer_message(raw)
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                for raw in frames.feed(data):
+                    self._on_peer_message(raw)
+        except (ConnectionError, FrameTooLarge) as e:
+            print(f"Lien avec le nœud {node} rompu: {e}")
+        finally:
+            writer.close()
+            if self.peer_links.get(node) is link:
+                del self.peer_links[node]
+                self._peer_lost(node)
+            link.closed.set()
+        return node
+
+    async def _handshake(self, reader, writer, frames, nonce):
+        """Présentation du pair, et les trames suivantes déjà reçues avec elle
+
+        Avec un secret de fédération, le pair doit aussi renvoyer la preuve
+        attendue pour notre nonce. Retourne (None, []) si le pair est refusé.
+        """
+        pending = []
+        hello = await self._read_peer_message(reader, frames, pending)
+        if hello is None or hello[0] != "hello":
+            return None, []
+        if self.federation_secret:
+            writer.write(encode_peer_message(("auth", self._proof(hello[2], self.shard))))
+            auth = await self._read_peer_message(reader, frames, pending)
+            if auth is None or auth[0] != "auth" or not hmac.compare_digest(auth[1], self._proof(nonce, hello[1])):
+                print(f"⚠️  Pair {writer.get_extra_info('peername')} refusé : secret de fédération invalide")
+                return None, []
+        return hello, pending
+
+    async def _read_peer_message(self, reader, frames, pending):
+        """Prochain message d'un pair (pending : trames déjà reçues), None si le lien est fermé"""
+        while not pending:
+            data = await reader.read(65536)
+            if not data:
+                return None
+            pending.extend(frames.feed(data))
+        return decode_peer_message(pending.pop(0))
+
+    def _proof(self, nonce, node):
+        """Preuve de connaissance du secret : liée au nonce du vérificateur et au nœud qui la donne"""
+        message = f"{nonce}:{node}".encode()
+        return hmac.new(self.federation_secret, message, hashlib.sha256).hexdigest()
+
+    def _register_link(self, node, writer, initiator):
+        """Enregistre le lien vers node ; None si un autre lien vers ce pair est conservé
+
+        Deux nœuds qui se connectent l'un à l'autre en même temps gardent tous
+        deux le lien ouvert par le plus petit numéro de nœud.
+        """
+        existing = self.peer_links.get(node)
+        if existing is not None:
+            if existing.initiator == min(node, self.shard):
+                writer.close()
+                return None
+            existing.close()
+        link = self.peer_links[node] = PeerLink(node, writer, initiator)
+        return link
+
+    def _on_peer_message(self, raw):
+        self.metrics.inc("federation_messages_total", "in")
+        try:
+            self.handle_shard_message(decode_peer_message(raw))
+        except Exception as e:
+            print(f"Erreur sur un message inter-serveurs: {e}")
+
+    def _peer_lost(self, node):
+        """Nettoie l'état lié à un pair injoignable"""
+        print(f"🌐 Nœud {node} injoignable")
+        outbox = []
+        remote_players = []
+        with self.lock:
+            self.lobby.forget(node)
+            for player_id, player in list(self.players.items()):
+                if player.remote and shard_of(player_id) == node:
+                    remote_players.append(player_id)
+                elif player.remote_shard == node:
+                    # Partie hébergée par le pair : le joueur redevient libre
+                    player.remote_shard = None
+                    self._set_in_game(player_id, None)
+                    self.queue_message(
+                        outbox,
+                        player_id,
+                        Protocol.GAME_OVER,
+                        {"winner": None, "winner_id": None, "you_won": None, "reason": "Serveur de la partie injoignable"}
+                    )
+        self.send_all(outbox)
+
+        # Les joueurs du pair perdent leurs parties hébergées ici par forfait
+        for player_id in remote_players:
+            self.disconnect_player(player_id)
+
+    async def publish_presence(self):
+        """Envoie périodiquement aux pairs les changements fusionnés du lobby local"""
+        while True:
+            await asyncio.sleep(PRESENCE_INTERVAL)
+            with self.lock:
+                added, removed = self.lobby.take_changes()
+            if added or removed:
+                self.publish(("lobby", self.shard, added, removed))
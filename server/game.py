@@ -1,102 +1,158 @@
 """
 Logique du jeu Puissance 4
+
+Le plateau est représenté par deux bitboards (un entier par joueur).
+Chaque colonne occupe ROWS + 1 bits, du bas vers le haut ; le bit
+supplémentaire reste toujours à 0 et sert de sentinelle pour que les
+décalages de la détection de victoire ne débordent pas d'une colonne
+sur la suivante.
+
+    colonne:   0   1   2   3   4   5   6
+              .6  .13 .20 .27 .34 .41 .48   <- sentinelle
+               5  12  19  26  33  40  47
+               4  11  18  25  32  39  46
+               3  10  17  24  31  38  45
+               2   9  16  23  30  37  44
+               1   8  15  22  29  36  43
+               0   7  14  21  28  35  42
 """
 
+ROWS = 6
+COLS = 7
+COLUMN_BITS = ROWS + 1
+
+# Décalages des quatre directions : vertical, horizontal, diagonales / et \
+WIN_SHIFTS = (1, COLUMN_BITS, COLUMN_BITS + 1, COLUMN_BITS - 1)
+
+
 class Connect4Game:
+    __slots__ = (
+        "player1_id", "player2_id", "current_player", "winner", "game_over",
+        "bitboards", "heights", "moves", "last_move"
+    )
+
+    rows = ROWS
+    cols = COLS
+
     def __init__(self, player1_id, player2_id):
-        self.rows = 6
-        self.cols = 7
-        self.board = [[0 for _ in range(self.cols)] for _ in range(self.rows)]
         self.player1_id = player1_id
         self.player2_id = player2_id
         self.current_player = 1
         self.winner = None
         self.game_over = False
-    
+        # bitboards[0] : pions du joueur 1, bitboards[1] : pions du joueur 2
+        self.bitboards = [0, 0]
+        # Index du prochain bit libre de chaque colonne
+        self.heights = [col * COLUMN_BITS for col in range(COLS)]
+        self.moves = 0
+        # Dernier coup joué : (ligne, colonne, joueur)
+        self.last_move = None
+
+    @property
+    def board(self):
+        """Plateau sous forme de liste de lignes (ligne 0 = haut)"""
+        mask1, mask2 = self.bitboards
+        board = []
+        for row in range(ROWS):
+            shift = ROWS - 1 - row
+            cells = []
+            for col in range(COLS):
+                bit = 1 << shift
+                cells.append(1 if mask1 & bit else 2 if mask2 & bit else 0)
+                shift += COLUMN_BITS
+            board.append(cells)
+        return board
+
     def get_board_state(self):
         """Retourne l'état actuel du plateau"""
         winner_id = None
         if self.winner:
             winner_id = self.player1_id if self.winner == 1 else self.player2_id
-        
+
         return {
             "board": self.board,
             "current_player": self.current_player,
             "winner": self.winner,
             "winner_id": winner_id,
+            "game_over": self.game_over,
+            "seq": self.moves
+        }
+
+    def get_move_delta(self):
+        """Retourne le dernier coup joué sous forme de mise à jour incrémentale
+
+        Le numéro de séquence est le nombre de coups joués : un client qui
+        reçoit un seq différent de son seq + 1 a manqué une mise à jour.
+        """
+        row, column, player = self.last_move
+        winner_id = None
+        if self.winner:
+            winner_id = self.player1_id if self.winner == 1 else self.player2_id
+
+        return {
+            "seq": self.moves,
+            "move": {"column": column, "row": row, "player": player},
+            "current_player": self.current_player,
+            "winner": self.winner,
+            "winner_id": winner_id,
             "game_over": self.game_over
         }
-    
+
     def play_move(self, column):
         """Joue un coup dans la colonne spécifiée"""
         if self.game_over:
             return False, "La partie est terminée"
-        
-        if column < 0 or column >= self.cols:
+
+        if column < 0 or column >= COLS:
             return False, "Colonne invalide"
-        
-        # Trouve la première case libre dans la colonne
-        for row in range(self.rows - 1, -1, -1):
-            if self.board[row][column] == 0:
-                self.board[row][column] = self.current_player
-                
-                # Vérifie la victoire
-                if self._check_win(row, column):
-                    self.winner = self.current_player
-                    self.game_over = True
-                    return True, f"Joueur {self.current_player} a gagné!"
-                
-                # Vérifie le match nul
-                if self._is_board_full():
-                    self.game_over = True
-                    return True, "Match nul!"
-                
-                # Change de joueur
-                self.current_player = 3 - self.current_player  # Alterne entre 1 et 2
-                return True, "Coup joué"
-        
-        return False, "Colonne pleine"
-    
+
+        # Le prochain bit libre de la colonne donne directement la case d'arrivée
+        index = self.heights[column]
+        if index == column * COLUMN_BITS + ROWS:
+            return False, "Colonne pleine"
+
+        self.heights[column] = index + 1
+        self.moves += 1
+        bitboard = self.bitboards[self.current_player - 1] | (1 << index)
+        self.bitboards[self.current_player - 1] = bitboard
+        self.last_move = (ROWS - 1 - (index - column * COLUMN_BITS), column, self.current_player)
+
+        # Vérifie la victoire
+        if self._check_win(bitboard):
+            self.winner = self.current_player
+            self.game_over = True
+            return True, f"Joueur {self.current_player} a gagné!"
+
+        # Vérifie le match nul
+        if self._is_board_full():
+            self.game_over = True
+            return True, "Match nul!"
+
+        # Change de joueur
+        self.current_player = 3 - self.current_player  # Alterne entre 1 et 2
+        return True, "Coup joué"
+
     def _is_board_full(self):
         """Vérifie si le plateau est plein"""
-        return all(self.board[0][col] != 0 for col in range(self.cols))
-    
-    def _check_win(self, row, col):
-        """Vérifie si le dernier coup est gagnant"""
-        player = self.board[row][col]
-        
-        # Directions: horizontal, vertical, diagonale /, diagonale \
-        directions = [
-            [(0, 1), (0, -1)],   # Horizontal
-            [(1, 0), (-1, 0)],   # Vertical
-            [(1, 1), (-1, -1)],  # Diagonale \
-            [(1, -1), (-1, 1)]   # Diagonale /
-        ]
-        
-        for direction_pair in directions:
-            count = 1  # Compte le pion actuel
-            
-            # Vérifie dans les deux directions
-            for dr, dc in direction_pair:
-                r, c = row + dr, col + dc
-                while 0 <= r < self.rows and 0 <= c < self.cols and self.board[r][c] == player:
-                    count += 1
-                    r += dr
-                    c += dc
-            
-            if count >= 4:
+        return self.moves == ROWS * COLS
+
+    @staticmethod
+    def _check_win(bitboard):
+        """Vérifie si un bitboard contient quatre pions alignés"""
+        for shift in WIN_SHIFTS:
+            pairs = bitboard & (bitboard >> shift)
+            if pairs & (pairs >> (2 * shift)):
                 return True
-        
         return False
-    
+
     def get_current_player_id(self):
         """Retourne l'ID du joueur actuel"""
         return self.player1_id if self.current_player == 1 else self.player2_id
-    
+
     def display_board(self):
         """Affiche le plateau (pour debug)"""
         symbols = {0: '.', 1: 'X', 2: 'O'}
-        print("\n  " + " ".join(str(i) for i in range(self.cols)))
+        print("\n  " + " ".join(str(i) for i in range(COLS)))
         for row in self.board:
             print("  " + " ".join(symbols[cell] for cell in row))
-        print()
\ No newline at end of file
+        print()
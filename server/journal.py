@@ -0,0 +1,298 @@
+"""
+Journal des parties
+
+Chaque événement de partie (début, coup accepté, fin) est ajouté à la fin
+d'un segment sous forme d'enregistrement [longueur, crc32, JSON]. Les
+ajouts sont groupés par un thread d'écriture : tous les enregistrements
+arrivés pendant le fsync précédent sont écrits et synchronisés ensemble
+(group commit), ce qui amortit le coût du fsync sur toutes les parties.
+
+Le thread d'écriture tient à jour une copie compacte des parties en cours
+(identifiants, noms, jetons de reprise et colonnes jouées). Quand le segment
+courant devient trop long ou trop vieux, cette copie est écrite dans un
+instantané et un nouveau segment est ouvert ; les segments couverts par
+l'instantané sont supprimés. Au démarrage, l'état est reconstruit depuis le
+dernier instantané et les segments suivants : la durée de reprise ne dépend
+que de la taille d'un segment, pas de l'ancienneté du serveur.
+
+Si une écriture échoue (disque plein, fichier supprimé...), le thread
+d'écriture s'arrête et le journal passe en échec : les attentes en cours
+sont réveillées et wait retourne False, les ajouts suivants sont ignorés.
+
+    journal/
+        snapshot-000042.json   état au début du segment 42
+        segment-000042.log     événements suivants
+"""
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+
+# En-tête d'un enregistrement : longueur du JSON puis son crc32
+_RECORD_HEADER = struct.Struct("!II")
+
+SNAPSHOT_VERSION = 1
+
+DEFAULT_SEGMENT_RECORDS = 100000
+DEFAULT_SNAPSHOT_INTERVAL = 300.0
+
+# Types d'enregistrement
+START = "start"  # [START, game_id, joueur1, joueur2, nom1, nom2, jeton1, jeton2]
+MOVE = "move"  # [MOVE, game_id, colonne]
+OVER = "over"  # [OVER, game_id]
+
+
+def id_number(identifier):
+    """Numéro d'un identifiant "player_12" / "game_3" (0 s'il n'en a pas)"""
+    try:
+        return int(identifier.rsplit("_", 1)[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+def _file_number(path):
+    """Numéro d'un fichier segment-000042.log ou snapshot-000042.json"""
+    return int(path.stem.split("-")[1])
+
+
+def read_records(path):
+    """Itère sur les enregistrements valides d'un segment
+
+    La lecture s'arrête au premier enregistrement incomplet ou corrompu :
+    c'est la fin d'un segment interrompu par un arrêt brutal.
+    """
+    with open(path, "rb") as segment:
+        data = segment.read()
+    offset = 0
+    while offset + _RECORD_HEADER.size <= len(data):
+        length, crc = _RECORD_HEADER.unpack_from(data, offset)
+        start = offset + _RECORD_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return
+        yield json.loads(payload)
+        offset = start + length
+
+
+class JournalState:
+    """Parties en cours telles que décrites par le journal"""
+
+    def __init__(self):
+        # {game_id: [joueur1, joueur2, nom1, nom2, jeton1, jeton2, [colonnes jouées]]}
+        self.games = {}
+        self.player_counter = 0
+        self.game_counter = 0
+
+    def apply(self, record):
+        kind, game_id = record[0], record[1]
+        if kind == START:
+            self.games[game_id] = list(record[2:8]) + [[]]
+            self.game_counter = max(self.game_counter, id_number(game_id))
+            self.player_counter = max(self.player_counter, id_number(record[2]), id_number(record[3]))
+        elif kind == MOVE:
+            game = self.games.get(game_id)
+            if game is not None:
+                game[6].append(record[2])
+        elif kind == OVER:
+            self.games.pop(game_id, None)
+
+    def to_json(self, segment):
+        return {
+            "version": SNAPSHOT_VERSION,
+            "segment": segment,
+            "player_counter": self.player_counter,
+            "game_counter": self.game_counter,
+            "games": self.games,
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        state = cls()
+        state.games = data["games"]
+        state.player_counter = data["player_counter"]
+        state.game_counter = data["game_counter"]
+        return state
+
+
+class Journal:
+    def __init__(self, directory, segment_records=DEFAULT_SEGMENT_RECORDS,
+                 snapshot_interval=DEFAULT_SNAPSHOT_INTERVAL, metrics=None):
+        self.directory = Path(directory)
+        self.segment_records = segment_records
+        self.snapshot_interval = snapshot_interval
+        self.metrics = metrics
+        self.state = JournalState()  # Modifié uniquement par le thread d'écriture
+        self.segment = 0
+        self.segment_file = None
+        self.segment_count = 0  # Enregistrements écrits dans le segment courant
+        self.snapshot_time = time.monotonic()
+        self.pending = []
+        self.appended = 0  # Numéro du dernier enregistrement ajouté
+        self.durable = 0  # Numéro du dernier enregistrement synchronisé sur disque
+        self.closing = False
+        self.failed = False  # Écriture impossible : plus rien ne sera synchronisé
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="journal", daemon=True)
+
+    def recover(self):
+        """Reconstruit l'état depuis le disque et ouvre un nouveau segment
+
+        L'état recouvré est immédiatement compacté dans un instantané.
+        Retourne le JournalState reconstruit.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        first = 0
+        for path in sorted(self.directory.glob("snapshot-*.json"), reverse=True):
+            try:
+                with open(path) as snapshot:
+                    data = json.load(snapshot)
+            except (OSError, ValueError):
+                continue  # Instantané incomplet : on remonte au précédent
+            if data.get("version") == SNAPSHOT_VERSION:
+                self.state = JournalState.from_json(data)
+                first = data["segment"]
+                break
+
+        segments = sorted(self.directory.glob("segment-*.log"))
+        for path in segments:
+            if _file_number(path) >= first:
+                for record in read_records(path):
+                    self.state.apply(record)
+
+        last = max([first] + [_file_number(path) for path in segments])
+        self._rotate(last + 1)
+        return self.state
+
+    def start(self):
+        self.thread.start()
+
+    def append(self, record):
+        """Ajoute un enregistrement et retourne son numéro (sans attendre l'écriture)"""
+        with self.condition:
+            self.appended += 1
+            if not self.failed:
+                self.pending.append(record)
+                if len(self.pending) == 1:
+                    self.condition.notify_all()
+            return self.appended
+
+    def wait(self, number, timeout=None):
+        """Attend que l'enregistrement number soit synchronisé sur disque
+
+        Retourne False si le délai expire ou si le journal est en échec.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.durable >= number or self.failed, timeout)
+            return self.durable >= number
+
+    def close(self):
+        """Écrit les enregistrements en attente puis arrête le thread d'écriture"""
+        with self.condition:
+            self.closing = True
+            self.condition.notify_all()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def run(self):
+        try:
+            self._write_loop()
+        except OSError as e:
+            print(f"⚠️  Journal : écriture impossible ({e}), les coups ne sont plus enregistrés")
+            if self.metrics is not None:
+                self.metrics.inc("journal_errors_total")
+            with self.condition:
+                self.failed = True
+                self.pending = []
+                self.condition.notify_all()
+            try:
+                self.segment_file.close()
+            except OSError:
+                pass
+
+    def _write_loop(self):
+        while True:
+            with self.condition:
+                if not self.pending and not self.closing:
+                    # Segment vide : rien à compacter, on attend le prochain ajout
+                    timeout = None
+                    if self.segment_count:
+                        timeout = max(self.snapshot_interval - (time.monotonic() - self.snapshot_time), 0.0)
+                    self.condition.wait(timeout)
+                batch, self.pending = self.pending, []
+                last = self.appended
+                closing = self.closing
+
+            if batch:
+                self._commit(batch)
+                with self.condition:
+                    self.durable = last
+                    self.condition.notify_all()
+
+            if self.segment_count and (self.segment_count >= self.segment_records
+                                       or time.monotonic() - self.snapshot_time >= self.snapshot_interval):
+                self._rotate(self.segment + 1)
+
+            if closing and not batch:
+                self.segment_file.close()
+                return
+
+    def _commit(self, batch):
+        """Écrit un lot d'enregistrements en un seul write + fsync"""
+        chunks = []
+        for record in batch:
+            payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+            chunks.append(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+            chunks.append(payload)
+            self.state.apply(record)
+
+        started = time.perf_counter()
+        self.segment_file.write(b"".join(chunks))
+        self.segment_file.flush()
+        os.fsync(self.segment_file.fileno())
+        self.segment_count += len(batch)
+
+        if self.metrics is not None:
+            self.metrics.observe("journal_commit_seconds", time.perf_counter() - started)
+            self.metrics.inc("journal_records_total", value=len(batch))
+
+    def _rotate(self, segment):
+        """Écrit l'instantané de l'état courant puis ouvre le segment suivant
+
+        L'instantané décrit l'état au début du segment segment : les segments
+        et instantanés précédents deviennent inutiles et sont supprimés.
+        """
+        snapshot_path = self.directory / f"snapshot-{segment:06d}.json"
+        temporary = snapshot_path.with_suffix(".tmp")
+        with open(temporary, "w") as snapshot:
+            json.dump(self.state.to_json(segment), snapshot, separators=(",", ":"))
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temporary, snapshot_path)
+
+        if self.segment_file is not None:
+            self.segment_file.close()
+        self.segment_file = open(self.directory / f"segment-{segment:06d}.log", "ab")
+        self._sync_directory()
+
+        for path in list(self.directory.glob("snapshot-*.json")) + list(self.directory.glob("segment-*.log")):
+            if _file_number(path) < segment:
+                path.unlink()
+
+        self.segment = segment
+        self.segment_count = 0
+        self.snapshot_time = time.monotonic()
+
+    def _sync_directory(self):
+        """Rend durables les créations et renommages de fichiers du répertoire"""
+        try:
+            descriptor = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return  # Pas de fsync de répertoire sur cette plateforme
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
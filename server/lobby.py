@@ -0,0 +1,84 @@
+"""
+Index des joueurs libres du lobby
+
+Les joueurs disponibles sont maintenus dans une liste triée par nom
+(insensible à la casse), mise à jour à chaque changement d'état au lieu
+d'être recalculée par un parcours complet de self.players à chaque
+LIST_PLAYERS. Une page filtrée par préfixe se lit par deux recherches
+dichotomiques et une tranche de liste.
+"""
+import bisect
+
+# Taille de page appliquée quand le client n'en demande pas, et maximum accepté
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Borne supérieure de toutes les clés commençant par un préfixe donné
+_PREFIX_END = "\U0010ffff"
+
+
+class LobbyIndex:
+    def __init__(self):
+        self._entries = []  # [(clé de tri, player_id, nom)] triée
+        self._keys = {}  # {player_id: entrée}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, player_id):
+        return player_id in self._keys
+
+    def __iter__(self):
+        """Parcourt les joueurs indexés : (player_id, nom) par ordre de nom"""
+        return ((player_id, name) for _, player_id, name in self._entries)
+
+    def name_of(self, player_id):
+        return self._keys[player_id][2]
+
+    def add(self, player_id, name):
+        """Ajoute un joueur libre (sans effet s'il est déjà indexé)"""
+        if player_id in self._keys:
+            return
+        entry = (name.casefold(), player_id, name)
+        bisect.insort(self._entries, entry)
+        self._keys[player_id] = entry
+
+    def remove(self, player_id):
+        """Retire un joueur de l'index (sans effet s'il n'y est pas)"""
+        entry = self._keys.pop(player_id, None)
+        if entry is None:
+            return
+        index = bisect.bisect_left(self._entries, entry)
+        del self._entries[index]
+
+    def page(self, offset=0, limit=DEFAULT_PAGE_SIZE, prefix="", exclude=None):
+        """Retourne (joueurs de la page, nombre total de joueurs correspondants)
+
+        Le joueur exclude (celui qui demande la liste) n'est jamais compté.
+        """
+        entries = self._entries
+        prefix = prefix.casefold()
+        low = bisect.bisect_left(entries, (prefix,))
+        high = bisect.bisect_left(entries, (prefix + _PREFIX_END,)) if prefix else len(entries)
+        total = high - low
+
+        # Position du joueur exclu s'il fait partie des résultats
+        excluded = None
+        entry = self._keys.get(exclude)
+        if entry is not None:
+            index = bisect.bisect_left(entries, entry)
+            if low <= index < high:
+                excluded = index
+                total -= 1
+
+        start = low + offset
+        if excluded is not None and excluded < start:
+            start += 1
+        end = min(high, start + limit + 1)
+
+        players = [
+            {"id": player_id, "name": name}
+            for index, (_, player_id, name) in enumerate(entries[start:end], start)
+            if index != excluded
+        ]
+        return players[:limit], total
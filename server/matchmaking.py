@@ -0,0 +1,192 @@
+"""
+Appariement automatique et tournois
+
+MatchmakingQueue apparie les joueurs dès qu'ils sont deux en attente, sans
+passer par l'échange CHALLENGE / CHALLENGE_ACCEPTED. Avec max_rating_gap,
+un arrivant n'est apparié qu'au joueur en attente de classement le plus
+proche, et seulement si l'écart est acceptable ; l'écart toléré grandit
+avec l'attente du joueur déjà en file.
+
+Tournament déroule un tableau de classement : au premier tour les joueurs
+s'affrontent deux à deux, puis les gagnants rencontrent les gagnants et les
+perdants les perdants, jusqu'à ce que chaque joueur ait une place unique.
+Chaque match est lancé dès que ses deux matchs d'origine sont terminés,
+sans attendre la fin du tour complet.
+
+Ces classes ne font aucune entrée/sortie : le serveur les manipule sous
+son verrou et lance les parties qu'elles lui retournent.
+"""
+import bisect
+import collections
+import itertools
+import time
+
+# Nombre de matchs nuls rejoués avant de départager au bénéfice du premier joueur
+MAX_REMATCHES = 3
+
+# Emplacement de match pas encore connu (None désigne une exemption)
+_PENDING = object()
+
+
+# Élargissement de l'écart de classement toléré, en points par seconde d'attente
+DEFAULT_GAP_GROWTH = 10.0
+
+
+class MatchmakingQueue:
+    def __init__(self, max_rating_gap=None, gap_growth=DEFAULT_GAP_GROWTH):
+        # Sans max_rating_gap, les joueurs sont appariés dans l'ordre d'arrivée
+        self.max_rating_gap = max_rating_gap
+        self.gap_growth = gap_growth
+        self._waiting = collections.OrderedDict()  # {player_id: entrée de _by_rating}, dans l'ordre d'arrivée
+        self._by_rating = []  # [(classement, numéro d'arrivée, player_id, instant d'arrivée)] trié
+        self._arrivals = itertools.count()
+
+    def __len__(self):
+        return len(self._waiting)
+
+    def __contains__(self, player_id):
+        return player_id in self._waiting
+
+    def join(self, player_id, rating=0.0):
+        """Ajoute un joueur ; retourne l'adversaire apparié ou None s'il doit attendre"""
+        if player_id in self._waiting:
+            return None
+        if self.max_rating_gap is None:
+            if self._waiting:
+                opponent_id, _ = self._waiting.popitem(last=False)
+                return opponent_id
+            self._waiting[player_id] = None
+            return None
+
+        # Voisins immédiats dans l'ordre des classements : le plus proche est l'un des deux
+        now = time.monotonic()
+        entry = (rating, next(self._arrivals), player_id, now)
+        index = bisect.bisect_left(self._by_rating, entry)
+        best = None
+        for neighbour in self._by_rating[max(0, index - 1):index + 1]:
+            gap = abs(neighbour[0] - rating)
+            if gap <= self.max_rating_gap + self.gap_growth * (now - neighbour[3]):
+                if best is None or gap < abs(best[0] - rating):
+                    best = neighbour
+        if best is not None:
+            self.leave(best[2])
+            return best[2]
+
+        self._by_rating.insert(index, entry)
+        self._waiting[player_id] = entry
+        return None
+
+    def leave(self, player_id):
+        """Retire un joueur de la file (sans effet s'il n'y est pas)"""
+        entry = self._waiting.pop(player_id, None)
+        if entry is not None:
+            del self._by_rating[bisect.bisect_left(self._by_rating, entry)]
+
+
+class Tournament:
+    """Tableau de classement à élimination croisée
+
+    Un match est identifié par (tour, chemin, index) où chemin est la suite
+    des résultats ('W' victoire, 'L' défaite) des joueurs qui s'y rencontrent.
+    Les emplacements vides du tableau sont des exemptions (None).
+    """
+
+    def __init__(self, tournament_id, player_ids):
+        self.tournament_id = tournament_id
+        self.player_ids = list(player_ids)
+
+        size = 2
+        while size < len(self.player_ids):
+            size *= 2
+        self.size = size
+        self.rounds = size.bit_length() - 1
+
+        # Les joueurs occupent d'abord les places paires : une exemption ne
+        # rencontre jamais une autre exemption au premier tour
+        seats = [None] * size
+        positions = list(range(0, size, 2)) + list(range(1, size, 2))
+        for position, player_id in zip(positions, self.player_ids):
+            seats[position] = player_id
+
+        self.matches = {}  # {clé: [joueur A, joueur B]}
+        self.draws = collections.Counter()  # {clé: nombre de matchs nuls}
+        self.paths = {}  # {player_id: chemin final}
+        self.withdrawn = set()
+        self.remaining = size // 2 * self.rounds  # Matchs restant à résoudre
+
+        for index in range(size // 2):
+            self.matches[(1, "", index)] = [seats[2 * index], seats[2 * index + 1]]
+
+    @property
+    def finished(self):
+        return self.remaining == 0
+
+    def start(self):
+        """Retourne les matchs du premier tour à jouer [(clé, joueur 1, joueur 2)]"""
+        ready = []
+        for key in list(self.matches):
+            self._resolve_or_play(key, ready)
+        return ready
+
+    def record_result(self, key, winner_id, loser_id):
+        """Enregistre un résultat ; retourne les nouveaux matchs prêts à jouer"""
+        ready = []
+        self._advance(key, winner_id, loser_id, ready)
+        return ready
+
+    def record_draw(self, key):
+        """Enregistre un match nul : le match est rejoué en inversant le premier joueur
+
+        Au-delà de MAX_REMATCHES, le premier joueur du tableau est déclaré vainqueur.
+        """
+        player_a, player_b = self.matches[key]
+        self.draws[key] += 1
+        if self.draws[key] > MAX_REMATCHES:
+            return self.record_result(key, player_a, player_b)
+        if self.draws[key] % 2:
+            return [(key, player_b, player_a)]
+        return [(key, player_a, player_b)]
+
+    def withdraw(self, player_id):
+        """Retire un joueur : ses matchs à venir sont perdus par forfait"""
+        self.withdrawn.add(player_id)
+
+    def standings(self):
+        """Classement final [(rang, player_id)], exemptions exclues"""
+        ranking = sorted(
+            (int(path.replace("W", "0").replace("L", "1"), 2) + 1, player_id)
+            for player_id, path in self.paths.items()
+            if player_id is not None
+        )
+        return ranking
+
+    def _advance(self, key, winner_id, loser_id, ready):
+        """Propage un résultat vers les matchs du tour suivant"""
+        round_number, path, index = key
+        self.remaining -= 1
+        del self.matches[key]
+
+        if round_number == self.rounds:
+            self.paths[winner_id] = path + "W"
+            self.paths[loser_id] = path + "L"
+            return
+
+        for player_id, outcome in ((winner_id, "W"), (loser_id, "L")):
+            next_key = (round_number + 1, path + outcome, index // 2)
+            slots = self.matches.setdefault(next_key, [_PENDING, _PENDING])
+            slots[index % 2] = player_id
+            if _PENDING not in slots:
+                self._resolve_or_play(next_key, ready)
+
+    def _resolve_or_play(self, key, ready):
+        """Résout d'office un match avec exemption ou forfait, sinon le déclare prêt"""
+        player_a, player_b = self.matches[key]
+        absent_a = player_a is None or player_a in self.withdrawn
+        absent_b = player_b is None or player_b in self.withdrawn
+
+        if absent_b:
+            self._advance(key, player_a, player_b, ready)
+        elif absent_a:
+            self._advance(key, player_b, player_a, ready)
+        else:
+            ready.append((key, player_a, player_b))
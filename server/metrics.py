@@ -0,0 +1,327 @@
+"""
+Métriques du serveur
+
+Les compteurs et histogrammes sont écrits dans un fragment propre à chaque
+thread (threading.local) : l'incrément d'un compteur ne prend aucun verrou
+et ne se dispute avec aucun autre thread. Une lecture (message STATS ou
+export périodique) fusionne tous les fragments ; ceux des threads terminés
+sont repliés dans un fragment commun pour ne pas s'accumuler.
+
+Les jauges (joueurs connectés, parties en cours...) ne sont pas stockées :
+elles sont calculées à la lecture par des fonctions enregistrées par le
+serveur.
+
+L'export suit le format texte d'exposition Prometheus.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+
+# Bornes supérieures des intervalles des histogrammes de durée, en secondes
+LATENCY_BUCKETS = (
+    0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0
+)
+
+# Nom de l'étiquette des métriques à étiquette unique
+LABEL_NAMES = {
+    "messages_in_total": "type",
+    "messages_out_total": "type",
+    "send_errors_total": "reason",
+    "timeouts_total": "reason",
+    "messages_limited_total": "type",
+    "federation_messages_total": "direction",
+    "analysis_total": "source",
+}
+
+PREFIX = "connect4_"
+
+
+class _Shard:
+    """Compteurs et histogrammes d'un thread"""
+
+    __slots__ = ("thread", "counters", "histograms")
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.counters = {}  # {(nom, étiquette): valeur}
+        self.histograms = {}  # {nom: [effectifs par intervalle..., somme, nombre]}
+
+
+class Metrics:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.started = time.time()
+        self.gauges = {}  # {nom: fonction sans argument}
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()  # Pris à la création d'un fragment et à la lecture
+        self._retired = _Shard(None)
+        self._previous = None  # (instant, compteurs) de la lecture précédente, pour les débits
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def inc(self, name, label=None, value=1):
+        """Incrémente un compteur (sans verrou)"""
+        counters = self._shard().counters
+        key = (name, label)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, value):
+        """Ajoute une valeur (en secondes) à un histogramme (sans verrou)"""
+        histograms = self._shard().histograms
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = [0] * (len(self.buckets) + 3)
+        histogram[bisect.bisect_left(self.buckets, value)] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    def timer(self, name):
+        """Contexte mesurant sa durée dans l'histogramme name"""
+        return _Timer(self, name)
+
+    def register_gauge(self, name, function):
+        self.gauges[name] = function
+
+    def snapshot(self):
+        """Fusionne les fragments et retourne toutes les métriques
+
+        Les débits (messages_per_sec) sont calculés depuis la lecture précédente.
+        """
+        counters = {}
+        histograms = {}
+        with self._shards_lock:
+            alive = []
+            for shard in self._shards:
+                if shard.thread.is_alive():
+                    alive.append(shard)
+                else:
+                    # Thread terminé : plus d'écriture possible, on replie ses valeurs
+                    self._merge(shard, self._retired.counters, self._retired.histograms)
+            self._shards = alive
+            self._merge(self._retired, counters, histograms)
+            for shard in alive:
+                self._merge(shard, counters, histograms)
+
+            now = time.time()
+            previous_time, previous_counters = self._previous or (self.started, {})
+            self._previous = (now, counters)
+
+        elapsed = max(now - previous_time, 1e-9)
+        rates = {
+            label: round((value - previous_counters.get((name, label), 0)) / elapsed, 2)
+            for (name, label), value in counters.items()
+            if name == "messages_in_total"
+        }
+
+        gauges = {}
+        for name, function in self.gauges.items():
+            try:
+                gauges[name] = function()
+            except Exception:
+                gauges[name] = None
+
+        return {
+            "uptime_seconds": round(now - self.started, 3),
+            "gauges": gauges,
+            "counters": counters,
+            "messages_per_sec": rates,
+            "histograms": histograms,
+        }
+
+    @staticmethod
+    def _merge(shard, counters, histograms):
+        # dict() copie en une opération atomique sous le GIL : aucun verrou côté écrivain
+        for key, value in dict(shard.counters).items():
+            counters[key] = counters.get(key, 0) + value
+        for name, values in dict(shard.histograms).items():
+            values = list(values)
+            total = histograms.get(name)
+            if total is None:
+                histograms[name] = values
+            else:
+                for index, value in enumerate(values):
+                    total[index] += value
+
+    def to_json(self, snapshot=None):
+        """Métriques sérialisables en JSON (réponse au message STATS)"""
+        snapshot = snapshot or self.snapshot()
+        counters = {}
+        for (name, label), value in sorted(snapshot["counters"].items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            if label is None:
+                counters[name] = value
+            else:
+                counters.setdefault(name, {})[label] = value
+
+        histograms = {}
+        for name, values in sorted(snapshot["histograms"].items()):
+            count = values[-1]
+            histograms[name] = {
+                "count": count,
+                "sum": round(values[-2], 6),
+                "mean": round(values[-2] / count, 6) if count else None,
+                "p50": self._quantile(values, 0.50),
+                "p99": self._quantile(values, 0.99),
+            }
+
+        return {
+            "uptime_seconds": snapshot["uptime_seconds"],
+            "gauges": snapshot["gauges"],
+            "counters": counters,
+            "messages_per_sec": snapshot["messages_per_sec"],
+            "histograms": histograms,
+        }
+
+    def _quantile(self, values, fraction):
+        """Borne supérieure de l'intervalle contenant le quantile (None si au-delà du dernier)"""
+        count = values[-1]
+        if not count:
+            return None
+        rank = fraction * count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, values):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return None
+
+    def to_prometheus(self, snapshot=None):
+        """Métriques au format texte d'exposition Prometheus"""
+        snapshot = snapshot or self.snapshot()
+        lines = []
+
+        for name, value in sorted(snapshot["gauges"].items()):
+            if value is None:
+                continue
+            lines.append(f"# TYPE {PREFIX}{name} gauge")
+            lines.append(f"{PREFIX}{name} {value}")
+        lines.append(f"# TYPE {PREFIX}uptime_seconds gauge")
+        lines.append(f"{PREFIX}uptime_seconds {snapshot['uptime_seconds']}")
+
+        declared = set()
+        for (name, label), value in sorted(snapshot["counters"].items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+            if label is None:
+                lines.append(f"{PREFIX}{name} {value}")
+            else:
+                label_name = LABEL_NAMES.get(name, "label")
+                lines.append(f'{PREFIX}{name}{{{label_name}="{_escape(label)}"}} {value}')
+
+        for name, values in sorted(snapshot["histograms"].items()):
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, values):
+                cumulative += bucket_count
+                lines.append(f'{PREFIX}{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{PREFIX}{name}_bucket{{le="+Inf"}} {values[-1]}')
+            lines.append(f"{PREFIX}{name}_sum {values[-2]}")
+            lines.append(f"{PREFIX}{name}_count {values[-1]}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.started)
+
+
+def timed(name):
+    """Décorateur de méthode : durée de chaque appel dans l'histogramme name de self.metrics"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.metrics.observe(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class InstrumentedLock:
+    """Verrou mesurant le temps d'attente et le temps de détention"""
+
+    def __init__(self, metrics, name="lock"):
+        self._lock = threading.Lock()
+        self.metrics = metrics
+        self.wait_name = f"{name}_wait_seconds"
+        self.hold_name = f"{name}_hold_seconds"
+        self._acquired_at = 0.0  # Écrit uniquement par le détenteur du verrou
+
+    def acquire(self, blocking=True, timeout=-1):
+        started = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            self._acquired_at = now = time.perf_counter()
+            self.metrics.observe(self.wait_name, now - started)
+        return acquired
+
+    def release(self):
+        held = time.perf_counter() - self._acquired_at
+        self._lock.release()
+        self.metrics.observe(self.hold_name, held)
+
+    def locked(self):
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class MetricsDumper:
+    """Thread écrivant périodiquement les métriques dans un fichier (format Prometheus)
+
+    Le fichier est remplacé atomiquement : un collecteur (node_exporter
+    textfile par exemple) ne lit jamais un fichier partiel.
+    """
+
+    def __init__(self, metrics, path, interval=10.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.thread = threading.Thread(target=self.run, name="metrics-dumper", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.dump()
+            except OSError as e:
+                print(f"Erreur d'écriture des métriques: {e}")
+
+    def dump(self):
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as metrics_file:
+            metrics_file.write(self.metrics.to_prometheus())
+        os.replace(temporary, self.path)
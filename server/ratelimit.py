@@ -0,0 +1,84 @@
+"""
+Limitation du débit des messages reçus
+
+Chaque joueur (chaque session d'une connexion multiplexée) dispose de deux
+seaux à jetons : un pour les requêtes coûteuses pour le serveur (listes,
+classement, métriques, suggestions), un pour tous les autres messages. Un
+seau se remplit de rate jetons par seconde jusqu'à burst jetons ; un
+message consomme un jeton et est refusé si le seau est vide. Le refus
+indique dans combien de temps le prochain jeton sera disponible.
+
+Tous les messages d'une connexion passent aussi par les seaux de la
+connexion, dont le débit est celui d'un joueur multiplié par le nombre de
+joueurs réellement enregistrés dessus. Annoncer des identifiants de session
+inventés ne donne donc aucun débit supplémentaire : ces messages ne sont
+comptés que dans les seaux de la connexion.
+
+Un client qui dépasse sa limite ne ralentit donc que lui-même : ses
+messages en trop sont ignorés sans toucher aux verrous du serveur.
+"""
+from shared.protocol import Protocol
+
+DEFAULT_MESSAGE_RATE = 50.0  # Messages par seconde
+DEFAULT_QUERY_RATE = 5.0  # Requêtes coûteuses par seconde
+# Rafale tolérée, en secondes de débit
+BURST_SECONDS = 2.0
+
+# Requêtes limitées par query_rate
+QUERY_TYPES = frozenset({
+    Protocol.LIST_PLAYERS, Protocol.LIST_GAMES, Protocol.LEADERBOARD, Protocol.MY_RANK,
+    Protocol.STATS, Protocol.HINT, Protocol.ANALYZE
+})
+# Messages jamais limités : maintien et fermeture de la connexion
+UNLIMITED_TYPES = frozenset({Protocol.PING, Protocol.PONG, Protocol.DISCONNECT})
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated", "peak")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+        self.peak = 1  # Plus grand nombre de joueurs ayant partagé le seau
+
+    def take(self, now, scale=1):
+        """Consomme un jeton ; retourne 0 si accepté, sinon le délai avant le prochain jeton
+
+        scale multiplie le débit et la rafale (seau partagé par scale joueurs).
+        Un joueur de plus apporte sa rafale, une seule fois : une session
+        fermée puis réenregistrée ne remplit pas le seau à nouveau.
+        """
+        if scale > self.peak:
+            self.tokens += self.burst * (scale - self.peak)
+            self.peak = scale
+        rate = self.rate * scale
+        self.tokens = min(self.burst * scale, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / rate
+
+
+class RateLimiter:
+    """Seaux d'un joueur ; un débit nul désactive la limite correspondante"""
+
+    __slots__ = ("messages", "queries", "notified")
+
+    def __init__(self, message_rate, query_rate, now):
+        self.messages = TokenBucket(message_rate, message_rate * BURST_SECONDS, now) if message_rate else None
+        self.queries = TokenBucket(query_rate, query_rate * BURST_SECONDS, now) if query_rate else None
+        # Vrai une fois le client prévenu du dépassement : un seul ERROR par dépassement
+        self.notified = False
+
+    def check(self, msg_type, now, scale=1):
+        """Retourne 0 si le message est accepté, sinon le délai avant de réessayer"""
+        if msg_type in UNLIMITED_TYPES:
+            return 0.0
+        bucket = self.queries if msg_type in QUERY_TYPES else self.messages
+        retry_after = bucket.take(now, scale) if bucket is not None else 0.0
+        if not retry_after:
+            self.notified = False
+        return retry_after
@@ -0,0 +1,246 @@
+"""
+Classement Elo des joueurs
+
+RatingBook met à jour le classement des deux joueurs d'une partie terminée
+en une seule opération et tient le tableau des meilleurs joueurs à jour à
+chaque résultat : Leaderboard est un arbre de recherche (treap) dont chaque
+nœud connaît la taille de son sous-arbre. Le rang d'un joueur et la page
+des K premiers s'obtiennent en O(log n) (plus K), sans jamais trier.
+
+Les joueurs sont identifiés par leur nom : l'identifiant player_N change à
+chaque connexion. Le classement est écrit périodiquement dans un fichier
+JSON (remplacé atomiquement) et relu au démarrage.
+"""
+import json
+import os
+import random
+import threading
+import time
+
+DEFAULT_RATING = 1500.0
+# Points échangés au plus par partie
+K_FACTOR = 32.0
+DEFAULT_SAVE_INTERVAL = 10.0
+
+
+def expected_score(rating, opponent_rating):
+    """Score attendu (entre 0 et 1) d'un joueur contre un adversaire"""
+    return 1.0 / (1.0 + 10 ** ((opponent_rating - rating) / 400.0))
+
+
+class _Node:
+    __slots__ = ("key", "priority", "size", "left", "right")
+
+    def __init__(self, key):
+        self.key = key  # (-classement, nom) : les meilleurs d'abord, départagés par nom
+        self.priority = random.random()
+        self.size = 1
+        self.left = None
+        self.right = None
+
+
+def _size(node):
+    return node.size if node else 0
+
+
+def _split(node, key):
+    """Sépare un arbre en (clés < key, clés >= key)"""
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        node.right = left
+        node.size = 1 + _size(node.left) + _size(left)
+        return node, right
+    left, right = _split(node.left, key)
+    node.left = right
+    node.size = 1 + _size(right) + _size(node.right)
+    return left, node
+
+
+def _merge(left, right):
+    """Fusionne deux arbres dont toutes les clés de left précèdent celles de right"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.size = 1 + _size(left.left) + _size(left.right)
+        return left
+    right.left = _merge(left, right.left)
+    right.size = 1 + _size(right.left) + _size(right.right)
+    return right
+
+
+class Leaderboard:
+    """Ensemble ordonné de (classement, nom) avec rang et pages en O(log n)"""
+
+    def __init__(self):
+        self.root = None
+
+    def __len__(self):
+        return _size(self.root)
+
+    def insert(self, rating, name):
+        left, right = _split(self.root, (-rating, name))
+        self.root = _merge(_merge(left, _Node((-rating, name))), right)
+
+    def remove(self, rating, name):
+        key = (-rating, name)
+        left, right = _split(self.root, key)
+        # Seul le nœud de clé key a une clé < successeur immédiat de key
+        _, right = _split(right, (key[0], name + "\0"))
+        self.root = _merge(left, right)
+
+    def rank(self, rating, name):
+        """Rang (1 pour le meilleur) d'un joueur présent"""
+        key = (-rating, name)
+        node = self.root
+        before = 0
+        while node is not None:
+            if node.key < key:
+                before += _size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+        return before + 1
+
+    def page(self, offset, limit):
+        """Joueurs de rang offset + 1 à offset + limit : [(nom, classement)]"""
+        entries = []
+        self._collect(self.root, offset, offset + limit, entries)
+        return entries
+
+    def _collect(self, node, start, stop, entries):
+        """Ajoute les nœuds d'index [start, stop) du sous-arbre, en ignorant les autres sous-arbres"""
+        if node is None or start >= stop or stop <= 0 or start >= node.size:
+            return
+        left_size = _size(node.left)
+        self._collect(node.left, start, stop, entries)
+        if start <= left_size < stop:
+            entries.append((node.key[1], -node.key[0]))
+        self._collect(node.right, start - left_size - 1, stop - left_size - 1, entries)
+
+
+class PlayerRating:
+    __slots__ = ("rating", "games", "wins", "losses", "draws")
+
+    def __init__(self, rating=DEFAULT_RATING, games=0, wins=0, losses=0, draws=0):
+        self.rating = rating
+        self.games = games
+        self.wins = wins
+        self.losses = losses
+        self.draws = draws
+
+    def to_list(self):
+        return [round(self.rating, 2), self.games, self.wins, self.losses, self.draws]
+
+
+class RatingBook:
+    """Classements de tous les joueurs ayant terminé une partie"""
+
+    def __init__(self, path=None, save_interval=DEFAULT_SAVE_INTERVAL):
+        self.path = path
+        self.save_interval = save_interval
+        self.players = {}  # {nom: PlayerRating}
+        self.leaderboard = Leaderboard()
+        self.dirty = False
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    def rating(self, name):
+        """Classement actuel d'un joueur (DEFAULT_RATING s'il n'a jamais joué)"""
+        entry = self.players.get(name)
+        return entry.rating if entry else DEFAULT_RATING
+
+    def record(self, name1, name2, score1):
+        """Met à jour les deux joueurs d'une partie ; score1 vaut 1, 0.5 ou 0 pour name1
+
+        Retourne les nouveaux classements (classement1, classement2).
+        """
+        with self.lock:
+            entry1 = self._entry(name1)
+            entry2 = self._entry(name2)
+            change = K_FACTOR * (score1 - expected_score(entry1.rating, entry2.rating))
+            self._update(name1, entry1, entry1.rating + change, score1)
+            self._update(name2, entry2, entry2.rating - change, 1.0 - score1)
+            self.dirty = True
+            return entry1.rating, entry2.rating
+
+    def _entry(self, name):
+        entry = self.players.get(name)
+        if entry is None:
+            entry = self.players[name] = PlayerRating()
+            self.leaderboard.insert(entry.rating, name)
+        return entry
+
+    def _update(self, name, entry, rating, score):
+        self.leaderboard.remove(entry.rating, name)
+        entry.rating = rating
+        self.leaderboard.insert(rating, name)
+        entry.games += 1
+        if score == 1.0:
+            entry.wins += 1
+        elif score == 0.0:
+            entry.losses += 1
+        else:
+            entry.draws += 1
+
+    def top(self, offset, limit):
+        """Page du classement : [{"rank", "name", "rating", "games"}], et le nombre de joueurs classés"""
+        with self.lock:
+            page = [
+                {"rank": offset + index + 1, "name": name, "rating": round(rating), "games": self.players[name].games}
+                for index, (name, rating) in enumerate(self.leaderboard.page(offset, limit))
+            ]
+            return page, len(self.leaderboard)
+
+    def standing(self, name):
+        """Rang et bilan d'un joueur (rang None s'il n'a jamais joué)"""
+        with self.lock:
+            entry = self.players.get(name)
+            standing = {"name": name, "rank": None, "rating": round(DEFAULT_RATING), "total": len(self.leaderboard)}
+            if entry is not None:
+                standing.update(
+                    rank=self.leaderboard.rank(entry.rating, name),
+                    rating=round(entry.rating),
+                    games=entry.games,
+                    wins=entry.wins,
+                    losses=entry.losses,
+                    draws=entry.draws
+                )
+            return standing
+
+    def load(self):
+        with open(self.path) as ratings_file:
+            for name, values in json.load(ratings_file).items():
+                entry = self.players[name] = PlayerRating(*values)
+                self.leaderboard.insert(entry.rating, name)
+        print(f"📈 {len(self.players)} classement(s) chargé(s) depuis {self.path}")
+
+    def save(self):
+        """Écrit les classements (fichier remplacé atomiquement)"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {name: entry.to_list() for name, entry in self.players.items()}
+            self.dirty = False
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as ratings_file:
+            json.dump(data, ratings_file, separators=(",", ":"))
+        os.replace(temporary, self.path)
+
+    def start(self):
+        """Écrit les classements toutes les save_interval secondes s'ils ont changé"""
+        if self.path:
+            threading.Thread(target=self.run, name="ratings-saver", daemon=True).start()
+
+    def run(self):
+        while True:
+            time.sleep(self.save_interval)
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Erreur d'écriture des classements: {e}")
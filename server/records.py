@@ -0,0 +1,94 @@
+"""
+Enregistrements compacts du serveur
+
+PlayerSession et GameRecord déclarent leurs champs avec __slots__ : pas de
+dictionnaire par instance, et tous les champs existent toujours (None par
+défaut) au lieu de clés ajoutées puis retirées.
+
+Les parties terminées quittent le registre du serveur ; seul un GameRecord
+est gardé dans RecentResults, dont la taille est bornée : la mémoire du
+serveur ne dépend pas du nombre de parties déjà jouées.
+"""
+import collections
+import time
+
+DEFAULT_RECENT_RESULTS = 1000
+
+
+class PlayerSession:
+    """Joueur connecté"""
+
+    __slots__ = (
+        "connection", "name", "features", "protocol",
+        "game_id", "tournament_id", "spectating", "remote", "remote_shard"
+    )
+
+    def __init__(self, connection, name, features, protocol, remote=False):
+        self.connection = connection
+        self.name = name
+        self.features = features  # Fonctionnalités négociées au REGISTER
+        self.protocol = protocol  # Format des trames envoyées après le REGISTER_OK
+        self.game_id = None  # Partie en cours
+        self.tournament_id = None  # Tournoi en cours ou en inscription
+        self.spectating = None  # Partie suivie en spectateur
+        self.remote = remote  # Mode processes : joueur d'un autre worker
+        self.remote_shard = None  # Mode processes : worker hébergeant sa partie
+
+    @property
+    def in_game(self):
+        return self.game_id is not None
+
+
+class GameRecord:
+    """Résultat d'une partie terminée"""
+
+    __slots__ = ("game_id", "player1", "player2", "winner", "moves", "reason", "ended_at")
+
+    def __init__(self, game_id, player1, player2, winner, moves, reason=None):
+        self.game_id = game_id
+        self.player1 = player1  # Noms des joueurs
+        self.player2 = player2
+        self.winner = winner  # Nom du gagnant, None pour un match nul
+        self.moves = moves
+        self.reason = reason  # Fin anticipée (déconnexion, forfait)
+        self.ended_at = time.time()
+
+    def to_dict(self):
+        return {
+            "game_id": self.game_id,
+            "player1": self.player1,
+            "player2": self.player2,
+            "winner": self.winner,
+            "moves": self.moves,
+            "reason": self.reason,
+            "ended_at": round(self.ended_at, 3),
+        }
+
+
+class RecentResults:
+    """Derniers résultats, les plus anciens étant évincés au-delà de capacity"""
+
+    def __init__(self, capacity=DEFAULT_RECENT_RESULTS):
+        self.capacity = capacity
+        self.records = collections.OrderedDict()  # {game_id: GameRecord}, du plus ancien au plus récent
+
+    def add(self, record):
+        self.records[record.game_id] = record
+        while len(self.records) > self.capacity:
+            self.records.popitem(last=False)
+
+    def get(self, game_id):
+        return self.records.get(game_id)
+
+    def page(self, offset, limit):
+        """Résultats du plus récent au plus ancien"""
+        records = []
+        for index, record in enumerate(reversed(self.records.values())):
+            if index >= offset + limit:
+                break
+            if index >= offset:
+                records.append(record)
+        return records
+
+    def __len__(self):
+        return len(self.records)
@@ -1,40 +1,204 @@
 """
 Serveur de jeu Puissance 4
 """
+import contextlib
+import os
+import secrets
 import socket
 import threading
 import sys
+import time
 from pathlib import Path
 
 # Ajouter le répertoire parent au path pour les imports
 sys.path.append(str(Path(__file__).parent.parent))
 
-from shared.protocol import Protocol
+from shared.protocol import Protocol, BinaryProtocol, SessionProtocol
+from shared.framing import FrameBuffer
+from shared.opening_book import open_book, DEFAULT_BOOK_PATH
 from game import Connect4Game
+from lobby import LobbyIndex, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from matchmaking import MatchmakingQueue, Tournament
+from ratings import RatingBook
+from ratelimit import RateLimiter, DEFAULT_MESSAGE_RATE, DEFAULT_QUERY_RATE
+from analysis import (
+    AnalysisService, board_position, DEFAULT_WORKERS as DEFAULT_ANALYSIS_WORKERS,
+    DEFAULT_CACHE_SIZE as DEFAULT_ANALYSIS_CACHE, DEFAULT_TIME_BUDGET as DEFAULT_ANALYSIS_TIME
+)
+from metrics import Metrics, MetricsDumper, InstrumentedLock, timed
+from journal import Journal, DEFAULT_SNAPSHOT_INTERVAL, START, MOVE, OVER
+from broadcast import Audience, Broadcaster
+from records import PlayerSession, GameRecord, RecentResults, DEFAULT_RECENT_RESULTS
+from timer_wheel import TimerWheel
+from connection import (
+    ClientConnection, OutboundWriter, DEFAULT_MAX_QUEUED_BYTES, DEFAULT_STALL_TIMEOUT
+)
+
+# Délai laissé aux joueurs d'une partie recouvrée pour reprendre leur place, en secondes
+DEFAULT_RESUME_TIMEOUT = 120.0
+# Secondes sans rien recevoir d'un client avant de fermer sa connexion (0 : jamais).
+# Désactivé par défaut : un client qui ne répond pas aux PING serait déconnecté
+DEFAULT_IDLE_TIMEOUT = 0
+# Secondes laissées à un joueur pour jouer son coup avant de perdre par forfait (0 : illimité)
+DEFAULT_TURN_TIMEOUT = 0
+# Écart de classement Elo toléré par l'appariement automatique (None : ordre d'arrivée)
+DEFAULT_MATCH_RATING_GAP = 200.0
+
+# File des connexions en attente d'accept() (plafonnée par net.core.somaxconn)
+DEFAULT_BACKLOG = 1024
+# Connexions ouvertes au plus (0 : illimité) ; au-delà, refus avec un délai avant de réessayer
+DEFAULT_MAX_CONNECTIONS = 10000
+FULL_RETRY_AFTER = 5.0
+# Délai avant de fermer une connexion refusée, le temps que le client lise l'ERROR
+REFUSE_LINGER = 1.0
+# Secondes d'attente au plus de l'écriture d'un coup sur disque avant de répondre par une ERROR
+JOURNAL_WAIT_TIMEOUT = 5.0
+
+# Trames de contrôle, encodées une seule fois (JSON : décodables par tous les clients)
+PING_FRAME = Protocol.encode(Protocol.PING)
+PONG_FRAME = Protocol.encode(Protocol.PONG)
+FULL_FRAME = Protocol.encode(
+    Protocol.ERROR, {"message": "Serveur complet, réessayez plus tard", "retry_after": FULL_RETRY_AFTER}
+)
+
+# Types de message connus : un type inventé par un client est compté sous
+# UNKNOWN au lieu de créer une nouvelle série de métriques
+KNOWN_MESSAGE_TYPES = frozenset(Protocol.MESSAGE_TYPES)
+
+
+def message_label(msg_type):
+    """Étiquette de métrique d'un type de message reçu"""
+    return msg_type if isinstance(msg_type, str) and msg_type in KNOWN_MESSAGE_TYPES else "UNKNOWN"
+
 
 class GameServer:
-    def __init__(self, host='0.0.0.0', port=5555):
+    # Fonctionnalités optionnelles que le serveur sait négocier
+    SUPPORTED_FEATURES = frozenset({Protocol.FEATURE_DELTA, Protocol.FEATURE_BINARY})
+    # Joueurs multiplexés au plus sur une même connexion
+    MAX_SESSIONS = 4096
+    # Analyse des positions dans des processus (sinon dans des threads)
+    analysis_processes = True
+    
+    def __init__(self, host='0.0.0.0', port=5555, max_frame_size=64 * 1024,
+                 max_queued_bytes=DEFAULT_MAX_QUEUED_BYTES, stall_timeout=DEFAULT_STALL_TIMEOUT,
+                 tournament_size=8, opening_book=None, metrics_file=None, metrics_interval=10.0,
+                 journal_dir=None, journal_sync=True, snapshot_interval=DEFAULT_SNAPSHOT_INTERVAL,
+                 resume_timeout=DEFAULT_RESUME_TIMEOUT, recent_results=DEFAULT_RECENT_RESULTS,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, ping_interval=None, turn_timeout=DEFAULT_TURN_TIMEOUT,
+                 ratings_file=None, match_rating_gap=DEFAULT_MATCH_RATING_GAP, backlog=DEFAULT_BACKLOG,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, message_rate=DEFAULT_MESSAGE_RATE,
+                 query_rate=DEFAULT_QUERY_RATE, analysis_workers=DEFAULT_ANALYSIS_WORKERS,
+                 analysis_cache=DEFAULT_ANALYSIS_CACHE, analysis_time=DEFAULT_ANALYSIS_TIME):
         self.host = host
         self.port = port
+        self.max_frame_size = max_frame_size  # Au-delà, la connexion du client est fermée
+        # File d'envoi par connexion : taille maximale et délai sans progrès avant éviction
+        self.max_queued_bytes = max_queued_bytes
+        self.stall_timeout = stall_timeout
         self.server_socket = None
-        self.players = {}  # {player_id: {"socket": socket, "name": name, "in_game": False}}
-        self.games = {}  # {game_id: Connect4Game}
+        self.writer = None
+        # Admission : file d'attente du listen(), connexions simultanées et débit
+        # de messages par joueur (0 : pas de limite)
+        self.backlog = backlog
+        self.max_connections = max_connections
+        self.connections_open = 0
+        self.connections_lock = threading.Lock()
+        self.message_rate = message_rate
+        self.query_rate = query_rate
+        self.players = {}  # {player_id: PlayerSession}
+        self.games = {}  # {game_id: Connect4Game} des parties en cours uniquement
+        self.recent_results = RecentResults(recent_results)  # GameRecord des dernières parties terminées
+        self.lobby = LobbyIndex()  # Joueurs libres, tenu à jour à chaque changement de in_game
+        self.game_locks = {}  # {game_id: Lock} : sérialise les coups d'une même partie
+        # {game_id: (nom du joueur 1, nom du joueur 2)} : les noms restent connus même
+        # quand un joueur (distant, ou pas revenu après reprise) a quitté self.players
+        self.game_names = {}
+        self.spectators = {}  # {game_id: Audience} des parties suivies par des spectateurs
+        # Classements Elo, mis à jour à chaque fin de partie et écrits dans ratings_file
+        self.ratings = RatingBook(ratings_file)
+        # Joueurs attendant un adversaire de classement proche
+        self.matchmaking = MatchmakingQueue(match_rating_gap)
+        # Tournoi en cours d'inscription : il démarre dès tournament_size inscrits
+        # (ou sur TOURNAMENT_START d'un inscrit)
+        self.tournament_size = tournament_size
+        self.tournament_signups = []
+        self.tournaments = {}  # {tournament_id: Tournament} en cours
+        self.tournament_games = {}  # {game_id: (Tournament, clé du match)}
         self.player_counter = 0
         self.game_counter = 0
-        self.lock = threading.Lock()
+        self.tournament_counter = 0
+        # Bibliothèque d'ouvertures projetée en mémoire (None si absente) pour les HINT
+        # Un fichier illisible ou corrompu n'empêche pas le serveur de démarrer
+        try:
+            self.opening_book = open_book(opening_book)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Bibliothèque d'ouvertures ignorée : {e}")
+            self.opening_book = None
+        # Métriques (compteurs par thread) et export périodique optionnel au format Prometheus
+        self.metrics = Metrics()
+        self.metrics_file = metrics_file
+        self.metrics_interval = metrics_interval
+        self.metrics.register_gauge("connections_open", lambda: self.connections_open)
+        self.metrics.register_gauge("players_connected", lambda: len(self.players))
+        self.metrics.register_gauge("players_in_lobby", lambda: len(self.lobby))
+        self.metrics.register_gauge(
+            "games_active", lambda: sum(1 for game in list(self.games.values()) if not game.game_over)
+        )
+        self.metrics.register_gauge("tournaments_active", lambda: len(self.tournaments))
+        self.metrics.register_gauge("players_rated", lambda: len(self.ratings.leaderboard))
+        # Échéances d'inactivité et de temps de réflexion, toutes dans une seule roue :
+        # un client sans nouvelles reçoit un PING après ping_interval (par défaut
+        # un tiers de idle_timeout) et est déconnecté après idle_timeout
+        self.timers = TimerWheel()
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval or idle_timeout / 3
+        self.turn_timeout = turn_timeout
+        self.turn_started = {}  # {game_id: instant du dernier coup} des parties en cours
+        self.metrics.register_gauge("timers_pending", lambda: len(self.timers))
+        # Analyse des positions (ANALYZE, HINT hors bibliothèque) dans un pool de
+        # workers, avec un cache partagé par toutes les parties
+        self.analysis = AnalysisService(
+            analysis_workers, analysis_cache, analysis_time, self.opening_book,
+            processes=self.analysis_processes, metrics=self.metrics
+        )
+        self.metrics.register_gauge("analysis_cache_entries", lambda: len(self.analysis.cache))
+        self.metrics.register_gauge("analysis_pending", self.analysis.pending_count)
+        # Verrou du registre (players, games, compteurs) : jamais tenu pendant une
+        # écriture réseau, ni pendant l'acquisition d'un verrou de partie.
+        # Ses temps d'attente et de détention sont mesurés.
+        self.lock = InstrumentedLock(self.metrics, "registry_lock")
+        # Diffusion aux spectateurs hors du chemin de traitement des coups
+        self.broadcaster = Broadcaster(self.metrics)
+        # Journal des parties (désactivé sans journal_dir). Avec journal_sync, un coup
+        # n'est confirmé aux joueurs qu'une fois écrit sur disque.
+        self.journal = None
+        self.journal_sync = journal_sync
+        self.resume_timeout = resume_timeout
+        # Places des parties recouvrées : {jeton de reprise: (game_id, numéro, (nom1, nom2))}
+        self.resumable = {}
+        if journal_dir:
+            self.journal = Journal(journal_dir, snapshot_interval=snapshot_interval, metrics=self.metrics)
+            self._restore_games(self.journal.recover())
     
     def start(self):
         """Démarre le serveur"""
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_socket.bind((self.host, self.port))
-        self.server_socket.listen(5)
+        self.server_socket.listen(self.backlog)
+        
+        self.writer = OutboundWriter()
+        self.writer.start()
+        self.start_services()
         
         print(f"🎮 Serveur Puissance 4 démarré sur {self.host}:{self.port}")
         
         while True:
             try:
                 client_socket, address = self.server_socket.accept()
+                if not self.open_slot():
+                    self.refuse_connection(client_socket)
+                    continue
                 print(f"📡 Nouvelle connexion depuis {address}")
                 
                 # Crée un thread pour gérer ce client
@@ -49,267 +213,1633 @@ class GameServer:
     
     def handle_client(self, client_socket, address):
         """Gère la communication avec un client"""
+        connection = ClientConnection(
+            client_socket, self.writer, self.evict_connection,
+            self.max_queued_bytes, self.stall_timeout
+        )
+        self.watch_connection(connection)
         player_id = None
-        buffer = b""
+        frames = FrameBuffer(self.max_frame_size)
         
         try:
             while True:
                 data = client_socket.recv(4096)
                 if not data:
                     break
+                connection.last_received = time.monotonic()
+                self.metrics.inc("bytes_in_total", value=len(data))
                 
-                buffer += data
-                
-                # Traite tous les messages complets dans le buffer
-                while b'\n' in buffer:
-                    message, buffer = buffer.split(b'\n', 1)
-                    msg_type, msg_data = Protocol.decode(message + b'\n')
+                # Traite toutes les trames complètes (JSON ou binaires) reçues
+                for message in frames.feed(data):
+                    msg_type, msg_data, session = Protocol.decode_session(message)
                     
-                    if msg_type == Protocol.REGISTER:
-                        player_id = self.register_player(client_socket, msg_data)
+                    if not self.admit_message(connection, session, msg_type):
+                        continue
                     
-                    elif msg_type == Protocol.LIST_PLAYERS:
-                        self.send_player_list(player_id)
+                    if session is not None:
+                        self.handle_session_message(connection, session, msg_type, msg_data)
+                        continue
                     
-                    elif msg_type == Protocol.CHALLENGE:
-                        self.handle_challenge(player_id, msg_data)
+                    if msg_type == Protocol.DISCONNECT:
+                        return
                     
-                    elif msg_type == Protocol.CHALLENGE_ACCEPTED:
-                        self.start_game(msg_data["challenger_id"], player_id)
-                    
-                    elif msg_type == Protocol.CHALLENGE_REFUSED:
-                        self.handle_challenge_refused(msg_data["challenger_id"], player_id)
-                    
-                    elif msg_type == Protocol.PLAY_MOVE:
-                        self.handle_move(player_id, msg_data)
-                    
-                    elif msg_type == Protocol.DISCONNECT:
-                        break
+                    player_id = self.handle_message(connection, player_id, msg_type, msg_data)
         
         except Exception as e:
             print(f"Erreur avec le client {address}: {e}")
         
         finally:
-            if player_id:
-                self.disconnect_player(player_id)
+            self.release_connection(connection)
+            connection.close()
+            client_socket.close()
+            self.close_slot()
+            if connection.write_errors:
+                self.metrics.inc("send_errors_total", "write_failed", connection.write_errors)
+    
+    def open_slot(self):
+        """Réserve une place pour une nouvelle connexion ; False si max_connections est atteint"""
+        with self.connections_lock:
+            if self.max_connections and self.connections_open >= self.max_connections:
+                return False
+            self.connections_open += 1
+            return True
+    
+    def close_slot(self):
+        with self.connections_lock:
+            self.connections_open -= 1
+    
+    def refuse_connection(self, client_socket):
+        """Ferme une connexion au-delà de max_connections en indiquant quand réessayer"""
+        self.metrics.inc("connections_refused_total")
+        try:
+            client_socket.send(FULL_FRAME)
+            client_socket.shutdown(socket.SHUT_WR)
+        except OSError:
             client_socket.close()
+            return
+        # Fermer tout de suite un socket dont la requête n'a pas été lue enverrait
+        # un RST, qui peut faire perdre l'ERROR au client avant qu'il ne l'ait lu
+        self.timers.schedule(REFUSE_LINGER, client_socket.close)
     
-    def register_player(self, client_socket, data):
-        """Enregistre un nouveau joueur"""
+    def admit_message(self, connection, session, msg_type):
+        """Applique la limite de débit de la connexion, puis de la session, au message reçu
+        
+        Le seau de la connexion accepte le débit d'un joueur par joueur
+        enregistré ; seule une session enregistrée a en plus son propre seau.
+        Retourne False si le message est refusé. Le client est prévenu par un
+        ERROR contenant retry_after, une seule fois par dépassement : un client
+        qui s'emballe ne reçoit pas une réponse par message ignoré.
+        """
+        if not (self.message_rate or self.query_rate):
+            return True
+        
+        now = time.monotonic()
+        label = message_label(msg_type)
+        limiter = connection.rate_limit
+        if limiter is None:
+            limiter = connection.rate_limit = RateLimiter(self.message_rate, self.query_rate, now)
+        players = len(connection.sessions) + (1 if connection.player_id else 0)
+        retry_after = limiter.check(label, now, max(1, players))
+        if not retry_after and session in connection.sessions:
+            limiter = connection.rate_limits.get(session)
+            if limiter is None:
+                limiter = connection.rate_limits[session] = RateLimiter(self.message_rate, self.query_rate, now)
+            retry_after = limiter.check(label, now)
+        if not retry_after:
+            return True
+        
+        self.metrics.inc("messages_limited_total", label)
+        if not limiter.notified:
+            limiter.notified = True
+            connection.send(Protocol.encode(
+                Protocol.ERROR,
+                {"message": "Trop de messages, réessayez plus tard", "type": msg_type, "retry_after": round(retry_after, 3)},
+                session
+            ))
+        return False
+    
+    def start_services(self):
+        """Démarre la diffusion aux spectateurs, les échéances, l'export des métriques,
+        l'écriture des classements et le journal"""
+        self.broadcaster.start()
+        self.start_timers()
+        self.ratings.start()
+        
+        if self.metrics_file:
+            MetricsDumper(self.metrics, self.metrics_file, self.metrics_interval).start()
+        
+        if self.journal:
+            self.journal.start()
+            if self.resumable:
+                timer = threading.Timer(self.resume_timeout, self.abandon_unresumed_games)
+                timer.daemon = True
+                timer.start()
+    
+    def start_timers(self):
+        """Fait avancer la roue des échéances depuis un thread dédié"""
+        self.timers.start()
+    
+    def _restore_games(self, state):
+        """Recrée les parties en cours décrites par le journal
+        
+        Les joueurs n'existent plus : chacun reprend sa place en se
+        réenregistrant avec le jeton de reprise reçu dans son GAME_START.
+        """
+        self.player_counter = state.player_counter
+        self.game_counter = state.game_counter
+        
+        for game_id, (player1_id, player2_id, name1, name2, token1, token2, columns) in list(state.games.items()):
+            game = Connect4Game(player1_id, player2_id)
+            replayed = all(type(column) is int and game.play_move(column)[0] for column in columns)
+            if not replayed:
+                # Coup illisible ou illégal : seule cette partie est perdue, pas la reprise
+                print(f"⚠️  Partie {game_id} ignorée : coups du journal invalides")
+                self.journal.append([OVER, game_id])
+                continue
+            if game.game_over:
+                # Arrêt entre le coup final et l'enregistrement de la fin de partie
+                self.journal.append([OVER, game_id])
+                continue
+            
+            self.games[game_id] = game
+            self.game_locks[game_id] = threading.Lock()
+            self.game_names[game_id] = (name1, name2)
+            self.resumable[token1] = (game_id, 1, (name1, name2))
+            self.resumable[token2] = (game_id, 2, (name1, name2))
+            self._watch_turn(game_id, game)
+        
+        if self.games:
+            print(f"💾 {len(self.games)} partie(s) reprise(s) depuis le journal")
+    
+    def abandon_unresumed_games(self):
+        """Termine les parties recouvrées dont un joueur n'est pas revenu à temps"""
+        outbox = []
+        
         with self.lock:
-            self.player_counter += 1
-            player_id = f"player_{self.player_counter}"
-            player_name = data.get("name", player_id)
+            abandoned = {game_id for game_id, _, _ in self.resumable.values()}
+            self.resumable.clear()
+            games = [(game_id, self.games.get(game_id), self.game_locks.get(game_id)) for game_id in abandoned]
+        
+        for game_id, game, game_lock in games:
+            if game is None:
+                continue
+            # Verrou de la partie d'abord : aucun coup ne peut suivre la fin de partie
+            with game_lock, self.lock:
+                if self.games.get(game_id) is not game or game.game_over:
+                    continue
+                game.game_over = True
+                
+                # Le joueur revenu gagne par forfait
+                winner_id = None
+                for pid in (game.player1_id, game.player2_id):
+                    if pid in self.players:
+                        winner_id = pid
+                        self.queue_message(
+                            outbox,
+                            pid,
+                            Protocol.GAME_OVER,
+                            {"winner": self.players[pid].name, "reason": "Adversaire non revenu"}
+                        )
+                        self._set_in_game(pid, None)
+                
+                self._close_audience(
+                    game_id,
+                    {
+                        "game_id": game_id,
+                        "winner": self._game_player_name(game_id, game, winner_id) if winner_id else None,
+                        "winner_id": winner_id,
+                        "reason": "Joueur non revenu"
+                    }
+                )
+                
+                self.journal.append([OVER, game_id])
+                self._retire_game(game_id, game, winner_id, "Joueur non revenu")
+        
+        self.send_all(outbox)
+    
+    def evict_connection(self, connection, reason):
+        """Ferme la connexion d'un client trop lent et libère le joueur"""
+        self.metrics.inc("send_errors_total", "evicted")
+        print(f"🐌 Connexion de {connection.player_id or 'client inconnu'} fermée: {reason}")
+        connection.close()
+        self.release_connection(connection)
+    
+    def release_connection(self, connection):
+        """Déconnecte tous les joueurs portés par une connexion fermée"""
+        for player_id in connection.player_ids():
+            self.disconnect_player(player_id)
+    
+    def watch_connection(self, connection):
+        """Programme le contrôle d'inactivité d'une nouvelle connexion"""
+        if self.idle_timeout:
+            self.timers.schedule(self.ping_interval, self._check_idle, connection)
+    
+    def _check_idle(self, connection):
+        """Échéance d'inactivité d'une connexion, exécutée par la roue
+        
+        Sans réception depuis ping_interval, le client reçoit un PING ; sans
+        réception depuis idle_timeout, il est considéré comme disparu (machine
+        arrêtée, connexion à moitié ouverte) et sa session est libérée. Une
+        seule échéance est en attente par connexion : elle est reprogrammée
+        d'après la dernière réception au lieu de l'être à chaque message.
+        """
+        if connection.closed:
+            return
+        
+        idle = time.monotonic() - connection.last_received
+        if idle >= self.idle_timeout:
+            self.metrics.inc("timeouts_total", "idle")
+            print(f"⏰ Connexion de {connection.player_id or 'client inconnu'} fermée: inactive depuis {idle:.0f}s")
+            connection.close()
+            self.release_connection(connection)
+            return
+        
+        if idle >= self.ping_interval:
+            connection.send(PING_FRAME)
+            delay = self.idle_timeout - idle
+        else:
+            delay = self.ping_interval - idle
+        self.timers.schedule(delay, self._check_idle, connection)
+    
+    def handle_session_message(self, connection, session, msg_type, msg_data):
+        """Traite un message d'un joueur multiplexé sur la connexion
+        
+        Chaque identifiant de session est un joueur distinct : REGISTER peut
+        être envoyé une fois par session, DISCONNECT ne déconnecte que le
+        joueur de la session et la connexion reste ouverte pour les autres.
+        """
+        player_id = connection.sessions.get(session)
+        
+        if msg_type == Protocol.DISCONNECT:
+            connection.rate_limits.pop(session, None)
+            if player_id is not None:
+                del connection.sessions[session]
+                self.disconnect_player(player_id)
+            return
+        
+        if msg_type == Protocol.REGISTER:
+            if player_id is not None:
+                message = "Session déjà enregistrée"
+            elif len(connection.sessions) >= self.MAX_SESSIONS:
+                message = f"Plus de {self.MAX_SESSIONS} joueurs sur la connexion"
+            else:
+                message = None
+            if message:
+                connection.send(Protocol.encode(Protocol.ERROR, {"message": message}, session))
+                return
+        
+        player_id = self.handle_message(connection, player_id, msg_type, msg_data, session)
+        if player_id is not None:
+            connection.sessions[session] = player_id
+    
+    def handle_message(self, connection, player_id, msg_type, msg_data, session=None):
+        """Traite un message décodé et retourne l'ID du joueur associé à la connexion (ou à la session)"""
+        self.metrics.inc("messages_in_total", message_label(msg_type))
+        
+        if msg_type == Protocol.REGISTER:
+            player_id = self.register_player(connection, msg_data, session)
+        
+        elif msg_type == Protocol.LIST_PLAYERS:
+            self.send_player_list(player_id, msg_data)
+        
+        elif msg_type == Protocol.CHALLENGE:
+            self.handle_challenge(player_id, msg_data)
+        
+        elif msg_type == Protocol.CHALLENGE_ACCEPTED:
+            self.start_game(msg_data["challenger_id"], player_id)
+        
+        elif msg_type == Protocol.CHALLENGE_REFUSED:
+            self.handle_challenge_refused(msg_data["challenger_id"], player_id)
+        
+        elif msg_type == Protocol.PLAY_MOVE:
+            self.handle_move(player_id, msg_data)
+        
+        elif msg_type == Protocol.RESYNC:
+            self.handle_resync(player_id)
+        
+        elif msg_type == Protocol.JOIN_QUEUE:
+            self.join_queue(player_id)
+        
+        elif msg_type == Protocol.LEAVE_QUEUE:
+            self.leave_queue(player_id)
+        
+        elif msg_type == Protocol.TOURNAMENT_JOIN:
+            self.join_tournament(player_id)
+        
+        elif msg_type == Protocol.TOURNAMENT_START:
+            self.start_tournament(player_id)
+        
+        elif msg_type == Protocol.HINT:
+            self.handle_hint(player_id)
+        
+        elif msg_type == Protocol.ANALYZE:
+            self.handle_analyze(player_id, msg_data)
+        
+        elif msg_type == Protocol.STATS:
+            self.send_stats(connection, player_id, session)
+        
+        elif msg_type == Protocol.LIST_GAMES:
+            self.send_game_list(player_id, msg_data)
+        
+        elif msg_type == Protocol.SPECTATE:
+            self.spectate(player_id, msg_data)
+        
+        elif msg_type == Protocol.UNSPECTATE:
+            self.unspectate(player_id)
+        
+        elif msg_type == Protocol.LEADERBOARD:
+            self.send_leaderboard(player_id, msg_data)
+        
+        elif msg_type == Protocol.MY_RANK:
+            self.send_rank(player_id)
+        
+        elif msg_type == Protocol.PING:
+            connection.send(PONG_FRAME)
+        
+        # PONG : la réception suffit à repousser l'échéance d'inactivité
+        
+        return player_id
+    
+    def register_player(self, connection, data, session=None):
+        """Enregistre un nouveau joueur
+        
+        Avec un resume_token valide, le joueur reprend sa place (identifiant
+        et nom compris) dans une partie recouvrée depuis le journal.
+        Avec session, le joueur est multiplexé : toutes ses trames portent
+        cet identifiant de session.
+        """
+        features = self.SUPPORTED_FEATURES.intersection(data.get("features", ()))
+        token = data.get("resume_token")
+        outbox = []
+        
+        with self.lock:
+            seat = self._claim_seat(token) if token else None
+            if seat:
+                game_id, number, names = seat
+                game = self.games[game_id]
+                player_id = game.player1_id if number == 1 else game.player2_id
+                player_name = names[number - 1]
+            else:
+                player_id = self._new_player_id()
+                player_name = data.get("name", player_id)
+            if session is None:
+                connection.player_id = player_id
             
-            self.players[player_id] = {
-                "socket": client_socket,
-                "name": player_name,
-                "in_game": False
-            }
+            # La confirmation (toujours en JSON) est mise en file avant que le joueur
+            # ne devienne visible : aucun autre message ne peut la précéder
+            confirmation = {"player_id": player_id, "features": sorted(features)}
+            if seat:
+                confirmation["resumed_game"] = game_id
+            connection.send(Protocol.encode(Protocol.REGISTER_OK, confirmation, session), flush=False)
             
-            # Envoie la confirmation
-            response = Protocol.encode(Protocol.REGISTER_OK, {"player_id": player_id})
-            client_socket.send(response)
+            protocol = BinaryProtocol if Protocol.FEATURE_BINARY in features else Protocol
+            if session is not None:
+                protocol = SessionProtocol(protocol, session)
+            self.players[player_id] = PlayerSession(connection, player_name, features, protocol)
             
+            if seat:
+                self._set_in_game(player_id, game_id)
+                self.queue_message(
+                    outbox,
+                    player_id,
+                    Protocol.GAME_START,
+                    {
+                        "game_id": game_id,
+                        "player1": names[0],
+                        "player2": names[1],
+                        "your_number": number,
+                        "your_name": player_name,
+                        "resume_token": token,
+                        "resumed": True
+                    }
+                )
+            else:
+                self.lobby.add(player_id, player_name)
+        
+        connection.flush()
+        self.send_all(outbox)
+        
+        if seat:
+            print(f"♻️  {player_name} ({player_id}) a repris la partie {game_id}")
+            self.send_game_update(game_id)
+        else:
             print(f"✅ Joueur enregistré: {player_name} ({player_id})")
-            return player_id
+        return player_id
     
-    def send_player_list(self, player_id):
-        """Envoie la liste des joueurs disponibles"""
+    def _claim_seat(self, token):
+        """Retire et retourne la place d'une partie recouvrée associée au jeton, verrou tenu
+        
+        Retourne None si le jeton est inconnu ou si la partie n'existe plus.
+        """
+        seat = self.resumable.pop(token, None)
+        if seat is None:
+            return None
+        game = self.games.get(seat[0])
+        if game is None or game.game_over:
+            return None
+        player_id = game.player1_id if seat[1] == 1 else game.player2_id
+        return seat if player_id not in self.players else None
+    
+    def _new_player_id(self):
+        """Identifiant du prochain joueur, verrou global tenu"""
+        self.player_counter += 1
+        return f"player_{self.player_counter}"
+    
+    def _new_game_id(self):
+        """Identifiant de la prochaine partie, verrou global tenu"""
+        self.game_counter += 1
+        return f"game_{self.game_counter}"
+    
+    def _parse_page(self, player_id, data):
+        """(offset, limit) d'une demande de page, limit bornée à MAX_PAGE_SIZE
+        
+        Retourne None, après avoir répondu par une ERROR, si les paramètres sont invalides.
+        """
+        try:
+            offset = max(0, int(data.get("offset", 0)))
+            limit = min(MAX_PAGE_SIZE, max(1, int(data.get("limit", DEFAULT_PAGE_SIZE))))
+        except (TypeError, ValueError):
+            self.send_message(player_id, Protocol.ERROR, {"message": "Paramètres de liste invalides"})
+            return None
+        return offset, limit
+    
+    def send_player_list(self, player_id, data=None):
+        """Envoie une page de la liste des joueurs disponibles
+        
+        data peut contenir offset, limit (au plus MAX_PAGE_SIZE) et prefix
+        (filtre sur le début du nom, insensible à la casse).
+        """
+        data = data or {}
+        page = self._parse_page(player_id, data)
+        if page is None:
+            return
+        offset, limit = page
+        prefix = str(data.get("prefix", ""))
+        
+        outbox = []
         with self.lock:
-            available_players = [
-                {"id": pid, "name": pdata["name"]}
-                for pid, pdata in self.players.items()
-                if not pdata["in_game"] and pid != player_id
-            ]
-            
-            response = Protocol.encode(Protocol.LIST_PLAYERS, {"players": available_players})
-            self.players[player_id]["socket"].send(response)
+            available_players, total = self.lobby.page(offset, limit, prefix, exclude=player_id)
+            self.queue_message(
+                outbox,
+                player_id,
+                Protocol.LIST_PLAYERS,
+                {
+                    "players": available_players,
+                    "total": total,
+                    "offset": offset,
+                    "limit": limit,
+                    "prefix": prefix
+                }
+            )
+        self.send_all(outbox)
+    
+    def _set_in_game(self, player_id, game_id):
+        """Marque un joueur en jeu (game_id) ou libre (None), verrou tenu
+        
+        Un participant à un tournoi en cours reste hors du lobby entre ses matchs.
+        """
+        player = self.players[player_id]
+        player.game_id = game_id
+        if game_id:
+            self.lobby.remove(player_id)
+            self.matchmaking.leave(player_id)
+            self._stop_spectating(player_id)
+        else:
+            if not player.tournament_id:
+                self.lobby.add(player_id, player.name)
+    
+    def _player_name(self, player_id):
+        """Nom d'un joueur connecté, ou son identifiant, verrou tenu"""
+        player = self.players.get(player_id)
+        return player.name if player else player_id
+    
+    def _game_player_name(self, game_id, game, player_id):
+        """Nom d'un participant tel qu'au début de la partie, verrou tenu"""
+        return self.game_names[game_id][0 if player_id == game.player1_id else 1]
+    
+    def _is_available(self, player_id):
+        """Vrai si le joueur peut être défié ou apparié, verrou tenu"""
+        player = self.players.get(player_id)
+        return player is not None and not player.in_game and not player.tournament_id
+    
+    def queue_message(self, outbox, player_id, msg_type, data=None, coalesce_key=None, supersede=False):
+        """Prépare un message pour un joueur, verrou tenu
+        
+        Seules la connexion et le format du joueur sont capturés : l'encodage
+        et la mise en file d'envoi sont faits par send_all() une fois les
+        verrous relâchés. Voir OutboundQueue.send pour coalesce_key/supersede.
+        """
+        player = self.players.get(player_id)
+        if player is not None:
+            if coalesce_key is not None and player.protocol.session is not None:
+                # Les joueurs multiplexés d'une connexion ne fusionnent pas leurs trames entre eux
+                coalesce_key = (coalesce_key, player.protocol.session)
+            outbox.append((player.connection, player.protocol, msg_type, data, coalesce_key, supersede))
+    
+    def send_all(self, outbox):
+        """Encode et met en file d'envoi les messages préparés, hors du verrou global
+        
+        Un même objet data destiné à plusieurs joueurs du même format n'est
+        encodé qu'une fois.
+        """
+        encoded = {}
+        for connection, protocol, msg_type, data, coalesce_key, supersede in outbox:
+            key = (protocol, msg_type, id(data))
+            frame = encoded.get(key)
+            if frame is None:
+                frame = encoded[key] = protocol.encode(msg_type, data)
+            sent = connection.send(frame, coalesce_key, supersede)
+            if sent:
+                self.metrics.inc("messages_out_total", msg_type)
+                self.metrics.inc("bytes_out_total", value=sent)
+            else:
+                self.metrics.inc("send_errors_total", "dropped")
+    
+    def send_message(self, player_id, msg_type, data=None):
+        """Encode un message dans le format négocié par le joueur et l'envoie"""
+        outbox = []
+        with self.lock:
+            self.queue_message(outbox, player_id, msg_type, data)
+        self.send_all(outbox)
     
     def handle_challenge(self, challenger_id, data):
         """Gère une demande de défi"""
         opponent_id = data.get("opponent_id")
+        outbox = []
         
         with self.lock:
-            if opponent_id in self.players and not self.players[opponent_id]["in_game"]:
-                challenger_name = self.players[challenger_id]["name"]
+            if self._is_available(opponent_id) and self._is_available(challenger_id):
+                challenger_name = self.players[challenger_id].name
                 
                 # Envoie la demande à l'adversaire
-                challenge_msg = Protocol.encode(
+                self.queue_message(
+                    outbox,
+                    opponent_id,
                     Protocol.CHALLENGE_RECEIVED,
                     {"challenger_id": challenger_id, "challenger_name": challenger_name}
                 )
-                self.players[opponent_id]["socket"].send(challenge_msg)
             else:
-                error_msg = Protocol.encode(Protocol.ERROR, {"message": "Joueur non disponible"})
-                self.players[challenger_id]["socket"].send(error_msg)
+                self.queue_message(outbox, challenger_id, Protocol.ERROR, {"message": "Joueur non disponible"})
+        
+        self.send_all(outbox)
     
     def handle_challenge_refused(self, challenger_id, refuser_id):
         """Gère un refus de défi"""
+        outbox = []
         with self.lock:
             if challenger_id in self.players:
-                refuser_name = self.players[refuser_id]["name"]
-                msg = Protocol.encode(
+                refuser_name = self.players[refuser_id].name
+                self.queue_message(
+                    outbox,
+                    challenger_id,
                     Protocol.CHALLENGE_REFUSED,
                     {"message": f"{refuser_name} a refusé le défi"}
                 )
-                self.players[challenger_id]["socket"].send(msg)
+        self.send_all(outbox)
     
-    def start_game(self, player1_id, player2_id):
-        """Démarre une partie entre deux joueurs"""
+    def send_stats(self, connection, player_id, session=None):
+        """Envoie les métriques du serveur (y compris avant le REGISTER)"""
+        stats = self.metrics.to_json()
+        if player_id:
+            self.send_message(player_id, Protocol.STATS, stats)
+        else:
+            connection.send(Protocol.encode(Protocol.STATS, stats, session))
+    
+    def send_game_list(self, player_id, data=None):
+        """Envoie une page des parties en cours (offset, limit au plus MAX_PAGE_SIZE)
+        
+        Avec finished=True, la page contient les dernières parties terminées,
+        de la plus récente à la plus ancienne.
+        """
+        data = data or {}
+        page = self._parse_page(player_id, data)
+        if page is None:
+            return
+        offset, limit = page
+        
+        outbox = []
+        if data.get("finished"):
+            with self.lock:
+                results = [record.to_dict() for record in self.recent_results.page(offset, limit)]
+                self.queue_message(
+                    outbox,
+                    player_id,
+                    Protocol.LIST_GAMES,
+                    {
+                        "finished": True,
+                        "games": results,
+                        "total": len(self.recent_results),
+                        "offset": offset,
+                        "limit": limit
+                    }
+                )
+            self.send_all(outbox)
+            return
+        
         with self.lock:
-            self.game_counter += 1
-            game_id = f"game_{self.game_counter}"
-            
-            # Crée la partie
-            game = Connect4Game(player1_id, player2_id)
-            self.games[game_id] = game
-            
-            # Marque les joueurs comme en jeu
-            self.players[player1_id]["in_game"] = True
-            self.players[player1_id]["game_id"] = game_id
-            self.players[player2_id]["in_game"] = True
-            self.players[player2_id]["game_id"] = game_id
-            
-            # Récupère les noms
-            player1_name = self.players[player1_id]["name"]
-            player2_name = self.players[player2_id]["name"]
-            
-            # Notifie les joueurs
-            game_start_msg = Protocol.encode(
-                Protocol.GAME_START,
-                {
+            running = [(game_id, game) for game_id, game in self.games.items() if not game.game_over]
+            games = []
+            for game_id, game in running[offset:offset + limit]:
+                entry = {
                     "game_id": game_id,
-                    "player1": player1_name,
-                    "player2": player2_name,
-                    "your_number": 1,
-                    "your_name": player1_name
+                    "player1": self._player_name(game.player1_id),
+                    "player2": self._player_name(game.player2_id),
+                    "moves": game.moves,
+                    "spectators": len(self.spectators.get(game_id, ()))
                 }
-            )
-            self.players[player1_id]["socket"].send(game_start_msg)
+                tournament = self.tournament_games.get(game_id)
+                if tournament:
+                    entry["tournament_id"] = tournament[0].tournament_id
+                games.append(entry)
             
-            game_start_msg = Protocol.encode(
-                Protocol.GAME_START,
-                {
-                    "game_id": game_id,
-                    "player1": player1_name,
-                    "player2": player2_name,
-                    "your_number": 2,
-                    "your_name": player2_name
-                }
+            self.queue_message(
+                outbox,
+                player_id,
+                Protocol.LIST_GAMES,
+                {"games": games, "total": len(running), "offset": offset, "limit": limit}
             )
-            self.players[player2_id]["socket"].send(game_start_msg)
-            
-            print(f"🎲 Partie {game_id} démarrée: {player1_name} vs {player2_name}")
-            
+        self.send_all(outbox)
+    
+    def send_leaderboard(self, player_id, data=None):
+        """Envoie une page du classement Elo (offset, limit au plus MAX_PAGE_SIZE)"""
+        data = data or {}
+        page = self._parse_page(player_id, data)
+        if page is None:
+            return
+        offset, limit = page
+        
+        players, total = self.ratings.top(offset, limit)
+        self.send_message(
+            player_id,
+            Protocol.LEADERBOARD,
+            {"players": players, "total": total, "offset": offset, "limit": limit}
+        )
+    
+    def send_rank(self, player_id):
+        """Envoie au joueur son rang, son classement et son bilan"""
+        with self.lock:
+            player = self.players.get(player_id)
+            name = player.name if player else None
+        if name is not None:
+            self.send_message(player_id, Protocol.MY_RANK, self.ratings.standing(name))
+    
+    def spectate(self, player_id, data):
+        """Abonne le joueur aux GAME_UPDATE et GAME_OVER d'une partie en cours
+        
+        La confirmation et le plateau complet passent par le Broadcaster,
+        sous le verrou de la partie : ils précèdent donc toute mise à jour
+        diffusée ensuite au spectateur.
+        """
+        game_id = (data or {}).get("game_id")
+        with self.lock:
+            game = self.games.get(game_id)
+            game_lock = self.game_locks.get(game_id)
+        
+        error = "Partie introuvable"
+        if game:
+            with game_lock:
+                with self.lock:
+                    player = self.players.get(player_id)
+                    if player is None:
+                        return
+                    if game.game_over:
+                        pass
+                    elif player.in_game:
+                        error = "Vous êtes déjà en jeu"
+                    else:
+                        error = None
+                        self._stop_spectating(player_id)
+                        member = self._audience_member(player_id)
+                        audience = self.spectators.get(game_id, Audience()).with_member(*member)
+                        self.spectators[game_id] = audience
+                        player.spectating = game_id
+                        
+                        info = {
+                            "game_id": game_id,
+                            "player1": self._player_name(game.player1_id),
+                            "player2": self._player_name(game.player2_id),
+                            "spectators": len(audience)
+                        }
+                        state = game.get_board_state()
+                        alone = Audience((member,))
+                        self.broadcaster.publish(alone, Protocol.SPECTATE, info)
+                        self.broadcaster.publish(alone, Protocol.GAME_UPDATE, state, state, coalesce_key=game)
+        
+        if error:
+            self.send_message(player_id, Protocol.ERROR, {"message": error})
+    
+    def unspectate(self, player_id):
+        """Arrête de suivre la partie regardée"""
+        outbox = []
+        with self.lock:
+            game_id = self._stop_spectating(player_id)
+            self.queue_message(outbox, player_id, Protocol.UNSPECTATE, {"game_id": game_id})
+        self.send_all(outbox)
+    
+    def _audience_member(self, player_id):
+        """Entrée d'Audience d'un joueur connecté, verrou tenu"""
+        player = self.players[player_id]
+        return (
+            player_id, player.connection, player.protocol, Protocol.FEATURE_DELTA in player.features
+        )
+    
+    def _stop_spectating(self, player_id):
+        """Retire le joueur de l'audience qu'il suit, verrou tenu ; retourne la partie quittée"""
+        player = self.players.get(player_id)
+        if player is None:
+            return None
+        game_id, player.spectating = player.spectating, None
+        if game_id:
+            audience = self.spectators.get(game_id, Audience()).without(player_id)
+            if audience:
+                self.spectators[game_id] = audience
+            else:
+                self.spectators.pop(game_id, None)
+        return game_id
+    
+    def _close_audience(self, game_id, result):
+        """Diffuse la fin de partie aux spectateurs et les libère, verrou tenu"""
+        audience = self.spectators.pop(game_id, None)
+        if audience is None:
+            return
+        for pid in audience.player_ids():
+            player = self.players.get(pid)
+            if player is not None:
+                player.spectating = None
+        self.broadcaster.publish(audience, Protocol.GAME_OVER, result)
+    
+    @timed("start_game_seconds")
+    def start_game(self, player1_id, player2_id):
+        """Démarre une partie entre deux joueurs"""
+        outbox = []
+        
+        with self.lock:
+            # L'un des joueurs a pu se déconnecter ou commencer une autre partie
+            # depuis l'envoi du défi
+            if not (self._is_available(player1_id) and self._is_available(player2_id)):
+                self.queue_message(outbox, player2_id, Protocol.ERROR, {"message": "Joueur non disponible"})
+                game_id = None
+            else:
+                game_id = self._create_game(outbox, player1_id, player2_id)
+        
+        self.send_all(outbox)
+        
+        if game_id:
             # Envoie l'état initial
             self.send_game_update(game_id)
     
+    def join_queue(self, player_id):
+        """Place le joueur en file d'appariement ; la partie démarre dès qu'un adversaire attend"""
+        outbox = []
+        game_id = None
+        
+        with self.lock:
+            if not self._is_available(player_id):
+                self.queue_message(outbox, player_id, Protocol.ERROR, {"message": "Vous ne pouvez pas rejoindre la file"})
+            else:
+                opponent_id = self.matchmaking.join(player_id, self.ratings.rating(self.players[player_id].name))
+                if opponent_id is None:
+                    self.queue_message(
+                        outbox, player_id, Protocol.JOIN_QUEUE, {"queued": True, "waiting": len(self.matchmaking)}
+                    )
+                else:
+                    # Le joueur qui attendait depuis le plus longtemps commence
+                    game_id = self._create_game(outbox, opponent_id, player_id)
+        
+        self.send_all(outbox)
+        
+        if game_id:
+            self.send_game_update(game_id)
+    
+    def leave_queue(self, player_id):
+        """Retire le joueur de la file d'appariement"""
+        outbox = []
+        with self.lock:
+            self.matchmaking.leave(player_id)
+            self.queue_message(outbox, player_id, Protocol.LEAVE_QUEUE, {"queued": False})
+        self.send_all(outbox)
+    
+    def join_tournament(self, player_id):
+        """Inscrit le joueur au prochain tournoi, lancé dès tournament_size inscrits"""
+        outbox = []
+        new_games = []
+        
+        with self.lock:
+            if not self._is_available(player_id):
+                self.queue_message(outbox, player_id, Protocol.ERROR, {"message": "Vous ne pouvez pas vous inscrire"})
+            else:
+                # Un inscrit n'est plus disponible pour les défis ni pour la file
+                player = self.players[player_id]
+                player.tournament_id = f"tournament_{self.tournament_counter + 1}"
+                self.tournament_signups.append(player_id)
+                self.lobby.remove(player_id)
+                self.matchmaking.leave(player_id)
+                
+                if len(self.tournament_signups) >= self.tournament_size:
+                    new_games = self._launch_tournament(outbox)
+                else:
+                    self.queue_message(
+                        outbox,
+                        player_id,
+                        Protocol.TOURNAMENT_JOIN,
+                        {
+                            "tournament_id": player.tournament_id,
+                            "registered": len(self.tournament_signups),
+                            "size": self.tournament_size
+                        }
+                    )
+        
+        self.send_all(outbox)
+        for game_id in new_games:
+            self.send_game_update(game_id)
+    
+    def start_tournament(self, player_id):
+        """Lance le tournoi en attente sans attendre tournament_size inscrits"""
+        outbox = []
+        new_games = []
+        
+        with self.lock:
+            if player_id not in self.tournament_signups:
+                self.queue_message(outbox, player_id, Protocol.ERROR, {"message": "Vous n'êtes pas inscrit au tournoi"})
+            elif len(self.tournament_signups) < 2:
+                self.queue_message(outbox, player_id, Protocol.ERROR, {"message": "Pas assez de joueurs inscrits"})
+            else:
+                new_games = self._launch_tournament(outbox)
+        
+        self.send_all(outbox)
+        for game_id in new_games:
+            self.send_game_update(game_id)
+    
+    def _launch_tournament(self, outbox):
+        """Démarre le tournoi avec les inscrits actuels, verrou global tenu
+        
+        Retourne les identifiants des parties du premier tour.
+        """
+        self.tournament_counter += 1
+        tournament_id = f"tournament_{self.tournament_counter}"
+        player_ids, self.tournament_signups = self.tournament_signups, []
+        # Têtes de série : les mieux classés ne se rencontrent pas au premier tour
+        player_ids.sort(key=lambda pid: self.ratings.rating(self.players[pid].name), reverse=True)
+        
+        tournament = Tournament(tournament_id, player_ids)
+        self.tournaments[tournament_id] = tournament
+        
+        announce = {
+            "tournament_id": tournament_id,
+            "players": [self.players[pid].name for pid in player_ids],
+            "rounds": tournament.rounds
+        }
+        for pid in player_ids:
+            self.queue_message(outbox, pid, Protocol.TOURNAMENT_START, announce)
+        
+        print(f"🏆 Tournoi {tournament_id} démarré avec {len(player_ids)} joueurs")
+        return self._start_matches(outbox, tournament, tournament.start())
+    
+    def _start_matches(self, outbox, tournament, ready):
+        """Crée les parties des matchs prêts d'un tournoi, verrou global tenu
+        
+        Clôt le tournoi si tous ses matchs sont résolus. Retourne les
+        identifiants des parties créées.
+        """
+        game_ids = [
+            self._create_game(outbox, player1_id, player2_id, (tournament, key))
+            for key, player1_id, player2_id in ready
+        ]
+        if tournament.finished:
+            self._finish_tournament(outbox, tournament)
+        return game_ids
+    
+    def _record_tournament_result(self, outbox, game_id, game, winner_id):
+        """Reporte le résultat d'une partie de tournoi et lance les matchs débloqués
+        
+        Verrou global tenu. Retourne les identifiants des parties créées.
+        """
+        entry = self.tournament_games.pop(game_id, None)
+        if entry is None:
+            return []
+        
+        tournament, key = entry
+        if winner_id:
+            loser_id = game.player2_id if winner_id == game.player1_id else game.player1_id
+            ready = tournament.record_result(key, winner_id, loser_id)
+        else:
+            ready = tournament.record_draw(key)
+        return self._start_matches(outbox, tournament, ready)
+    
+    def _finish_tournament(self, outbox, tournament):
+        """Envoie le classement final et rend les participants au lobby, verrou global tenu"""
+        del self.tournaments[tournament.tournament_id]
+        
+        standings = []
+        for rank, pid in tournament.standings():
+            player = self.players.get(pid)
+            standings.append({"rank": rank, "player_id": pid, "name": player.name if player else None})
+        
+        result = {"tournament_id": tournament.tournament_id, "standings": standings}
+        for pid in tournament.player_ids:
+            player = self.players.get(pid)
+            if player is None:
+                continue
+            player.tournament_id = None
+            if not player.in_game:
+                self.lobby.add(pid, player.name)
+            self.queue_message(outbox, pid, Protocol.TOURNAMENT_OVER, result)
+        
+        print(f"🏆 Tournoi {tournament.tournament_id} terminé")
+    
+    def _create_game(self, outbox, player1_id, player2_id, tournament=None):
+        """Crée la partie et prépare les GAME_START, verrou global tenu
+        
+        tournament est le couple (Tournament, clé du match) d'une partie de tournoi.
+        """
+        game_id = self._new_game_id()
+        
+        # Crée la partie
+        game = Connect4Game(player1_id, player2_id)
+        self.games[game_id] = game
+        self.game_locks[game_id] = threading.Lock()
+        if tournament:
+            self.tournament_games[game_id] = tournament
+        self._watch_turn(game_id, game)
+        
+        # Marque les joueurs comme en jeu
+        self._set_in_game(player1_id, game_id)
+        self._set_in_game(player2_id, game_id)
+        
+        # Récupère les noms
+        player1_name = self.players[player1_id].name
+        player2_name = self.players[player2_id].name
+        self.game_names[game_id] = (player1_name, player2_name)
+        
+        # Jetons permettant aux joueurs de reprendre la partie après un redémarrage
+        tokens = (None, None)
+        if self.journal:
+            tokens = (secrets.token_hex(8), secrets.token_hex(8))
+            self.journal.append([START, game_id, player1_id, player2_id, player1_name, player2_name, *tokens])
+        
+        # Notifie les joueurs
+        for number, (pid, name) in enumerate(((player1_id, player1_name), (player2_id, player2_name)), 1):
+            start = {
+                "game_id": game_id,
+                "player1": player1_name,
+                "player2": player2_name,
+                "your_number": number,
+                "your_name": name
+            }
+            if tokens[number - 1]:
+                start["resume_token"] = tokens[number - 1]
+            if tournament:
+                tour, (round_number, _, _) = tournament
+                start["tournament_id"] = tour.tournament_id
+                start["round"] = round_number
+            self.queue_message(outbox, pid, Protocol.GAME_START, start)
+        
+        print(f"🎲 Partie {game_id} démarrée: {player1_name} vs {player2_name}")
+        return game_id
+    
+    def _get_game(self, player_id):
+        """Retourne (game_id, partie, verrou de la partie) du joueur, ou (None, None, None)"""
+        with self.lock:
+            player = self.players.get(player_id)
+            game_id = player.game_id if player else None
+            if not game_id or game_id not in self.games:
+                return None, None, None
+            return game_id, self.games[game_id], self.game_locks[game_id]
+    
+    @timed("handle_move_seconds")
     def handle_move(self, player_id, data):
         """Gère un coup joué"""
-        game_id = self.players[player_id].get("game_id")
-        if not game_id or game_id not in self.games:
+        game_id, game, game_lock = self._get_game(player_id)
+        if not game:
             return
         
-        game = self.games[game_id]
-        
-        # Vérifie que c'est le tour du joueur
-        if game.get_current_player_id() != player_id:
-            error_msg = Protocol.encode(Protocol.ERROR, {"message": "Ce n'est pas votre tour"})
-            self.players[player_id]["socket"].send(error_msg)
+        column = data.get("column")
+        # Refusé avant le journal : un coup journalisé doit pouvoir être rejoué
+        if type(column) is not int:
+            self.send_message(player_id, Protocol.ERROR, {"message": "Colonne invalide"})
+            return
+        # Journal en échec : aucun coup ne peut plus être confirmé
+        if self.journal and self.journal_sync and self.journal.failed:
+            self.send_message(player_id, Protocol.ERROR, {"message": "Journal indisponible, coup refusé"})
             return
         
-        column = data.get("column")
-        success, message = game.play_move(column)
+        # Seul le verrou de la partie est tenu pendant la validation du coup :
+        # les parties indépendantes progressent en parallèle
+        with game_lock:
+            # Partie close (forfait, abandon) depuis sa recherche dans le registre
+            if game.game_over:
+                success, message = False, "La partie est terminée"
+            # Vérifie que c'est le tour du joueur
+            elif game.get_current_player_id() != player_id:
+                success, message = False, "Ce n'est pas votre tour"
+            else:
+                success, message = game.play_move(column)
+            
+            if success:
+                outbox = self._queue_game_update(game_id, game, incremental=True)
+                # Lu sous le verrou : seul le coup final déclenche end_game
+                finished = game.game_over
+                if self.turn_timeout:
+                    self.turn_started[game_id] = time.monotonic()
+                # Ajouté sous le verrou de la partie : le journal garde l'ordre des coups
+                if self.journal:
+                    record = self.journal.append([MOVE, game_id, column])
         
         if success:
-            self.send_game_update(game_id)
+            # Group commit : l'attente est partagée avec les coups des autres parties
+            if self.journal and self.journal_sync and not self.journal.wait(record, JOURNAL_WAIT_TIMEOUT):
+                # Le coup est joué en mémoire : les joueurs en sont informés, mais
+                # il pourrait manquer au journal après un redémarrage
+                self.send_message(player_id, Protocol.ERROR, {"message": "Coup non enregistré sur disque"})
+            # Envoyé sous le verrou de la partie : un forfait, marqué sous ce verrou,
+            # ne peut pas envoyer son GAME_OVER avant cette mise à jour
+            with game_lock:
+                if finished or not game.game_over:
+                    self.send_all(outbox)
             
-            if game.game_over:
+            if finished:
                 self.end_game(game_id)
         else:
-            error_msg = Protocol.encode(Protocol.ERROR, {"message": message})
-            self.players[player_id]["socket"].send(error_msg)
+            self.send_message(player_id, Protocol.ERROR, {"message": message})
+    
+    def _watch_turn(self, game_id, game):
+        """Programme l'échéance du temps de réflexion d'une nouvelle partie, verrou global tenu"""
+        if self.turn_timeout:
+            self.turn_started[game_id] = time.monotonic()
+            self.timers.schedule(self.turn_timeout, self._check_turn, game_id, game)
+    
+    def _check_turn(self, game_id, game):
+        """Échéance du temps de réflexion, exécutée par la roue
+        
+        Une seule échéance par partie : si un coup a été joué entre-temps,
+        elle est reprogrammée d'après l'instant de ce coup. Sinon, le joueur
+        dont c'est le tour perd la partie par forfait.
+        """
+        with self.lock:
+            game_lock = self.game_locks.get(game_id)
+        if game_lock is None:
+            return
+        
+        outbox = []
+        with game_lock:
+            if game.game_over:
+                return
+            elapsed = time.monotonic() - self.turn_started.get(game_id, 0)
+            if elapsed < self.turn_timeout:
+                self.timers.schedule(self.turn_timeout - elapsed, self._check_turn, game_id, game)
+                return
+            
+            with self.lock:
+                if self.games.get(game_id) is not game:
+                    return
+                loser_id = game.get_current_player_id()
+                loser_name = self._game_player_name(game_id, game, loser_id)
+                winner_id = game.player2_id if game.player1_id == loser_id else game.player1_id
+                
+                if loser_id in self.players:
+                    self.queue_message(
+                        outbox,
+                        loser_id,
+                        Protocol.GAME_OVER,
+                        {
+                            "winner": self._player_name(winner_id),
+                            "winner_id": winner_id,
+                            "you_won": False,
+                            "reason": "Temps de réflexion dépassé"
+                        }
+                    )
+                    self._set_in_game(loser_id, None)
+                
+                new_games = self._forfeit_game(
+                    outbox, game_id, game, loser_id,
+                    "Temps de réflexion de l'adversaire dépassé", f"{loser_name} n'a pas joué à temps"
+                )
+        
+        self.metrics.inc("timeouts_total", "turn")
+        self.send_all(outbox)
+        
+        print(f"⏰ Partie {game_id} perdue par {loser_name}: temps de réflexion dépassé")
+        
+        for new_game_id in new_games:
+            self.send_game_update(new_game_id)
     
+    @timed("send_game_update_seconds")
     def send_game_update(self, game_id):
-        """Envoie l'état du jeu aux deux joueurs"""
-        game = self.games[game_id]
+        """Envoie l'état complet du jeu aux deux joueurs"""
+        with self.lock:
+            game = self.games.get(game_id)
+            game_lock = self.game_locks.get(game_id)
+        if not game:
+            return
+        
+        with game_lock:
+            outbox = self._queue_game_update(game_id, game)
+        self.send_all(outbox)
+    
+    def _queue_game_update(self, game_id, game, incremental=False):
+        """Prépare le GAME_UPDATE des deux joueurs, verrou de la partie tenu
+        
+        Avec incremental=True, les joueurs ayant négocié FEATURE_DELTA ne
+        reçoivent que le dernier coup ; les autres reçoivent le plateau complet.
+        Un plateau complet remplace les mises à jour de la partie encore en
+        file : un joueur en retard reçoit donc directement l'état le plus récent
+        au lieu d'accumuler des deltas.
+        Le joueur qui vient de jouer est servi en premier : son adversaire ne
+        peut pas répondre avant d'avoir reçu la mise à jour, ce qui garantit
+        l'ordre des mises à jour chez les deux joueurs.
+        La mise à jour est aussi confiée au Broadcaster pour les spectateurs :
+        leur nombre ne change rien au coût du traitement du coup.
+        """
         state = game.get_board_state()
+        delta = game.get_move_delta() if incremental else None
+        
+        recipients = (game.player1_id, game.player2_id)
+        if game.current_player == 1 and not game.game_over:
+            recipients = (game.player2_id, game.player1_id)
+        
+        outbox = []
+        with self.lock:
+            for pid in recipients:
+                player = self.players.get(pid)
+                if player is None:
+                    continue
+                if (delta is not None and Protocol.FEATURE_DELTA in player.features
+                        and not player.connection.is_backlogged()):
+                    self.queue_message(outbox, pid, Protocol.GAME_UPDATE, delta, coalesce_key=game)
+                else:
+                    self.queue_message(
+                        outbox, pid, Protocol.GAME_UPDATE, state, coalesce_key=game, supersede=True
+                    )
+            audience = self.spectators.get(game_id)
         
-        update_msg = Protocol.encode(Protocol.GAME_UPDATE, state)
+        self.broadcaster.publish(audience, Protocol.GAME_UPDATE, delta or state, state, coalesce_key=game)
+        return outbox
+    
+    def handle_resync(self, player_id):
+        """Renvoie l'état complet du plateau à un joueur désynchronisé"""
+        game_id, game, game_lock = self._get_game(player_id)
+        if not game:
+            self._resync_spectator(player_id)
+            return
         
-        self.players[game.player1_id]["socket"].send(update_msg)
-        self.players[game.player2_id]["socket"].send(update_msg)
+        with game_lock:
+            state = game.get_board_state()
+        self.send_message(player_id, Protocol.GAME_UPDATE, state)
+    
+    def _resync_spectator(self, player_id):
+        """Renvoie l'état complet de la partie suivie, dans l'ordre de la diffusion"""
+        with self.lock:
+            player = self.players.get(player_id)
+            game_id = player.spectating if player else None
+            game = self.games.get(game_id)
+            game_lock = self.game_locks.get(game_id)
+        if not game:
+            return
+        
+        with game_lock:
+            state = game.get_board_state()
+            with self.lock:
+                if player_id not in self.players:
+                    return
+                alone = Audience((self._audience_member(player_id),))
+            self.broadcaster.publish(alone, Protocol.GAME_UPDATE, state, state, coalesce_key=game)
+    
+    def handle_hint(self, player_id):
+        """Suggère un coup au joueur : bibliothèque d'ouvertures, sinon service d'analyse
+        
+        La réponse part quand l'analyse est terminée ; la colonne est None si
+        le service d'analyse est désactivé ou saturé.
+        """
+        game_id, game, game_lock = self._get_game(player_id)
+        if not game:
+            self.send_message(player_id, Protocol.ERROR, {"message": "Vous n'êtes pas en jeu"})
+            return
+        
+        with game_lock:
+            current = game.bitboards[game.current_player - 1]
+            mask = game.bitboards[0] | game.bitboards[1]
+            moves = game.moves
+        
+        def reply(result):
+            column, score = (result["column"], result["score"]) if result else (None, None)
+            self.send_message(player_id, Protocol.HINT, {"column": column, "score": score})
+        
+        self.analysis.analyze(current, mask, moves, reply)
+    
+    def handle_analyze(self, player_id, data):
+        """Analyse la position d'une partie en cours (game_id) ou un plateau fourni (board, player)
+        
+        La réponse ANALYZE donne la meilleure colonne et la valeur de la
+        position pour le joueur qui doit jouer. Elle part quand l'analyse est
+        terminée : le thread du client n'attend pas la recherche.
+        """
+        data = data or {}
+        game_id = data.get("game_id")
+        if game_id is not None:
+            with self.lock:
+                game = self.games.get(game_id)
+                game_lock = self.game_locks.get(game_id)
+            if not game:
+                self.send_message(player_id, Protocol.ERROR, {"message": "Partie inconnue"})
+                return
+            with game_lock:
+                current = game.bitboards[game.current_player - 1]
+                mask = game.bitboards[0] | game.bitboards[1]
+                moves = game.moves
+        else:
+            position = board_position(data.get("board"), data.get("player"))
+            if position is None:
+                self.send_message(player_id, Protocol.ERROR, {"message": "Plateau invalide"})
+                return
+            current, mask, moves = position
+        
+        def reply(result):
+            if result is None:
+                self.send_message(
+                    player_id, Protocol.ERROR, {"message": "Analyse indisponible, réessayez plus tard"}
+                )
+                return
+            result["game_id"] = game_id
+            self.send_message(player_id, Protocol.ANALYZE, result)
+        
+        self.analysis.analyze(current, mask, moves, reply)
     
     def end_game(self, game_id):
         """Termine une partie"""
-        game = self.games[game_id]
-        
-        winner_name = None
-        winner_id = None
-        if game.winner:
-            winner_id = game.player1_id if game.winner == 1 else game.player2_id
-            winner_name = self.players[winner_id]["name"]
-        
-        # Envoie un message personnalisé à chaque joueur
-        for pid in [game.player1_id, game.player2_id]:
-            if winner_id:
-                you_won = (pid == winner_id)
-                game_over_msg = Protocol.encode(
-                    Protocol.GAME_OVER,
-                    {
-                        "winner": winner_name,
-                        "winner_id": winner_id,
-                        "you_won": you_won
-                    }
-                )
-            else:
-                game_over_msg = Protocol.encode(
-                    Protocol.GAME_OVER,
-                    {
-                        "winner": None,
-                        "winner_id": None,
-                        "you_won": None
-                    }
-                )
-            self.players[pid]["socket"].send(game_over_msg)
+        outbox = []
+        
+        with self.lock:
+            game = self.games.get(game_id)
+            if game is None:
+                # Partie déjà close par la déconnexion d'un joueur
+                return
+            
+            if self.journal:
+                self.journal.append([OVER, game_id])
+            
+            winner_name = None
+            winner_id = None
+            if game.winner:
+                winner_id = game.player1_id if game.winner == 1 else game.player2_id
+                if winner_id in self.players:
+                    winner_name = self.players[winner_id].name
+            
+            # Envoie un message personnalisé à chaque joueur
+            for pid in [game.player1_id, game.player2_id]:
+                if winner_id:
+                    you_won = (pid == winner_id)
+                    self.queue_message(
+                        outbox,
+                        pid,
+                        Protocol.GAME_OVER,
+                        {
+                            "winner": winner_name,
+                            "winner_id": winner_id,
+                            "you_won": you_won
+                        }
+                    )
+                else:
+                    self.queue_message(
+                        outbox,
+                        pid,
+                        Protocol.GAME_OVER,
+                        {
+                            "winner": None,
+                            "winner_id": None,
+                            "you_won": None
+                        }
+                    )
+            
+            # Marque les joueurs comme disponibles
+            for pid in (game.player1_id, game.player2_id):
+                if pid in self.players:
+                    self._set_in_game(pid, None)
+            
+            self._close_audience(
+                game_id, {"game_id": game_id, "winner": winner_name, "winner_id": winner_id, "you_won": None}
+            )
+            
+            # Partie de tournoi : les matchs suivants démarrent sans attendre la fin du tour
+            new_games = self._record_tournament_result(outbox, game_id, game, winner_id)
+            self._retire_game(game_id, game, winner_id)
         
-        # Marque les joueurs comme disponibles
-        self.players[game.player1_id]["in_game"] = False
-        self.players[game.player2_id]["in_game"] = False
-        del self.players[game.player1_id]["game_id"]
-        del self.players[game.player2_id]["game_id"]
+        self.send_all(outbox)
         
         print(f"🏁 Partie {game_id} terminée. Gagnant: {winner_name or 'Match nul'}")
+        
+        for new_game_id in new_games:
+            self.send_game_update(new_game_id)
+    
+    def _forfeit_game(self, outbox, game_id, game, loser_id, reason, public_reason):
+        """Termine une partie perdue par forfait par loser_id, verrou de la partie
+        puis verrou global tenus
+        
+        reason est donnée à l'adversaire, public_reason aux spectateurs et au
+        résultat gardé. Retourne les parties de tournoi démarrées en conséquence.
+        """
+        # Plus aucun coup n'est accepté pour cette partie
+        game.game_over = True
+        opponent_id = game.player2_id if game.player1_id == loser_id else game.player1_id
+        opponent_name = self._game_player_name(game_id, game, opponent_id)
+        
+        if opponent_id in self.players:
+            self.queue_message(
+                outbox,
+                opponent_id,
+                Protocol.GAME_OVER,
+                {
+                    "winner": self.players[opponent_id].name,
+                    "winner_id": opponent_id,
+                    "you_won": True,
+                    "reason": reason
+                }
+            )
+            self._set_in_game(opponent_id, None)
+        
+        self._close_audience(
+            game_id,
+            {
+                "game_id": game_id,
+                "winner": opponent_name,
+                "winner_id": opponent_id,
+                "reason": public_reason
+            }
+        )
+        new_games = self._record_tournament_result(outbox, game_id, game, opponent_id)
+        if self.journal:
+            self.journal.append([OVER, game_id])
+        self._retire_game(game_id, game, opponent_id, public_reason)
+        return new_games
+    
+    def _retire_game(self, game_id, game, winner_id, reason=None):
+        """Retire une partie terminée du registre, garde son résultat et met à jour
+        le classement des deux joueurs, verrou global tenu
+        
+        Une partie abandonnée sans gagnant (reason sans winner_id) n'est pas classée.
+        Les noms sont ceux du début de la partie : un joueur distant a déjà pu
+        quitter self.players.
+        """
+        winner_name = self._game_player_name(game_id, game, winner_id) if winner_id else None
+        del self.games[game_id]
+        del self.game_locks[game_id]
+        self.turn_started.pop(game_id, None)
+        name1, name2 = self.game_names.pop(game_id)
+        self.recent_results.add(GameRecord(game_id, name1, name2, winner_name, game.moves, reason))
+        
+        if name1 != name2 and (winner_id or not reason):
+            score1 = 0.5 if not winner_id else (1.0 if winner_id == game.player1_id else 0.0)
+            self.record_rating(name1, name2, score1)
+    
+    def record_rating(self, name1, name2, score1):
+        """Met à jour le classement des deux joueurs d'une partie terminée, verrou global tenu"""
+        self.ratings.record(name1, name2, score1)
+    
+    @contextlib.contextmanager
+    def _player_game_locked(self, player_id):
+        """Prend le verrou de la partie en cours du joueur puis le verrou global
+        
+        Produit (game_id, partie), ou (None, None) si le joueur n'est pas en
+        partie. Si la partie du joueur a changé avant la prise du verrou
+        global, les verrous sont relâchés et repris pour la nouvelle.
+        """
+        while True:
+            game_id, game, game_lock = self._get_game(player_id)
+            with game_lock or contextlib.nullcontext(), self.lock:
+                player = self.players.get(player_id)
+                current_id = player.game_id if player else None
+                if self.games.get(current_id) is game:
+                    yield game_id, game
+                    return
     
     def disconnect_player(self, player_id):
         """Déconnecte un joueur"""
-        with self.lock:
+        outbox = []
+        new_games = []
+        
+        with self._player_game_locked(player_id) as (game_id, game):
             if player_id in self.players:
-                player_name = self.players[player_id]["name"]
+                player_name = self.players[player_id].name
                 print(f"👋 {player_name} s'est déconnecté")
                 
-                # Si le joueur était en jeu, termine la partie
-                if self.players[player_id]["in_game"]:
-                    game_id = self.players[player_id].get("game_id")
-                    if game_id and game_id in self.games:
-                        game = self.games[game_id]
-                        opponent_id = game.player2_id if game.player1_id == player_id else game.player1_id
-                        
-                        if opponent_id in self.players:
-                            disconnect_msg = Protocol.encode(
-                                Protocol.GAME_OVER,
-                                {"winner": self.players[opponent_id]["name"], "reason": "Adversaire déconnecté"}
-                            )
-                            self.players[opponent_id]["socket"].send(disconnect_msg)
-                            self.players[opponent_id]["in_game"] = False
-                            if "game_id" in self.players[opponent_id]:
-                                del self.players[opponent_id]["game_id"]
-                        
-                        del self.games[game_id]
+                self.matchmaking.leave(player_id)
+                self._stop_spectating(player_id)
+                if player_id in self.tournament_signups:
+                    self.tournament_signups.remove(player_id)
+                tournament = self.tournaments.get(self.players[player_id].tournament_id)
+                if tournament:
+                    # Ses matchs de tournoi à venir sont perdus par forfait
+                    tournament.withdraw(player_id)
+                
+                # Si le joueur était en jeu, termine la partie (un coup final
+                # déjà joué est laissé à end_game)
+                if self.players[player_id].in_game and game is not None and not game.game_over:
+                    new_games = self._forfeit_game(
+                        outbox, game_id, game, player_id,
+                        "Adversaire déconnecté", f"{player_name} s'est déconnecté"
+                    )
                 
                 del self.players[player_id]
+                self.lobby.remove(player_id)
+        
+        self.send_all(outbox)
+        
+        for game_id in new_games:
+            self.send_game_update(game_id)
 
 if __name__ == "__main__":
-    server = GameServer(host='0.0.0.0', port=5555)
-    server.start()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Serveur Puissance 4")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5555)
+    parser.add_argument(
+        "--max-frame-size", type=int, default=64 * 1024,
+        help="taille maximale d'un message reçu, en octets"
+    )
+    parser.add_argument(
+        "--max-queued-bytes", type=int, default=DEFAULT_MAX_QUEUED_BYTES,
+        help="taille maximale de la file d'envoi d'un client avant éviction"
+    )
+    parser.add_argument(
+        "--send-stall-timeout", type=float, default=DEFAULT_STALL_TIMEOUT,
+        help="secondes sans progrès d'envoi avant d'évincer un client"
+    )
+    parser.add_argument(
+        "--opening-book", default=str(DEFAULT_BOOK_PATH),
+        help="bibliothèque d'ouvertures (tools/build_opening_book.py) utilisée pour les HINT"
+    )
+    parser.add_argument(
+        "--metrics-file", default=None,
+        help="fichier réécrit périodiquement avec les métriques (format texte Prometheus)"
+    )
+    parser.add_argument(
+        "--metrics-interval", type=float, default=10.0,
+        help="secondes entre deux écritures de --metrics-file"
+    )
+    parser.add_argument(
+        "--journal-dir", default=None,
+        help="répertoire du journal des parties, rejoué au démarrage (désactivé par défaut)"
+    )
+    parser.add_argument(
+        "--journal-sync", choices=["ack", "background"], default=None,
+        help="ack: un coup est confirmé une fois écrit sur disque (défaut en mode threads), "
+             "background: confirmé sans attendre l'écriture (défaut en mode asyncio)"
+    )
+    parser.add_argument(
+        "--snapshot-interval", type=float, default=DEFAULT_SNAPSHOT_INTERVAL,
+        help="secondes au plus entre deux instantanés du journal"
+    )
+    parser.add_argument(
+        "--resume-timeout", type=float, default=DEFAULT_RESUME_TIMEOUT,
+        help="secondes laissées aux joueurs pour reprendre une partie recouvrée"
+    )
+    parser.add_argument(
+        "--recent-results", type=int, default=DEFAULT_RECENT_RESULTS,
+        help="nombre de parties terminées gardées pour LIST_GAMES (les plus anciennes sont oubliées)"
+    )
+    parser.add_argument(
+        "--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT,
+        help="secondes sans rien recevoir d'un client avant de le déconnecter (0, par défaut : jamais)"
+    )
+    parser.add_argument(
+        "--ping-interval", type=float, default=None,
+        help="secondes sans rien recevoir avant d'envoyer un PING (par défaut, un tiers de --idle-timeout)"
+    )
+    parser.add_argument(
+        "--turn-timeout", type=float, default=DEFAULT_TURN_TIMEOUT,
+        help="secondes pour jouer un coup avant de perdre la partie par forfait (0, par défaut : illimité)"
+    )
+    parser.add_argument(
+        "--ratings-file", default=None,
+        help="fichier JSON des classements Elo, relu au démarrage (classements en mémoire par défaut)"
+    )
+    parser.add_argument(
+        "--match-rating-gap", type=float, default=DEFAULT_MATCH_RATING_GAP,
+        help="écart de classement toléré par l'appariement automatique, élargi avec l'attente "
+             "(négatif : ordre d'arrivée)"
+    )
+    parser.add_argument(
+        "--backlog", type=int, default=DEFAULT_BACKLOG,
+        help="connexions en attente d'acceptation au plus (file du listen)"
+    )
+    parser.add_argument(
+        "--max-connections", type=int, default=DEFAULT_MAX_CONNECTIONS,
+        help="connexions simultanées au plus, par worker en mode processes (0 : illimité)"
+    )
+    parser.add_argument(
+        "--message-rate", type=float, default=DEFAULT_MESSAGE_RATE,
+        help="messages par seconde acceptés par joueur, rafales de 2 secondes comprises (0 : illimité)"
+    )
+    parser.add_argument(
+        "--query-rate", type=float, default=DEFAULT_QUERY_RATE,
+        help="requêtes coûteuses (listes, classement, métriques, suggestions) par seconde et par joueur "
+             "(0 : illimité)"
+    )
+    parser.add_argument(
+        "--analysis-workers", type=int, default=DEFAULT_ANALYSIS_WORKERS,
+        help="processus d'analyse des positions (ANALYZE, HINT hors bibliothèque ; 0 : désactivé)"
+    )
+    parser.add_argument(
+        "--analysis-cache", type=int, default=DEFAULT_ANALYSIS_CACHE,
+        help="positions analysées gardées en cache"
+    )
+    parser.add_argument(
+        "--analysis-time", type=float, default=DEFAULT_ANALYSIS_TIME,
+        help="durée maximale de la recherche pour une position, en secondes"
+    )
+    parser.add_argument(
+        "--mode", choices=["threads", "asyncio", "processes"], default="threads",
+        help="threads: un thread par client, asyncio: une boucle d'événements unique, "
+             "processes: une boucle asyncio par worker sur le même port"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="nombre de processus en mode processes (par défaut, un par cœur)"
+    )
+    parser.add_argument(
+        "--node-id", type=int, default=None,
+        help="numéro (unique) de ce serveur dans une fédération : active la fédération sur la boucle asyncio"
+    )
+    parser.add_argument(
+        "--federation-port", type=int, default=5556,
+        help="port des liens avec les autres serveurs de la fédération"
+    )
+    parser.add_argument(
+        "--federation-host", default="localhost",
+        help="adresse d'écoute du port de fédération (une adresse publique exige --federation-secret)"
+    )
+    parser.add_argument(
+        "--federation-secret", default=os.environ.get("CONNECT4_FEDERATION_SECRET"),
+        help="secret partagé par les nœuds de la fédération (ou variable CONNECT4_FEDERATION_SECRET)"
+    )
+    parser.add_argument(
+        "--peer", action="append", default=[],
+        help="serveur pair hôte:port (port de fédération), option répétable"
+    )
+    parser.add_argument(
+        "--tournament-size", type=int, default=8,
+        help="nombre d'inscrits déclenchant automatiquement un tournoi"
+    )
+    args = parser.parse_args()
+    
+    if args.journal_dir and args.mode == "processes":
+        parser.error("--journal-dir n'est pas disponible en mode processes")
+    if args.node_id is not None and args.mode == "processes":
+        parser.error("--node-id n'est pas disponible en mode processes")
+    if args.node_id is not None and args.journal_dir:
+        parser.error("--journal-dir n'est pas disponible dans une fédération")
+    if (
+        args.node_id is not None and not args.federation_secret
+        and args.federation_host not in ("localhost", "127.0.0.1", "::1")
+    ):
+        parser.error("--federation-host hors de localhost exige --federation-secret")
+    
+    # Attendre le disque bloquerait toute la boucle asyncio
+    journal_sync = args.journal_sync or ("background" if args.mode == "asyncio" else "ack")
+    
+    options = dict(
+        host=args.host,
+        port=args.port,
+        max_frame_size=args.max_frame_size,
+        max_queued_bytes=args.max_queued_bytes,
+        stall_timeout=args.send_stall_timeout,
+        tournament_size=args.tournament_size,
+        opening_book=args.opening_book,
+        metrics_file=args.metrics_file,
+        metrics_interval=args.metrics_interval,
+        journal_dir=args.journal_dir,
+        journal_sync=journal_sync == "ack",
+        snapshot_interval=args.snapshot_interval,
+        resume_timeout=args.resume_timeout,
+        recent_results=args.recent_results,
+        idle_timeout=args.idle_timeout,
+        ping_interval=args.ping_interval,
+        turn_timeout=args.turn_timeout,
+        ratings_file=args.ratings_file,
+        match_rating_gap=args.match_rating_gap if args.match_rating_gap >= 0 else None,
+        backlog=args.backlog,
+        max_connections=args.max_connections,
+        message_rate=args.message_rate,
+        query_rate=args.query_rate,
+        analysis_workers=args.analysis_workers,
+        analysis_cache=args.analysis_cache,
+        analysis_time=args.analysis_time
+    )
+    
+    if args.mode == "processes":
+        from cluster import run_cluster
+        run_cluster(options, args.workers)
+        sys.exit(0)
+    
+    if args.node_id is not None:
+        from federation import FederatedServer
+        server = FederatedServer(
+            args.node_id, args.federation_port, args.peer,
+            federation_host=args.federation_host, federation_secret=args.federation_secret, **options
+        )
+    elif args.mode == "asyncio":
+        from async_server import AsyncGameServer
+        server = AsyncGameServer(**options)
+    else:
+        server = GameServer(**options)
+    server.start()
@@ -0,0 +1,96 @@
+"""
+Roue de temporisation
+
+Toutes les échéances du serveur (inactivité des connexions, temps de
+réflexion) partagent une seule roue : un tableau de cases parcouru d'une
+case par tick. Une échéance est rangée dans la case de son tick d'expiration
+(avec un nombre de tours à attendre si elle dépasse un tour de roue) :
+programmer et annuler coûtent O(1), et un tick ne parcourt que sa case.
+
+L'annulation est paresseuse : le minuteur est marqué et ignoré à son
+expiration. Les callbacks s'exécutent dans le thread (ou la boucle asyncio)
+qui fait avancer la roue, hors du verrou de la roue.
+"""
+import math
+import threading
+import time
+
+DEFAULT_TICK = 0.5
+DEFAULT_SLOTS = 512
+
+
+class Timer:
+    __slots__ = ("rounds", "callback", "args", "cancelled")
+
+    def __init__(self, rounds, callback, args):
+        self.rounds = rounds  # Tours de roue restant avant l'expiration
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    def __init__(self, tick=DEFAULT_TICK, slots=DEFAULT_SLOTS):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.current = 0  # Case traitée au prochain tick
+        self.started = time.monotonic()
+        self.ticks = 0  # Ticks déjà traités depuis started
+        self.count = 0  # Minuteurs rangés dans la roue (annulés compris)
+        self.lock = threading.Lock()
+
+    def schedule(self, delay, callback, *args):
+        """Appelle callback(*args) dans delay secondes (arrondi au tick supérieur)"""
+        deadline = time.monotonic() + delay - self.started
+        with self.lock:
+            # Premier tick dont l'échéance n'est pas avant deadline ; la case
+            # traitée au k-ième prochain tick est current + k - 1
+            ticks = max(1, math.ceil(deadline / self.tick) - self.ticks)
+            timer = Timer((ticks - 1) // len(self.slots), callback, args)
+            self.slots[(self.current + ticks - 1) % len(self.slots)].append(timer)
+            self.count += 1
+        return timer
+
+    def advance(self, now=None):
+        """Traite les ticks écoulés jusqu'à now et exécute les callbacks échus"""
+        now = time.monotonic() if now is None else now
+        expired = []
+        with self.lock:
+            due = int((now - self.started) / self.tick)
+            while self.ticks < due:
+                slot = self.slots[self.current]
+                kept = []
+                for timer in slot:
+                    if timer.cancelled:
+                        self.count -= 1
+                    elif timer.rounds:
+                        timer.rounds -= 1
+                        kept.append(timer)
+                    else:
+                        self.count -= 1
+                        expired.append(timer)
+                self.slots[self.current] = kept
+                self.current = (self.current + 1) % len(self.slots)
+                self.ticks += 1
+
+        for timer in expired:
+            try:
+                timer.callback(*timer.args)
+            except Exception as e:
+                print(f"Erreur dans un minuteur: {e}")
+        return len(expired)
+
+    def start(self):
+        """Fait avancer la roue depuis un thread dédié (mode threads)"""
+        threading.Thread(target=self.run, name="timer-wheel", daemon=True).start()
+
+    def run(self):
+        while True:
+            time.sleep(self.tick)
+            self.advance()
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,78 @@
+"""
+Découpage d'un flux TCP en trames du protocole
+
+Le tampon de réception est un bytearray unique : chaque appel à feed()
+extrait en une passe toutes les trames complètes (JSON terminées par '\\n'
+ou binaires préfixées par leur longueur) puis supprime d'un coup les octets
+consommés. Le coût total est linéaire en nombre d'octets reçus, quel que
+soit le nombre de messages envoyés en rafale.
+"""
+import struct
+
+from shared.protocol import MAX_FRAME_SIZE
+
+_LENGTH = struct.Struct("!I")
+
+
+class FrameTooLarge(ValueError):
+    """Trame dépassant la taille maximale autorisée"""
+
+
+class FrameBuffer:
+    def __init__(self, max_frame_size=MAX_FRAME_SIZE):
+        self.max_frame_size = max_frame_size
+        self._buffer = bytearray()
+        # Position jusqu'à laquelle la trame JSON en attente a déjà été parcourue
+        # à la recherche de '\n' (évite de rescanner une longue ligne incomplète)
+        self._scanned = 0
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def feed(self, data):
+        """Ajoute des octets reçus et retourne la liste des trames complètes
+
+        Lève FrameTooLarge si une trame dépasse max_frame_size : le flux
+        n'est alors plus exploitable et la connexion doit être fermée.
+        """
+        buffer = self._buffer
+        buffer += data
+        size = len(buffer)
+        max_frame_size = self.max_frame_size
+        frames = []
+        position = 0
+
+        with memoryview(buffer) as view:
+            while position < size:
+                if buffer[position] == 0:
+                    # Trame binaire : [longueur u32][corps]
+                    if size - position < _LENGTH.size:
+                        break
+                    end = position + _LENGTH.size + _LENGTH.unpack_from(buffer, position)[0]
+                    if end - position > max_frame_size:
+                        raise FrameTooLarge(f"Trame de {end - position} octets (max {max_frame_size})")
+                    if end > size:
+                        break
+                else:
+                    # Trame JSON terminée par '\n'
+                    end = buffer.find(b'\n', max(position, self._scanned))
+                    if end < 0:
+                        if size - position > max_frame_size:
+                            raise FrameTooLarge(f"Ligne de plus de {max_frame_size} octets")
+                        self._scanned = size
+                        break
+                    end += 1
+                    if end - position > max_frame_size:
+                        raise FrameTooLarge(f"Ligne de {end - position} octets (max {max_frame_size})")
+
+                # Une seule copie par trame, directement depuis le tampon
+                frames.append(view[position:end].tobytes())
+                position = end
+                self._scanned = 0
+
+        if position:
+            del buffer[:position]
+            if self._scanned:
+                self._scanned -= position
+
+        return frames
@@ -0,0 +1,122 @@
+"""
+Bibliothèque d'ouvertures précalculée
+
+Le fichier contient les meilleurs coups des positions de début de partie,
+dans un format binaire compact :
+- en-tête : magie, version, profondeur maximale (en coups), nombre d'entrées
+- entrées de taille fixe triées par clé : [clé u64][colonne u8][score i16]
+
+La clé est la clé canonique de shared/solver.py : une position et son
+symétrique partagent une seule entrée. Le fichier est projeté en mémoire
+(mmap) et interrogé par recherche dichotomique, sans jamais être chargé :
+l'ouverture est instantanée et les pages sont partagées entre tous les
+processus qui lisent le même fichier.
+
+Le fichier se construit avec tools/build_opening_book.py.
+"""
+import mmap
+import struct
+from pathlib import Path
+
+from shared.solver import COLS, canonical_key
+
+MAGIC = b"C4OB"
+VERSION = 1
+
+# Emplacement par défaut, à côté du module : copié avec shared/ dans les images
+DEFAULT_BOOK_PATH = Path(__file__).parent / "opening_book.bin"
+
+_HEADER = struct.Struct("!4sBBI")
+_RECORD = struct.Struct("!QBh")
+_KEY = struct.Struct("!Q")
+
+
+class OpeningBook:
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as book_file:
+            if not book_file.seek(0, 2):
+                raise ValueError(f"{self.path} est vide")
+            self._map = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._check()
+        except ValueError:
+            self._map.close()
+            raise
+
+    def _check(self):
+        """Vérifie l'en-tête, la taille et l'ordre des entrées
+
+        La recherche dichotomique suppose des clés strictement croissantes :
+        un fichier mal trié répondrait faux sans jamais échouer.
+        """
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"{self.path} est tronqué")
+        magic, version, self.max_ply, self.count = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} n'est pas une bibliothèque d'ouvertures valide")
+        if len(self._map) != _HEADER.size + self.count * _RECORD.size:
+            raise ValueError(f"{self.path} est tronqué ou de taille incohérente")
+
+        previous = -1
+        for key, column, _ in _RECORD.iter_unpack(self._map[_HEADER.size:]):
+            if key <= previous or column >= COLS:
+                raise ValueError(f"{self.path} est corrompu : entrées mal triées ou invalides")
+            previous = key
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, current, mask, moves):
+        """Retourne (colonne, score) pour le joueur qui doit jouer, ou None hors bibliothèque"""
+        if moves > self.max_ply:
+            return None
+
+        key, mirrored = canonical_key(current, mask)
+        book = self._map
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if _KEY.unpack_from(book, _HEADER.size + middle * _RECORD.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low == self.count:
+            return None
+        found_key, column, score = _RECORD.unpack_from(book, _HEADER.size + low * _RECORD.size)
+        if found_key != key:
+            return None
+        if mirrored:
+            column = COLS - 1 - column
+        return column, score
+
+    def close(self):
+        self._map.close()
+
+
+def open_book(path=DEFAULT_BOOK_PATH):
+    """Ouvre la bibliothèque si le fichier existe, sinon retourne None
+
+    Lève ValueError si le fichier est tronqué ou corrompu.
+    """
+    if path is None or not Path(path).exists():
+        return None
+    return OpeningBook(path)
+
+
+def write_book(path, entries, max_ply):
+    """Écrit une bibliothèque à partir de {clé canonique: (colonne, score)}
+
+    Les colonnes sont celles de la position canonique.
+    """
+    path = Path(path)
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, "wb") as book_file:
+        book_file.write(_HEADER.pack(MAGIC, VERSION, max_ply, len(entries)))
+        for key in sorted(entries):
+            column, score = entries[key]
+            book_file.write(_RECORD.pack(key, column, score))
+    # Remplacement atomique : un lecteur ne voit jamais un fichier à moitié écrit
+    temporary.replace(path)
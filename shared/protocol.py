@@ -1,9 +1,31 @@
 """
 Protocole de communication entre le serveur et les clients
+
+Deux formats de trame coexistent sur une même connexion :
+- JSON délimité par '\n' (format historique, toujours accepté)
+- binaire préfixé par sa longueur (BinaryProtocol), négocié lors du REGISTER
+
+Une trame binaire commence toujours par un octet nul (longueur sur 4 octets
+big-endian, bornée à MAX_FRAME_SIZE) alors qu'une trame JSON commence par
+'{' : le récepteur distingue les deux formats trame par trame.
+
+Une connexion peut porter plusieurs joueurs (sessions) : chaque trame d'un
+joueur multiplexé porte son identifiant de session (clé "sid" en JSON,
+champ de 2 octets en binaire). Une trame sans identifiant concerne le
+joueur enregistré sans session, ou la connexion elle-même (PING/PONG).
 """
 import json
+import struct
+
+# Taille maximale d'une trame binaire (l'octet de poids fort de la longueur reste nul)
+MAX_FRAME_SIZE = 1 << 24
+# Identifiants de session possibles sur une connexion : 0 à MAX_SESSION_ID
+MAX_SESSION_ID = 0xFFFF
 
 class Protocol:
+    # Trames sans identifiant de session (voir SessionProtocol)
+    session = None
+
     # Types de messages
     REGISTER = "REGISTER"
     REGISTER_OK = "REGISTER_OK"
@@ -15,21 +37,252 @@ class Protocol:
     GAME_START = "GAME_START"
     PLAY_MOVE = "PLAY_MOVE"
     GAME_UPDATE = "GAME_UPDATE"
+    RESYNC = "RESYNC"
     GAME_OVER = "GAME_OVER"
     DISCONNECT = "DISCONNECT"
     ERROR = "ERROR"
-    
+    JOIN_QUEUE = "JOIN_QUEUE"
+    LEAVE_QUEUE = "LEAVE_QUEUE"
+    TOURNAMENT_JOIN = "TOURNAMENT_JOIN"
+    TOURNAMENT_START = "TOURNAMENT_START"
+    TOURNAMENT_OVER = "TOURNAMENT_OVER"
+    HINT = "HINT"
+    STATS = "STATS"
+    SPECTATE = "SPECTATE"
+    UNSPECTATE = "UNSPECTATE"
+    LIST_GAMES = "LIST_GAMES"
+    PING = "PING"
+    PONG = "PONG"
+    LEADERBOARD = "LEADERBOARD"
+    MY_RANK = "MY_RANK"
+    ANALYZE = "ANALYZE"
+
+    # Codes des types pour le format binaire : ne jamais réordonner, seulement ajouter
+    MESSAGE_TYPES = (
+        REGISTER, REGISTER_OK, LIST_PLAYERS, CHALLENGE, CHALLENGE_RECEIVED,
+        CHALLENGE_ACCEPTED, CHALLENGE_REFUSED, GAME_START, PLAY_MOVE,
+        GAME_UPDATE, RESYNC, GAME_OVER, DISCONNECT, ERROR,
+        JOIN_QUEUE, LEAVE_QUEUE, TOURNAMENT_JOIN, TOURNAMENT_START, TOURNAMENT_OVER,
+        HINT, STATS, SPECTATE, UNSPECTATE, LIST_GAMES, PING, PONG,
+        LEADERBOARD, MY_RANK, ANALYZE
+    )
+
+    # Fonctionnalités optionnelles négociées lors du REGISTER
+    FEATURE_DELTA = "delta_updates"  # GAME_UPDATE incrémentaux après le premier état complet
+    FEATURE_BINARY = "binary_frames"  # Trames BinaryProtocol après le REGISTER_OK
+
     @staticmethod
-    def encode(msg_type, data=None):
+    def encode(msg_type, data=None, session=None):
         """Encode un message en JSON"""
         message = {"type": msg_type, "data": data}
+        if session is not None:
+            message["sid"] = session
         return json.dumps(message).encode('utf-8') + b'\n'
-    
+
     @staticmethod
     def decode(raw_message):
-        """Décode un message JSON"""
+        """Décode une trame, JSON ou binaire"""
+        return Protocol.decode_session(raw_message)[:2]
+
+    @staticmethod
+    def decode_session(raw_message):
+        """Décode une trame, JSON ou binaire, en (type, données, identifiant de session)"""
+        if raw_message[:1] == b"\x00":
+            return BinaryProtocol.decode_session(raw_message)
         try:
             message = json.loads(raw_message.decode('utf-8'))
-            return message.get("type"), message.get("data")
-        except:
-            return None, None
\ No newline at end of file
+            session = message.get("sid")
+            if session is not None and not (type(session) is int and 0 <= session <= MAX_SESSION_ID):
+                return None, None, None
+            return message.get("type"), message.get("data"), session
+        except (ValueError, AttributeError):
+            return None, None, None
+
+
+# En-tête d'une trame binaire : longueur (type + session + payload) puis code du type
+_HEADER = struct.Struct("!IB")
+# Identifiant de session, présent entre l'en-tête et le payload si _SESSION est levé
+_SESSION_ID = struct.Struct("!H")
+_TYPE_CODES = {msg_type: code for code, msg_type in enumerate(Protocol.MESSAGE_TYPES)}
+
+# Bits du code de type : payload JSON générique au lieu d'un payload compact,
+# trame d'un joueur multiplexé. Les 6 bits restants limitent les types à 64.
+_JSON_PAYLOAD = 0x80
+_SESSION = 0x40
+_TYPE_MASK = 0x3F
+
+# Une ligne du plateau (7 cases de 2 bits) tient sur 14 bits : tables précalculées
+_ROW_BITS = 14
+_ROW_MASK = (1 << _ROW_BITS) - 1
+_ROW_CODES = {}
+_ROW_CELLS = {}
+for _code in range(3 ** 7):
+    _cells = []
+    _value = _code
+    for _ in range(7):
+        _cells.append(_value % 3)
+        _value //= 3
+    _packed = 0
+    for _cell in _cells:
+        _packed = (_packed << 2) | _cell
+    _ROW_CODES[tuple(_cells)] = _packed
+    _ROW_CELLS[_packed] = tuple(_cells)
+
+_BOARD_ROWS = 6
+_BOARD_BYTES = (_BOARD_ROWS * _ROW_BITS + 7) // 8  # 42 cases de 2 bits = 11 octets
+
+_UPDATE_FLAGS_KEYS = frozenset(("current_player", "winner", "winner_id", "game_over", "seq"))
+_FULL_UPDATE_KEYS = _UPDATE_FLAGS_KEYS | {"board"}
+_DELTA_UPDATE_KEYS = _UPDATE_FLAGS_KEYS | {"move"}
+
+
+def _pack_game_update(data):
+    """GAME_UPDATE : drapeaux, seq, puis plateau (11 octets) ou coup (1 octet), puis winner_id"""
+    keys = data.keys()
+    if keys == _FULL_UPDATE_KEYS:
+        board = data["board"]
+        if len(board) != _BOARD_ROWS:
+            return None
+        value = 0
+        for row in board:
+            value = (value << _ROW_BITS) | _ROW_CODES[tuple(row)]
+        body = value.to_bytes(_BOARD_BYTES, "big")
+        delta = 0
+    elif keys == _DELTA_UPDATE_KEYS:
+        move = data["move"]
+        column, row, player = move["column"], move["row"], move["player"]
+        if len(move) != 3 or not (0 <= column < 8 and 0 <= row < 8 and 0 <= player < 4):
+            return None
+        body = bytes(((column << 5) | (row << 2) | player,))
+        delta = 1
+    else:
+        return None
+
+    winner = data["winner"] or 0
+    current_player = data["current_player"]
+    seq = data["seq"]
+    winner_id = (data["winner_id"] or "").encode("utf-8")
+    if not (0 <= winner < 4 and 0 <= current_player < 4 and 0 <= seq < 256 and len(winner_id) < 256):
+        return None
+
+    flags = delta | (data["game_over"] << 1) | (current_player << 2) | (winner << 4)
+    return bytes((flags, seq)) + body + bytes((len(winner_id),)) + winner_id
+
+
+def _unpack_game_update(payload):
+    flags, seq = payload[0], payload[1]
+    if flags & 1:
+        move = payload[2]
+        data = {"move": {"column": move >> 5, "row": (move >> 2) & 7, "player": move & 3}}
+        offset = 3
+    else:
+        value = int.from_bytes(payload[2:2 + _BOARD_BYTES], "big")
+        data = {"board": [
+            list(_ROW_CELLS[(value >> shift) & _ROW_MASK])
+            for shift in range((_BOARD_ROWS - 1) * _ROW_BITS, -1, -_ROW_BITS)
+        ]}
+        offset = 2 + _BOARD_BYTES
+
+    id_length = payload[offset]
+    winner = (flags >> 4) & 3
+    data["seq"] = seq
+    data["current_player"] = (flags >> 2) & 3
+    data["winner"] = winner or None
+    data["winner_id"] = bytes(payload[offset + 1:offset + 1 + id_length]).decode("utf-8") or None
+    data["game_over"] = bool(flags & 2)
+    return data
+
+
+def _pack_play_move(data):
+    """PLAY_MOVE : la colonne sur un octet signé"""
+    column = data.get("column")
+    if len(data) != 1 or type(column) is not int or not -128 <= column < 128:
+        return None
+    return struct.pack("!b", column)
+
+
+def _unpack_play_move(payload):
+    return {"column": struct.unpack("!b", payload)[0]}
+
+
+_PACKERS = {
+    Protocol.GAME_UPDATE: _pack_game_update,
+    Protocol.PLAY_MOVE: _pack_play_move,
+}
+_UNPACKERS = {
+    Protocol.GAME_UPDATE: _unpack_game_update,
+    Protocol.PLAY_MOVE: _unpack_play_move,
+}
+
+
+class BinaryProtocol:
+    """Trames binaires : [longueur u32][code du type u8][session u16 optionnelle][payload]
+
+    Les messages fréquents (GAME_UPDATE, PLAY_MOVE) ont un payload compact ;
+    les autres transportent leurs données en JSON sans espaces.
+    """
+
+    session = None
+
+    @staticmethod
+    def encode(msg_type, data=None, session=None):
+        """Encode un message en trame binaire"""
+        code = _TYPE_CODES[msg_type]
+        packer = _PACKERS.get(msg_type)
+        payload = None
+        if packer is not None and isinstance(data, dict):
+            try:
+                payload = packer(data)
+            except (KeyError, TypeError):
+                payload = None
+
+        if payload is None:
+            code |= _JSON_PAYLOAD
+            payload = b"" if data is None else json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+        if session is not None:
+            code |= _SESSION
+            payload = _SESSION_ID.pack(session) + payload
+
+        if len(payload) >= MAX_FRAME_SIZE:
+            raise ValueError(f"Trame trop grande ({len(payload)} octets)")
+        return _HEADER.pack(len(payload) + 1, code) + payload
+
+    @staticmethod
+    def decode(raw_message):
+        """Décode une trame binaire complète (en-tête compris)"""
+        return BinaryProtocol.decode_session(raw_message)[:2]
+
+    @staticmethod
+    def decode_session(raw_message):
+        """Décode une trame binaire complète en (type, données, identifiant de session)"""
+        try:
+            length, code = _HEADER.unpack_from(raw_message)
+            start = _HEADER.size
+            session = None
+            if code & _SESSION:
+                session = _SESSION_ID.unpack_from(raw_message, start)[0]
+                start += _SESSION_ID.size
+            payload = raw_message[start:4 + length]
+            msg_type = Protocol.MESSAGE_TYPES[code & _TYPE_MASK]
+            if code & _JSON_PAYLOAD:
+                return msg_type, json.loads(payload) if payload else None, session
+            return msg_type, _UNPACKERS[msg_type](payload), session
+        except (struct.error, IndexError, KeyError, ValueError):
+            return None, None, None
+
+
+class SessionProtocol:
+    """Format d'un joueur multiplexé : trames de son format de base, marquées de sa session
+
+    S'utilise comme Protocol ou BinaryProtocol (encode(type, données)).
+    """
+
+    __slots__ = ("base", "session")
+
+    def __init__(self, base, session):
+        self.base = base  # Protocol ou BinaryProtocol
+        self.session = session
+
+    def encode(self, msg_type, data=None):
+        return self.base.encode(msg_type, data, self.session)
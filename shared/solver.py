@@ -0,0 +1,292 @@
+"""
+Recherche du meilleur coup au Puissance 4
+
+Negamax avec élagage alpha-bêta sur une représentation bitboard : chaque
+colonne occupe 7 bits (6 cases + 1 bit sentinelle), comme dans
+server/game.py. Une position est décrite par deux entiers :
+- current : pions du joueur qui doit jouer
+- mask : toutes les cases occupées
+
+Les coups sont explorés du centre vers les bords, les coups menaçant le plus
+d'alignements en premier. Les positions déjà évaluées sont conservées dans
+une table de transposition bornée (éviction LRU). L'approfondissement
+itératif garantit qu'un coup est disponible à tout moment : la recherche
+s'arrête à l'échéance et retourne le meilleur coup de la dernière
+profondeur terminée.
+"""
+import collections
+import time
+
+ROWS = 6
+COLS = 7
+COLUMN_BITS = ROWS + 1
+CELLS = ROWS * COLS
+
+# Ordre d'exploration des colonnes : du centre vers les bords
+CENTER_ORDER = (3, 2, 4, 1, 5, 0, 6)
+
+# Score d'une victoire au coup n : WIN_SCORE - n (une victoire rapide vaut plus)
+WIN_SCORE = 1000
+
+DEFAULT_TABLE_SIZE = 1 << 18
+
+_BOTTOM_ROW = sum(1 << (col * COLUMN_BITS) for col in range(COLS))
+_BOARD_MASK = _BOTTOM_ROW * ((1 << ROWS) - 1)
+_COLUMN_BITS_MASK = (1 << COLUMN_BITS) - 1
+_COLUMN_MASKS = tuple(((1 << ROWS) - 1) << (col * COLUMN_BITS) for col in range(COLS))
+
+# Types d'entrée de la table de transposition
+_EXACT = 0
+_LOWER = 1
+_UPPER = 2
+
+# Nombre de nœuds entre deux vérifications de l'échéance
+_CLOCK_INTERVAL = 1024
+
+
+class SearchTimeout(Exception):
+    """Échéance atteinte au cours d'une profondeur de recherche"""
+
+
+def from_board(board, player):
+    """Convertit un plateau (liste de lignes, ligne 0 en haut) en (current, mask, moves)
+
+    player est le numéro (1 ou 2) du joueur qui doit jouer.
+    """
+    current = mask = moves = 0
+    for row_index, row in enumerate(board):
+        height = ROWS - 1 - row_index
+        for col, cell in enumerate(row):
+            if cell:
+                bit = 1 << (col * COLUMN_BITS + height)
+                mask |= bit
+                moves += 1
+                if cell == player:
+                    current |= bit
+    return current, mask, moves
+
+
+def winning_positions(position, mask):
+    """Cases vides (ou non encore jouables) qui compléteraient un alignement de position"""
+    # Vertical
+    result = (position << 1) & (position << 2) & (position << 3)
+
+    for shift in (COLUMN_BITS, COLUMN_BITS + 1, COLUMN_BITS - 1):
+        pair = (position << shift) & (position << 2 * shift)
+        result |= pair & (position << 3 * shift)
+        result |= pair & (position >> shift)
+        pair = (position >> shift) & (position >> 2 * shift)
+        result |= pair & (position << shift)
+        result |= pair & (position >> 3 * shift)
+
+    return result & (_BOARD_MASK ^ mask)
+
+
+def playable_moves(mask):
+    """Bits des cases jouables (une par colonne non pleine)"""
+    return (mask + _BOTTOM_ROW) & _BOARD_MASK
+
+
+def column_of(move_bit):
+    return (move_bit.bit_length() - 1) // COLUMN_BITS
+
+
+def mirror(bitboard):
+    """Symétrique gauche-droite d'un bitboard"""
+    result = 0
+    for col in range(COLS):
+        column = (bitboard >> (col * COLUMN_BITS)) & _COLUMN_BITS_MASK
+        result |= column << ((COLS - 1 - col) * COLUMN_BITS)
+    return result
+
+
+def canonical_key(current, mask):
+    """Clé unique d'une position, identique pour une position et son symétrique
+
+    Retourne (clé, symétrique) : symétrique est vrai si la clé est celle de la
+    position miroir, auquel cas une colonne c de la position canonique
+    correspond à la colonne COLS - 1 - c de la position réelle.
+    """
+    key = current + mask
+    mirrored_key = mirror(current) + mirror(mask)
+    if mirrored_key < key:
+        return mirrored_key, True
+    return key, False
+
+
+class TranspositionTable:
+    """Table de transposition bornée, éviction de l'entrée la moins récemment utilisée"""
+
+    def __init__(self, max_entries=DEFAULT_TABLE_SIZE):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        entries = self._entries
+        entries[key] = entry
+        entries.move_to_end(key)
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class Solver:
+    def __init__(self, table_size=DEFAULT_TABLE_SIZE):
+        self.table = TranspositionTable(table_size)
+        self.nodes = 0
+        self._deadline = None
+
+    def best_move(self, current, mask, moves, time_budget=1.0, max_depth=None):
+        """Retourne (colonne, score, profondeur atteinte) pour le joueur qui doit jouer
+
+        La recherche s'arrête au plus tard après time_budget secondes. Un
+        score supérieur à 0 est favorable au joueur qui doit jouer ; un score
+        proche de ±WIN_SCORE indique une issue forcée.
+        """
+        self.nodes = 0
+        self._deadline = time.monotonic() + time_budget
+        remaining = CELLS - moves
+        max_depth = remaining if max_depth is None else min(max_depth, remaining)
+
+        possible = playable_moves(mask)
+        if not possible:
+            return None, 0, 0
+
+        # Victoire immédiate : inutile de chercher plus loin
+        winning = winning_positions(current, mask) & possible
+        if winning:
+            return column_of(winning & -winning), WIN_SCORE - moves - 1, 1
+
+        best_column = column_of(self._ordered_moves(current, mask, possible)[0])
+        best_score = 0
+        depth_reached = 0
+
+        for depth in range(1, max_depth + 1):
+            try:
+                column, score = self._search_root(current, mask, moves, depth, best_column)
+            except SearchTimeout:
+                break
+            best_column, best_score, depth_reached = column, score, depth
+            # Issue forcée trouvée : approfondir ne changera pas le coup
+            if abs(score) >= WIN_SCORE - CELLS:
+                break
+
+        return best_column, best_score, depth_reached
+
+    def _search_root(self, current, mask, moves, depth, previous_best):
+        """Une itération de profondeur depth, en explorant d'abord le meilleur coup précédent"""
+        ordered = self._ordered_moves(current, mask, playable_moves(mask))
+        ordered.sort(key=lambda move: column_of(move) != previous_best)
+
+        alpha = -WIN_SCORE
+        beta = WIN_SCORE
+        best_move = ordered[0]
+        for move in ordered:
+            score = -self._negamax(current ^ mask, mask | move, moves + 1, depth - 1, -beta, -alpha)
+            if score > alpha:
+                alpha = score
+                best_move = move
+        return column_of(best_move), alpha
+
+    def _negamax(self, current, mask, moves, depth, alpha, beta):
+        """Score de la position pour le joueur qui doit jouer, borné par [alpha, beta]"""
+        self.nodes += 1
+        if self.nodes % _CLOCK_INTERVAL == 0 and time.monotonic() > self._deadline:
+            raise SearchTimeout()
+
+        if moves == CELLS:
+            return 0
+
+        possible = playable_moves(mask)
+        if winning_positions(current, mask) & possible:
+            return WIN_SCORE - moves - 1
+
+        # Les menaces adverses immédiates doivent être parées
+        opponent = current ^ mask
+        opponent_wins = winning_positions(opponent, mask)
+        forced = possible & opponent_wins
+        if forced:
+            if forced & (forced - 1):
+                return -(WIN_SCORE - moves - 2)  # Deux menaces : défaite au coup suivant
+            possible = forced
+        # Ne jamais jouer sous une case gagnante de l'adversaire
+        possible &= ~(opponent_wins >> 1)
+        if not possible:
+            return -(WIN_SCORE - moves - 2)
+
+        if depth <= 0:
+            return self._evaluate(current, opponent, mask)
+
+        key = current + mask
+        alpha_orig = alpha
+        entry = self.table.get(key)
+        best_hint = None
+        if entry is not None:
+            entry_depth, flag, score, best_hint = entry
+            if entry_depth >= depth:
+                if flag == _EXACT:
+                    return score
+                if flag == _LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        ordered = self._ordered_moves(current, mask, possible)
+        if best_hint is not None and best_hint & possible:
+            ordered.remove(best_hint)
+            ordered.insert(0, best_hint)
+
+        best_score = -WIN_SCORE
+        best_move = ordered[0]
+        for move in ordered:
+            score = -self._negamax(opponent, mask | move, moves + 1, depth - 1, -beta, -alpha)
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_score <= alpha_orig:
+            flag = _UPPER
+        elif best_score >= beta:
+            flag = _LOWER
+        else:
+            flag = _EXACT
+        self.table.put(key, (depth, flag, best_score, best_move))
+        return best_score
+
+    @staticmethod
+    def _ordered_moves(current, mask, possible):
+        """Coups jouables triés : plus de menaces créées d'abord, puis du centre vers les bords"""
+        scored = []
+        for rank, col in enumerate(CENTER_ORDER):
+            move = possible & _COLUMN_MASKS[col]
+            if move:
+                threats = winning_positions(current | move, mask).bit_count()
+                scored.append((-threats, rank, move))
+        scored.sort()
+        return [move for _, _, move in scored]
+
+    @staticmethod
+    def _evaluate(current, opponent, mask):
+        """Évaluation statique : différence de cases gagnantes, bonus de contrôle du centre"""
+        center = _COLUMN_MASKS[3]
+        return (
+            2 * (winning_positions(current, mask).bit_count() - winning_positions(opponent, mask).bit_count())
+            + (current & center).bit_count() - (opponent & center).bit_count()
+        )
@@ -0,0 +1,69 @@
+"""
+Benchmark du codec : JSON (Protocol) contre binaire (BinaryProtocol)
+
+Mesure, pour les messages les plus fréquents d'une partie, la taille des
+trames et le temps d'encodage / décodage.
+
+Usage : python tools/bench_codec.py [--number 20000]
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "server"))
+
+from shared.protocol import Protocol, BinaryProtocol
+from game import Connect4Game
+
+
+def sample_messages():
+    """Messages représentatifs d'une partie en cours"""
+    game = Connect4Game("player_1", "player_2")
+    for column in (3, 3, 2, 4, 4, 2, 5, 1, 0, 6, 3, 3):
+        game.play_move(column)
+
+    return [
+        ("GAME_UPDATE complet", Protocol.GAME_UPDATE, game.get_board_state()),
+        ("GAME_UPDATE delta", Protocol.GAME_UPDATE, game.get_move_delta()),
+        ("PLAY_MOVE", Protocol.PLAY_MOVE, {"column": 3}),
+        ("GAME_START", Protocol.GAME_START, {
+            "game_id": "game_1", "player1": "alice", "player2": "bob",
+            "your_number": 1, "your_name": "alice"
+        }),
+    ]
+
+
+def measure(codec, msg_type, data, number):
+    """Retourne (taille, µs par encode, µs par decode)"""
+    frame = codec.encode(msg_type, data)
+    encode_time = timeit.timeit(lambda: codec.encode(msg_type, data), number=number)
+    decode_time = timeit.timeit(lambda: Protocol.decode(frame), number=number)
+    return len(frame), encode_time / number * 1e6, decode_time / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du codec du protocole")
+    parser.add_argument("--number", type=int, default=20000, help="itérations par mesure")
+    args = parser.parse_args()
+
+    print(f"{'message':<22} {'codec':<7} {'octets':>7} {'encode µs':>10} {'decode µs':>10}")
+    for label, msg_type, data in sample_messages():
+        results = {}
+        for name, codec in (("json", Protocol), ("binary", BinaryProtocol)):
+            results[name] = measure(codec, msg_type, data, args.number)
+            size, encode_us, decode_us = results[name]
+            print(f"{label:<22} {name:<7} {size:>7} {encode_us:>10.2f} {decode_us:>10.2f}")
+
+        json_size, json_encode, json_decode = results["json"]
+        bin_size, bin_encode, bin_decode = results["binary"]
+        print(
+            f"{'':<22} {'gain':<7} {json_size / bin_size:>6.1f}x "
+            f"{json_encode / bin_encode:>9.1f}x {json_decode / bin_decode:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
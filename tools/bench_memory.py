@@ -0,0 +1,114 @@
+"""
+Empreinte mémoire du serveur sur un grand nombre de parties
+
+Fait jouer --games parties (victoire verticale en 7 coups) à deux joueurs
+dans un GameServer sans réseau : les trames sont encodées puis jetées par
+une connexion factice. Le RSS du processus est relevé toutes les --sample
+parties ; il doit rester plat une fois les caches remplis, les parties
+terminées ne restant pas dans le registre du serveur.
+
+Usage : python tools/bench_memory.py [--games 1000000] [--sample 100000]
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import resource
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "server"))
+
+from shared.protocol import Protocol
+from server import GameServer
+
+# Colonnes jouées alternativement : le joueur 1 aligne quatre pions dans la colonne 0
+WINNING_SEQUENCE = (0, 1, 0, 1, 0, 1, 0)
+
+
+class NullConnection:
+    """Connexion qui accepte et jette les trames"""
+
+    player_id = None
+
+    def send(self, data, coalesce_key=None, supersede=False, flush=True):
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def is_backlogged(self):
+        return False
+
+    def close(self):
+        pass
+
+
+def rss_bytes():
+    """RSS courant (Linux), ou pic de RSS ailleurs"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RSS du serveur après un grand nombre de parties")
+    parser.add_argument("--games", type=int, default=1000000)
+    parser.add_argument("--sample", type=int, default=100000, help="parties entre deux relevés")
+    parser.add_argument("--warmup", type=int, default=10000, help="parties jouées avant le relevé de référence")
+    args = parser.parse_args()
+
+    # Sans start_services, la roue des échéances n'avance pas : pas de temps de réflexion
+    server = GameServer(port=0, turn_timeout=0)
+    features = {"features": [Protocol.FEATURE_DELTA, Protocol.FEATURE_BINARY]}
+    # Les journaux du serveur (une ligne par partie) sont jetés
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        player1 = server.register_player(NullConnection(), dict(features, name="alice"))
+        player2 = server.register_player(NullConnection(), dict(features, name="bob"))
+    players = (player1, player2)
+
+    def play(count):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(count):
+                server.start_game(player1, player2)
+                for turn, column in enumerate(WINNING_SEQUENCE):
+                    server.handle_move(players[turn % 2], {"column": column})
+
+    play(args.warmup)
+    gc.collect()
+    baseline = rss_bytes()
+    samples = []
+    started = time.perf_counter()
+    played = 0
+
+    while played < args.games:
+        count = min(args.sample, args.games - played)
+        play(count)
+        played += count
+        gc.collect()
+        rss = rss_bytes()
+        samples.append({"games": played, "rss_mb": round(rss / 2**20, 2), "live_games": len(server.games)})
+        print(f"  {played:>9} parties : RSS {rss / 2**20:8.2f} Mo, {len(server.games)} parties en mémoire",
+              file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "games": played,
+        "games_per_sec": round(played / elapsed, 1),
+        "baseline_rss_mb": round(baseline / 2**20, 2),
+        "final_rss_mb": samples[-1]["rss_mb"] if samples else None,
+        "growth_mb": round(samples[-1]["rss_mb"] - baseline / 2**20, 2) if samples else None,
+        "recent_results": len(server.recent_results),
+        "samples": samples,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
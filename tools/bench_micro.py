@@ -0,0 +1,268 @@
+"""
+Micro-benchmarks de la logique de jeu et du codec
+
+Mesure le débit (opérations par seconde) et les allocations des chemins
+chauds du serveur sur des charges représentatives :
+- parties aléatoires complètes (play_move), suites de coups tirées d'avance
+  avec une graine fixe
+- détection de victoire dans le pire cas (plateau plein sans alignement :
+  les quatre directions sont testées)
+- get_board_state et get_move_delta en milieu de partie
+- encode / decode des messages fréquents, en JSON et en binaire
+- rafale de trames pipelinées : découpage par FrameBuffer puis décodage
+
+Chaque mesure garde le meilleur de --repeat séries (ramasse-miettes
+arrêté). Les allocations sont relevées à part avec tracemalloc : pic
+d'allocation d'une opération et mémoire retenue par opération (une valeur
+non nulle signale une fuite).
+
+Les résultats sont écrits en JSON (--output) et comparés à une référence
+(--baseline, tools/bench_baseline.json par défaut) : une opération plus
+lente que la référence de plus de --tolerance fait échouer la commande.
+
+Usage : python tools/bench_micro.py [--only codec] [--output results.json]
+        python tools/bench_micro.py --save-baseline
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import timeit
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "server"))
+
+from shared.protocol import Protocol, BinaryProtocol
+from shared.framing import FrameBuffer
+from game import Connect4Game, COLS, ROWS, COLUMN_BITS
+
+DEFAULT_BASELINE = Path(__file__).parent / "bench_baseline.json"
+SEED = 4
+# Parties aléatoires rejouées par opération du benchmark play_move
+RANDOM_GAMES = 100
+# Trames d'une rafale pipelinée, et taille des lectures simulées
+BURST_FRAMES = 10000
+READ_SIZE = 65536
+
+
+def random_games(rng, count):
+    """Suites de colonnes de parties aléatoires jouées jusqu'au bout"""
+    games = []
+    while len(games) < count:
+        game = Connect4Game("player_1", "player_2")
+        columns = []
+        while not game.game_over:
+            column = rng.choice([col for col in range(COLS) if game.heights[col] != col * COLUMN_BITS + ROWS])
+            game.play_move(column)
+            columns.append(column)
+        games.append(columns)
+    return games
+
+
+def drawn_bitboard(rng):
+    """Bitboard du joueur 1 à la fin d'une partie nulle : aucun alignement, plateau plein"""
+    while True:
+        game = Connect4Game("player_1", "player_2")
+        for column in random_games(rng, 1)[0]:
+            game.play_move(column)
+        if game.winner is None:
+            return game.bitboards[0]
+
+
+def midgame():
+    game = Connect4Game("player_1", "player_2")
+    for column in (3, 3, 2, 4, 4, 2, 5, 1, 0, 6, 3, 3):
+        game.play_move(column)
+    return game
+
+
+def build_benchmarks():
+    """{nom: (fonction d'une opération, unité, éléments traités par opération)}"""
+    rng = random.Random(SEED)
+    games = random_games(rng, RANDOM_GAMES)
+    moves = sum(len(columns) for columns in games)
+
+    def play_random_games():
+        for columns in games:
+            game = Connect4Game("player_1", "player_2")
+            for column in columns:
+                game.play_move(column)
+
+    check_win = Connect4Game._check_win
+    no_win = drawn_bitboard(rng)
+    game = midgame()
+    full_state = game.get_board_state()
+    delta = game.get_move_delta()
+
+    benchmarks = {
+        "game.play_move.random_games": (play_random_games, "coups", moves),
+        "game.check_win.worst_case": (lambda: check_win(no_win), "appels", 1),
+        "game.get_board_state": (game.get_board_state, "appels", 1),
+        "game.get_move_delta": (game.get_move_delta, "appels", 1),
+    }
+
+    messages = (
+        ("GAME_UPDATE_full", Protocol.GAME_UPDATE, full_state),
+        ("GAME_UPDATE_delta", Protocol.GAME_UPDATE, delta),
+        ("PLAY_MOVE", Protocol.PLAY_MOVE, {"column": 3}),
+    )
+    for codec_name, codec in (("json", Protocol), ("binary", BinaryProtocol)):
+        for label, msg_type, data in messages:
+            frame = codec.encode(msg_type, data)
+            benchmarks[f"codec.{codec_name}.encode.{label}"] = (
+                lambda codec=codec, msg_type=msg_type, data=data: codec.encode(msg_type, data), "appels", 1
+            )
+            benchmarks[f"codec.{codec_name}.decode.{label}"] = (
+                lambda frame=frame: Protocol.decode(frame), "appels", 1
+            )
+
+        # Rafale de coups pipelinés lus par blocs de READ_SIZE octets
+        burst = b"".join(codec.encode(Protocol.PLAY_MOVE, {"column": i % COLS}) for i in range(BURST_FRAMES))
+        chunks = [burst[i:i + READ_SIZE] for i in range(0, len(burst), READ_SIZE)]
+
+        def read_burst(chunks=chunks):
+            frames = FrameBuffer()
+            decode = Protocol.decode
+            for chunk in chunks:
+                for raw in frames.feed(chunk):
+                    decode(raw)
+
+        benchmarks[f"codec.{codec_name}.pipelined_burst"] = (read_burst, "messages", BURST_FRAMES)
+
+    return benchmarks
+
+
+def time_operation(operation, repeat, min_time):
+    """Meilleur temps d'une opération : (secondes par opération, opérations par série)"""
+    timer = timeit.Timer(operation)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return min(timer.repeat(repeat, number)) / number, number
+
+
+def measure_allocations(operation, number):
+    """(pic d'allocation d'une opération, octets retenus par opération)"""
+    operation()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        operation()
+        _, peak = tracemalloc.get_traced_memory()
+        for _ in range(number):
+            operation()
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - before, (after - before) / (number + 1)
+
+
+def run(benchmarks, repeat, min_time):
+    results = {}
+    for name, (operation, unit, items) in benchmarks.items():
+        seconds, number = time_operation(operation, repeat, min_time)
+        peak, retained = measure_allocations(operation, min(number, 1000))
+        results[name] = {
+            "ops_per_sec": round(1 / seconds, 1),
+            "items_per_sec": round(items / seconds, 1),
+            "unit": unit,
+            "ns_per_op": round(seconds * 1e9, 1),
+            "alloc_peak_bytes": peak,
+            "retained_bytes_per_op": round(retained, 1),
+        }
+        print(
+            f"  {name:<42} {items / seconds:>14,.0f} {unit}/s {seconds * 1e9:>12,.0f} ns/op "
+            f"{peak:>8} o alloués",
+            file=sys.stderr
+        )
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Affiche l'écart à la référence ; retourne les noms des opérations ralenties"""
+    regressions = []
+    print(f"\n  {'opération':<42} {'référence':>14} {'actuel':>14} {'écart':>8}", file=sys.stderr)
+    for name, result in results.items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        ratio = result["ops_per_sec"] / reference["ops_per_sec"]
+        flag = ""
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = "  ⚠️  régression"
+        print(
+            f"  {name:<42} {reference['ops_per_sec']:>14,.0f} {result['ops_per_sec']:>14,.0f} "
+            f"{ratio - 1:>+7.0%}{flag}",
+            file=sys.stderr
+        )
+    return regressions
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de la logique de jeu et du codec")
+    parser.add_argument("--only", default=None, help="ne lance que les opérations dont le nom contient ce texte")
+    parser.add_argument("--repeat", type=int, default=5, help="séries par mesure (le meilleur temps est gardé)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="durée minimale d'une série, en secondes")
+    parser.add_argument("--output", default=None, help="fichier JSON des résultats (sortie standard sinon)")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="résultats de référence")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25,
+        help="ralentissement toléré par rapport à la référence (0.25 : 25 %%)"
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="enregistre les résultats comme nouvelle référence"
+    )
+    args = parser.parse_args()
+
+    benchmarks = build_benchmarks()
+    if args.only:
+        benchmarks = {name: bench for name, bench in benchmarks.items() if args.only in name}
+
+    started = time.perf_counter()
+    report = {"environment": environment(), "results": run(benchmarks, args.repeat, args.min_time)}
+    print(f"  {len(benchmarks)} mesures en {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(text + "\n")
+        print(f"  Référence enregistrée dans {baseline_path}", file=sys.stderr)
+        return
+
+    if not baseline_path.exists():
+        return
+    baseline = json.loads(baseline_path.read_text())
+    if baseline["environment"] != report["environment"]:
+        print(f"  ⚠️  Référence mesurée sur un autre environnement : {baseline['environment']}", file=sys.stderr)
+    regressions = compare(report["results"], baseline, args.tolerance)
+    if regressions:
+        print(f"\n  {len(regressions)} régression(s) au-delà de {args.tolerance:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Construction de la bibliothèque d'ouvertures
+
+Énumère toutes les positions atteignables jusqu'à --ply coups (une seule
+fois par paire de positions symétriques), cherche le meilleur coup de
+chacune avec shared/solver.py et écrit le fichier lu par
+shared/opening_book.py. Les positions sont réparties sur plusieurs
+processus.
+
+Usage : python tools/build_opening_book.py [--ply 6] [--depth 12] [--time-budget 5]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+from shared.solver import (
+    Solver, CELLS, canonical_key, mirror, playable_moves, winning_positions
+)
+from shared.opening_book import DEFAULT_BOOK_PATH, write_book
+
+
+def enumerate_positions(max_ply):
+    """Retourne les positions canoniques [(current, mask, moves)] jusqu'à max_ply coups
+
+    Les positions déjà gagnées ne sont pas retenues.
+    """
+    positions = []
+    level = {canonical_key(0, 0)[0]: (0, 0)}
+    for moves in range(max_ply + 1):
+        positions.extend((current, mask, moves) for current, mask in level.values())
+        if moves == max_ply or moves == CELLS:
+            break
+
+        next_level = {}
+        for current, mask in level.values():
+            possible = playable_moves(mask)
+            # Une position avec une victoire immédiate n'a pas besoin d'entrée au-delà
+            if winning_positions(current, mask) & possible:
+                continue
+            while possible:
+                move = possible & -possible
+                possible ^= move
+                # Après le coup, c'est à l'adversaire de jouer
+                child_current, child_mask = current ^ mask, mask | move
+                key, mirrored = canonical_key(child_current, child_mask)
+                if key not in next_level:
+                    if mirrored:
+                        child_current, child_mask = mirror(child_current), mirror(child_mask)
+                    next_level[key] = (child_current, child_mask)
+        level = next_level
+    return positions
+
+
+_solver = None
+
+
+def _init_worker(table_size):
+    global _solver
+    _solver = Solver(table_size)
+
+
+def _solve(args):
+    current, mask, moves, depth, time_budget = args
+    column, score, _ = _solver.best_move(current, mask, moves, time_budget, max_depth=depth)
+    return current + mask, column, score
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construit la bibliothèque d'ouvertures")
+    parser.add_argument("--ply", type=int, default=6, help="nombre de coups maximal des positions")
+    parser.add_argument("--depth", type=int, default=12, help="profondeur de recherche par position")
+    parser.add_argument("--time-budget", type=float, default=5.0, help="temps maximal par position, en secondes")
+    parser.add_argument("--table-size", type=int, default=1 << 18)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default=str(DEFAULT_BOOK_PATH))
+    args = parser.parse_args()
+
+    positions = enumerate_positions(args.ply)
+    print(f"{len(positions)} positions jusqu'à {args.ply} coups")
+
+    started = time.monotonic()
+    entries = {}
+    tasks = [(current, mask, moves, args.depth, args.time_budget) for current, mask, moves in positions]
+    with multiprocessing.Pool(args.workers, _init_worker, (args.table_size,)) as pool:
+        for done, (key, column, score) in enumerate(pool.imap_unordered(_solve, tasks, chunksize=8), 1):
+            entries[key] = (column, score)
+            if done % 500 == 0:
+                print(f"  {done}/{len(tasks)} ({time.monotonic() - started:.0f}s)")
+
+    write_book(args.output, entries, args.ply)
+    print(f"{len(entries)} entrées écrites dans {args.output} en {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Vérification croisée du moteur vectorisé (server/batch_game.py)
+
+Joue les mêmes coups aléatoires sur un BatchGame et sur un Connect4Game par
+plateau, colonnes invalides, colonnes pleines et coups après la fin compris,
+et compare à chaque coup : validité, victoire, match nul, bitboards, joueur
+courant, nombre de coups. Vérifie aussi replay() sur les séquences jouées.
+Termine par la mesure du débit des parties aléatoires.
+
+Usage : python tools/check_batch_engine.py [--games 2000] [--steps 60] [--seed 1]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "server"))
+
+from game import Connect4Game, COLS
+from batch_game import BatchGame, replay
+
+
+def cross_check(games, steps, rng):
+    """Retourne la liste des écarts entre les deux moteurs (vide si aucun)"""
+    batch = BatchGame(games)
+    reference = [Connect4Game("p1", "p2") for _ in range(games)]
+    sequences = [[] for _ in range(games)]
+    mismatches = []
+
+    for step in range(steps):
+        # Surtout des colonnes valides, parfois hors plateau
+        columns = rng.integers(-1, COLS + 1, size=games)
+        valid, won, draw = batch.play(columns)
+
+        for row, game in enumerate(reference):
+            column = int(columns[row])
+            was_over = game.game_over
+            success, _ = game.play_move(column)
+            expected = (
+                success,
+                success and game.winner is not None and not was_over,
+                success and game.game_over and game.winner is None,
+            )
+            actual = (bool(valid[row]), bool(won[row]), bool(draw[row]))
+            state = (
+                [int(batch.bitboards[0, row]), int(batch.bitboards[1, row])],
+                int(batch.current_player[row]),
+                int(batch.winner[row]) or None,
+                bool(batch.game_over[row]),
+                int(batch.moves[row]),
+                [int(height) for height in batch.heights[row]],
+            )
+            expected_state = (
+                game.bitboards, game.current_player, game.winner, game.game_over, game.moves, game.heights
+            )
+            if actual != expected or state != expected_state:
+                mismatches.append((step, row, column, actual, expected))
+            if success:
+                sequences[row].append(column)
+
+    # Les parties jouées, rejouées en bloc, donnent les mêmes gagnants
+    winners, moves, first_invalid = replay(sequences)
+    for row, game in enumerate(reference):
+        if (int(winners[row]) or None, int(moves[row]), int(first_invalid[row])) != (game.winner, game.moves, -1):
+            mismatches.append(("replay", row, sequences[row]))
+    return mismatches
+
+
+def benchmark(games, rng):
+    """Parties aléatoires complètes par seconde"""
+    started = time.perf_counter()
+    winners = BatchGame(games).playout(rng)
+    elapsed = time.perf_counter() - started
+    counts = np.bincount(winners, minlength=3)
+    return games / elapsed, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérifie BatchGame contre Connect4Game")
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=60, help="coups tentés par plateau")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--playouts", type=int, default=100000, help="parties aléatoires du test de débit")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    mismatches = cross_check(args.games, args.steps, rng)
+    if mismatches:
+        print(f"❌ {len(mismatches)} écarts, premiers : {mismatches[:5]}")
+        sys.exit(1)
+    print(f"✅ {args.games} parties x {args.steps} coups identiques à Connect4Game")
+
+    rate, counts = benchmark(args.playouts, rng)
+    print(f"🎲 {rate:,.0f} parties aléatoires/s "
+          f"(joueur 1: {counts[1]}, joueur 2: {counts[2]}, nuls: {counts[0]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""
+Générateur de charge : essaim de joueurs automatiques sans interface
+
+Lance --clients joueurs répartis sur --processes processus (une boucle
+asyncio par processus). Les joueurs sont groupés par paires : le premier
+demande la liste des joueurs puis défie le second, qui accepte, et les deux
+jouent des coups aléatoires (ou --script) pendant --games parties.
+
+Avec --sessions-per-connection N, les joueurs d'un processus partagent
+leurs connexions par groupes de N (player/async_client.py) au lieu d'ouvrir
+chacun la sienne.
+
+Le résultat est écrit en JSON sur la sortie standard :
+connexions/s, parties/s, coups/s et latence aller-retour d'un coup
+(PLAY_MOVE -> GAME_UPDATE du joueur) en p50/p95/p99.
+
+Usage : python tools/loadgen.py --clients 200 --processes 4 --games 5
+        python tools/loadgen.py --spawn-server asyncio --clients 1000
+        python tools/loadgen.py --spawn-server threads --clients 1000 --sessions-per-connection 500
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+from shared.protocol import Protocol, BinaryProtocol
+from shared.framing import FrameBuffer
+from player.async_client import MultiplexClient
+
+ROWS = 6
+COLS = 7
+
+# Fonctionnalités demandées par les bots selon --features
+FEATURE_SETS = {
+    "json": [],
+    "delta": [Protocol.FEATURE_DELTA],
+    "binary": [Protocol.FEATURE_DELTA, Protocol.FEATURE_BINARY],
+}
+
+
+class Bot:
+    """Client minimal parlant le protocole du serveur"""
+
+    def __init__(self, name, features, rng, script=None):
+        self.name = name
+        self.features = features
+        self.rng = rng
+        self.script = script
+        self.protocol = Protocol
+        self.player_id = None
+        self.reader = None
+        self.writer = None
+        self.session = None  # ClientSession si le bot partage une connexion multiplexée
+        self.frames = FrameBuffer()
+        self.pending = []
+        self.heights = [0] * COLS
+        self.number = None
+        self.moves_played = 0
+        self.latencies = []
+
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.send(Protocol.REGISTER, {"name": self.name, "features": self.features})
+        data = await self.until(Protocol.REGISTER_OK)
+        self.player_id = data["player_id"]
+        if Protocol.FEATURE_BINARY in data["features"]:
+            self.protocol = BinaryProtocol
+
+    async def join(self, client):
+        """Enregistre le bot comme joueur de la connexion partagée client"""
+        self.session = await client.register(self.name, self.features)
+        self.player_id = self.session.player_id
+
+    def send(self, msg_type, data=None):
+        if self.session is not None:
+            self.session.send(msg_type, data)
+        else:
+            self.writer.write(self.protocol.encode(msg_type, data))
+
+    async def recv(self):
+        if self.session is not None:
+            return await self.session.recv()
+        while not self.pending:
+            data = await self.reader.read(65536)
+            if not data:
+                raise ConnectionError(f"{self.name}: connexion fermée par le serveur")
+            self.pending.extend(self.frames.feed(data))
+        msg_type, data = Protocol.decode(self.pending.pop(0))
+        if msg_type == Protocol.PING:
+            self.send(Protocol.PONG)
+        return msg_type, data
+
+    async def until(self, msg_type):
+        """Attend un message du type donné en ignorant les autres"""
+        while True:
+            received_type, data = await self.recv()
+            if received_type == msg_type:
+                return data
+
+    def choose_column(self):
+        """Coup scripté s'il est jouable, sinon colonne aléatoire non pleine"""
+        if self.script:
+            column = self.script[self.moves_played % len(self.script)]
+            if self.heights[column] < ROWS:
+                return column
+        return self.rng.choice([col for col in range(COLS) if self.heights[col] < ROWS])
+
+    def apply_update(self, data):
+        if "board" in data:
+            self.heights = [sum(1 for row in data["board"] if row[col]) for col in range(COLS)]
+        else:
+            self.heights[data["move"]["column"]] += 1
+
+    async def play_game(self):
+        """Joue une partie jusqu'au GAME_OVER ; retourne le nombre de coups joués"""
+        self.number = (await self.until(Protocol.GAME_START))["your_number"]
+        self.heights = [0] * COLS
+        sent_at = None
+        moves = 0
+
+        while True:
+            msg_type, data = await self.recv()
+
+            if msg_type == Protocol.GAME_UPDATE:
+                if sent_at is not None:
+                    self.latencies.append(time.perf_counter() - sent_at)
+                    sent_at = None
+                self.apply_update(data)
+                if not data["game_over"] and data["current_player"] == self.number:
+                    self.send(Protocol.PLAY_MOVE, {"column": self.choose_column()})
+                    sent_at = time.perf_counter()
+                    self.moves_played += 1
+                    moves += 1
+
+            elif msg_type == Protocol.ERROR and sent_at is not None:
+                # Colonne refusée (état local en retard) : on rejoue ailleurs,
+                # après le délai demandé si le coup a été refusé pour débit excessif
+                if "retry_after" in data:
+                    await asyncio.sleep(data["retry_after"])
+                self.send(Protocol.PLAY_MOVE, {"column": self.choose_column()})
+                sent_at = time.perf_counter()
+
+            elif msg_type == Protocol.GAME_OVER:
+                return moves
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def play_pair(challenger, opponent, games):
+    """Enchaîne les parties d'une paire ; retourne (parties, coups)"""
+    played = moves = 0
+    for _ in range(games):
+        challenger.send(Protocol.LIST_PLAYERS, {"limit": 10})
+        await challenger.until(Protocol.LIST_PLAYERS)
+
+        challenger.send(Protocol.CHALLENGE, {"opponent_id": opponent.player_id})
+        challenge = await opponent.until(Protocol.CHALLENGE_RECEIVED)
+        opponent.send(Protocol.CHALLENGE_ACCEPTED, {"challenger_id": challenge["challenger_id"]})
+
+        results = await asyncio.gather(challenger.play_game(), opponent.play_game())
+        played += 1
+        moves += sum(results)
+    return played, moves
+
+
+async def run_swarm(worker, clients, options):
+    """Connecte puis fait jouer les bots d'un processus ; retourne ses mesures"""
+    features = FEATURE_SETS[options["features"]]
+    script = options["script"]
+    bots = [
+        Bot(f"bot{worker}_{index}", features, random.Random(worker * 100003 + index), script)
+        for index in range(clients)
+    ]
+
+    # Connexions limitées en parallèle pour ne pas saturer la file d'attente du listen()
+    semaphore = asyncio.Semaphore(options["connect_concurrency"])
+
+    async def connect(bot):
+        async with semaphore:
+            await bot.connect(options["host"], options["port"])
+
+    async def connect_group(group):
+        client = MultiplexClient()
+        async with semaphore:
+            await client.connect(options["host"], options["port"])
+        await asyncio.gather(*(bot.join(client) for bot in group))
+        return client
+
+    connect_started = time.time()
+    per_connection = options["sessions_per_connection"]
+    clients_shared = []
+    if per_connection > 1:
+        groups = [bots[index:index + per_connection] for index in range(0, clients, per_connection)]
+        clients_shared = await asyncio.gather(*(connect_group(group) for group in groups))
+    else:
+        await asyncio.gather(*(connect(bot) for bot in bots))
+    connect_finished = time.time()
+
+    pairs = [(bots[index], bots[index + 1]) for index in range(0, clients - 1, 2)]
+    outcomes = await asyncio.gather(
+        *(play_pair(a, b, options["games"]) for a, b in pairs), return_exceptions=True
+    )
+    play_finished = time.time()
+
+    errors = [repr(outcome) for outcome in outcomes if isinstance(outcome, BaseException)]
+    completed = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+
+    for bot in bots:
+        bot.close()
+    for client in clients_shared:
+        await client.close()
+
+    return {
+        "connections": len(clients_shared) or len(bots),
+        "players": len(bots),
+        "connect_started": connect_started,
+        "connect_finished": connect_finished,
+        "play_finished": play_finished,
+        "games": sum(games for games, _ in completed),
+        "moves": sum(moves for _, moves in completed),
+        "latencies": [latency for bot in bots for latency in bot.latencies],
+        "errors": errors,
+    }
+
+
+def worker_main(args):
+    worker, clients, options = args
+    return asyncio.run(run_swarm(worker, clients, options))
+
+
+def percentile(sorted_values, fraction):
+    """Percentile au rang le plus proche d'une liste triée"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(results, clients, processes):
+    connect_started = min(result["connect_started"] for result in results)
+    connect_finished = max(result["connect_finished"] for result in results)
+    play_finished = max(result["play_finished"] for result in results)
+    connections = sum(result["connections"] for result in results)
+    players = sum(result["players"] for result in results)
+    games = sum(result["games"] for result in results)
+    moves = sum(result["moves"] for result in results)
+    latencies = sorted(latency for result in results for latency in result["latencies"])
+    errors = [error for result in results for error in result["errors"]]
+
+    connect_seconds = max(connect_finished - connect_started, 1e-9)
+    play_seconds = max(play_finished - connect_finished, 1e-9)
+
+    def milliseconds(value):
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        "clients": clients,
+        "processes": processes,
+        "connections": connections,
+        "connect_seconds": round(connect_seconds, 3),
+        "connections_per_sec": round(connections / connect_seconds, 1),
+        "players_per_sec": round(players / connect_seconds, 1),
+        "games": games,
+        "moves": moves,
+        "play_seconds": round(play_seconds, 3),
+        "games_per_sec": round(games / play_seconds, 1),
+        "moves_per_sec": round(moves / play_seconds, 1),
+        "move_latency_ms": {
+            "p50": milliseconds(percentile(latencies, 0.50)),
+            "p95": milliseconds(percentile(latencies, 0.95)),
+            "p99": milliseconds(percentile(latencies, 0.99)),
+            "max": milliseconds(latencies[-1] if latencies else None),
+        },
+        "errors": len(errors),
+        "first_errors": errors[:5],
+    }
+
+
+def spawn_server(mode, host, port, workers=None):
+    """Démarre un serveur local et attend qu'il accepte les connexions"""
+    command = [sys.executable, "server.py", "--host", host, "--port", str(port), "--mode", mode]
+    if workers:
+        command += ["--workers", str(workers)]
+    server = subprocess.Popen(
+        command,
+        cwd=ROOT / "server", stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("Le serveur n'a pas démarré")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Générateur de charge Puissance 4")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5555)
+    parser.add_argument("--clients", type=int, default=100, help="nombre total de joueurs (pair)")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--games", type=int, default=3, help="parties jouées par paire")
+    parser.add_argument("--features", choices=sorted(FEATURE_SETS), default="binary")
+    parser.add_argument(
+        "--script", default=None,
+        help="colonnes jouées dans l'ordre (ex. 3,3,2,4), aléatoire si absent ou injouable"
+    )
+    parser.add_argument("--connect-concurrency", type=int, default=50)
+    parser.add_argument(
+        "--sessions-per-connection", type=int, default=1,
+        help="joueurs multiplexés sur chaque connexion (1 : une connexion par joueur)"
+    )
+    parser.add_argument(
+        "--spawn-server", choices=["threads", "asyncio", "processes"], default=None,
+        help="démarre un serveur local dans ce mode pour la durée du test"
+    )
+    parser.add_argument(
+        "--server-workers", type=int, default=None,
+        help="nombre de workers du serveur démarré avec --spawn-server processes"
+    )
+    args = parser.parse_args()
+
+    options = {
+        "host": args.host,
+        "port": args.port,
+        "games": args.games,
+        "features": args.features,
+        "script": [int(column) for column in args.script.split(",")] if args.script else None,
+        "connect_concurrency": args.connect_concurrency,
+        "sessions_per_connection": args.sessions_per_connection,
+    }
+
+    # Répartit les joueurs par paires entre les processus
+    pairs = args.clients // 2
+    processes = max(1, min(args.processes, pairs))
+    shares = [2 * (pairs // processes + (1 if worker < pairs % processes else 0)) for worker in range(processes)]
+
+    server = None
+    if args.spawn_server:
+        server = spawn_server(args.spawn_server, args.host, args.port, args.server_workers)
+    try:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(worker_main, [(worker, share, options) for worker, share in enumerate(shares)])
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(json.dumps(summarize(results, 2 * pairs, processes), indent=2))
+
+
+if __name__ == "__main__":
+    main()